@@ -0,0 +1,103 @@
+"""
+Benchmark of the methods finding duplicate nodes in the merging step.
+
+Clusters embeddings of nodes with groups of near duplicates with the hierarchical
+clustering and the ann search of node_clustering, and reports the time, the peak
+memory and the agreement of the ann search with the hierarchical clustering as
+adjusted rand index. Each run is measured in its own process, as the index of the
+ann search lives outside of the python heap. The hierarchical clustering is only run
+up to --hierarchical-max nodes, its distance matrix needs memory quadratic in the nodes.
+
+Usage (from Project/backend/codebase):
+    python -m benchmarks.benchmark_dedup --sizes 2000 20000 100000
+    python -m benchmarks.benchmark_dedup --model  # embed node names, needs the model
+"""
+
+import argparse
+import multiprocessing
+import resource
+import time
+
+import numpy as np
+from sklearn.metrics import adjusted_rand_score
+
+from benchmarks.benchmark_topic_backends import load_node_names, scaled_node_names
+from graph_creator.services import node_clustering
+from graph_creator.services.node_embeddings import NodeEmbeddings
+from graph_creator.utils.const import DedupMethod
+
+
+def duplicate_embeddings(size, dimensions=384):
+    """
+    Random embeddings with about three near duplicates per distinct node
+    """
+    rng = np.random.default_rng(0)
+    distinct = rng.normal(size=(max(size // 3, 1), dimensions))
+    embeddings = distinct[rng.integers(0, len(distinct), size)]
+    return (embeddings + rng.normal(scale=0.01, size=embeddings.shape)).astype(
+        np.float32
+    )
+
+
+def measure(method, embeddings, threshold, results):
+    start_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    labels = node_clustering.cluster_nodes(embeddings, threshold, method)
+    duration = time.perf_counter() - start
+    peak_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - start_memory
+    # ru_maxrss is in kilobytes on linux
+    results.put((labels, duration, peak_memory / 2**10))
+
+
+def run(method, embeddings, threshold):
+    results = multiprocessing.Queue()
+    process = multiprocessing.Process(
+        target=measure, args=(method, embeddings, threshold, results)
+    )
+    process.start()
+    result = results.get()
+    process.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2000, 10000, 50000])
+    parser.add_argument("--threshold", type=float, default=0.2)
+    parser.add_argument("--hierarchical-max", type=int, default=20000)
+    parser.add_argument("--model", action="store_true")
+    args = parser.parse_args()
+
+    names = load_node_names()
+    print(
+        f"{'nodes':>7} {'method':>13} {'time (s)':>9} {'memory (MB)':>12} "
+        f"{'clusters':>9} {'agreement':>10}"
+    )
+    for size in args.sizes:
+        if args.model:
+            embeddings = NodeEmbeddings.from_nodes(
+                scaled_node_names(names, size)
+            ).embeddings
+        else:
+            embeddings = duplicate_embeddings(size)
+        hierarchical = None
+        for method in [DedupMethod.HIERARCHICAL, DedupMethod.ANN]:
+            if method == DedupMethod.HIERARCHICAL and size > args.hierarchical_max:
+                print(f"{size:>7} {method:>13} skipped")
+                continue
+            labels, duration, memory = run(method, embeddings, args.threshold)
+            if method == DedupMethod.HIERARCHICAL:
+                hierarchical = labels
+            agreement = (
+                f"{adjusted_rand_score(hierarchical, labels):>10.3f}"
+                if hierarchical is not None
+                else f"{'-':>10}"
+            )
+            print(
+                f"{size:>7} {method:>13} {duration:>9.2f} {memory:>12.0f} "
+                f"{len(np.unique(labels)):>9} {agreement}"
+            )
+
+
+if __name__ == "__main__":
+    main()
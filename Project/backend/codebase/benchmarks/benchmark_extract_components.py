@@ -0,0 +1,110 @@
+"""
+Benchmark of the component extraction of the knowledge graph.
+
+Compares graph_handler.extract_components with the quadratic component search it
+replaced on random graphs. The quadratic search is only run up to --baseline-max
+relations, as it takes minutes beyond that.
+
+Usage (from Project/backend/codebase):
+    python -m benchmarks.benchmark_extract_components
+"""
+
+import argparse
+import random
+import time
+
+from graph_creator import graph_handler
+
+
+def quadratic_extract_components(relations_list):
+    """
+    The component search graph_handler used before, kept as the baseline
+    """
+    components = [[]]
+    for relation in relations_list:
+        node_1 = relation[0]
+        node_2 = relation[1]
+
+        inserte = {"at": -1, "new_node": -1}
+        merge_with = -1
+        for i in range(len(components)):
+            if i >= len(components):
+                break
+            if len(components[i]) == 0 and inserte["at"] == -1:
+                components[i].append(node_1)
+                components[i].append(node_2)
+                components.append([])
+                break
+            for j in range(len(components[i])):
+                if node_1 == components[i][j]:
+                    if inserte["at"] == -1:
+                        inserte["new_node"] = node_2
+                        inserte["at"] = i
+                    else:
+                        merge_with = i
+                    break
+                if node_2 == components[i][j]:
+                    if inserte["at"] == -1:
+                        inserte["new_node"] = node_1
+                        inserte["at"] = i
+                    else:
+                        merge_with = i
+                    break
+        if merge_with >= 0:
+            components[inserte["at"]] += components[merge_with]
+            components.pop(merge_with)
+        elif inserte["at"] >= 0:
+            components[inserte["at"]].append(inserte["new_node"])
+
+    components.pop(len(components) - 1)
+
+    return components
+
+
+def random_relations(relations_count, seed=0):
+    """
+    Sparse random graph with about as many entities as relations, like the
+    fragmented graphs extracted chunk by chunk
+    """
+    rng = random.Random(seed)
+    entities_count = relations_count
+    return [
+        [rng.randrange(entities_count), rng.randrange(entities_count)]
+        for _ in range(relations_count)
+    ]
+
+
+def measure(function, relations):
+    start = time.perf_counter()
+    components = function(relations)
+    return time.perf_counter() - start, components
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--baseline-max", type=int, default=10_000)
+    args = parser.parse_args()
+
+    print(
+        f"{'relations':>10} {'components':>11} {'sparse (s)':>11} {'quadratic (s)':>14}"
+    )
+    for size in args.sizes:
+        relations = random_relations(size)
+        sparse_time, components = measure(graph_handler.extract_components, relations)
+        baseline = "skipped"
+        if size <= args.baseline_max:
+            baseline_time, baseline_components = measure(
+                quadratic_extract_components, relations
+            )
+            assert {frozenset(c) for c in components} == {
+                frozenset(c) for c in baseline_components
+            }
+            baseline = f"{baseline_time:.3f}"
+        print(f"{size:>10} {len(components):>11} {sparse_time:>11.3f} {baseline:>14}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark of the topic backends of add_topic.
+
+Times each backend on the node names of the test document, repeated with numbered
+suffixes to reach the requested sizes, and reports the number of topics and the share
+of nodes without a topic (BERTopic outliers) as a rough measure of quality.
+
+Usage (from Project/backend/codebase):
+    python -m benchmarks.benchmark_topic_backends --sizes 500 5000
+    python -m benchmarks.benchmark_topic_backends --random-embeddings  # no model download
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from graph_creator.services import topic_backends
+from graph_creator.services.node_embeddings import NodeEmbeddings
+from graph_creator.utils.const import TopicBackend
+
+
+def load_node_names(path="tests/data/llmExtractedInformation.json"):
+    with open(path) as file:
+        entities_and_relations = json.load(file)
+    names = {
+        relation[node]
+        for chunk in entities_and_relations
+        for relation in chunk
+        for node in ["node_1", "node_2"]
+    }
+    return sorted(str(name) for name in names)
+
+
+def scaled_node_names(names, size):
+    return [
+        names[i % len(names)] + ("" if i < len(names) else f" {i // len(names)}")
+        for i in range(size)
+    ]
+
+
+def embed(documents, random_embeddings):
+    if not random_embeddings:
+        return NodeEmbeddings.from_nodes(documents)
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(20, 384))
+    embeddings = centers[rng.integers(0, 20, len(documents))] + rng.normal(
+        scale=0.3, size=(len(documents), 384)
+    )
+    return NodeEmbeddings(documents, embeddings.astype(np.float32))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[200, 2000, 10000])
+    parser.add_argument(
+        "--backends",
+        nargs="+",
+        default=[
+            TopicBackend.BERTOPIC,
+            TopicBackend.KMEANS,
+            TopicBackend.AGGLOMERATIVE,
+            TopicBackend.NONE,
+        ],
+    )
+    parser.add_argument("--max-topics", type=int, default=25)
+    parser.add_argument("--random-embeddings", action="store_true")
+    args = parser.parse_args()
+
+    names = load_node_names()
+    print(f"{'nodes':>7} {'backend':>14} {'time (s)':>9} {'topics':>7} {'no topic':>9}")
+    for size in args.sizes:
+        documents = scaled_node_names(names, size)
+        node_embeddings = embed(documents, args.random_embeddings)
+        for backend in args.backends:
+            start = time.perf_counter()
+            try:
+                topics, topic_names = topic_backends.assign_topics(
+                    documents, backend, args.max_topics, node_embeddings
+                )
+            except Exception as error:
+                print(f"{size:>7} {backend:>14} failed: {error!r}")
+                continue
+            duration = time.perf_counter() - start
+            without_topic = np.mean(np.asarray(topics) == -1)
+            print(
+                f"{size:>7} {backend:>14} {duration:>9.2f} "
+                f"{len(set(topic_names) - {-1}):>7} {without_topic:>9.0%}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+
+class RequestSizeLimitMiddleware:
+    """
+    Rejects requests whose declared body size exceeds a limit with 413,
+    before the body is read and spooled by the multipart parser.
+    Bodies without a Content-Length are limited where they are consumed.
+    """
+
+    def __init__(self, app: ASGIApp, max_size_bytes: int, path_prefixes: list[str]):
+        self.app = app
+        self.max_size_bytes = max_size_bytes
+        self.path_prefixes = path_prefixes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and scope["path"].startswith(
+            tuple(self.path_prefixes)
+        ):
+            headers = dict(scope["headers"])
+            content_length = headers.get(b"content-length", b"").decode()
+            if content_length.isdigit() and int(content_length) > self.max_size_bytes:
+                response = JSONResponse(
+                    {"detail": "Request body is too large."}, status_code=413
+                )
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
@@ -1,3 +1,5 @@
+import os
+
 import pytest
 from fastapi.testclient import TestClient
 
@@ -7,3 +9,12 @@ from main import app
 @pytest.fixture
 def client():
     return TestClient(app)
+
+
+@pytest.fixture
+def test_db_url(tmp_path):
+    """
+    Url of the database used by tests, a SQLite file unless
+    TEST_DB_URL points to another database, e.g. a local postgres container
+    """
+    return os.getenv("TEST_DB_URL", f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
@@ -3,12 +3,13 @@ import uuid
 from typing import List
 
 from fastapi import Depends
-from sqlalchemy import select
+from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from common.dependencies import get_db_session
 from graph_creator.models.graph_job import GraphJob
 from graph_creator.schemas.graph_job import GraphJobCreate
+from graph_creator.utils.const import GraphStatus
 
 
 class GraphJobDAO:
@@ -38,6 +39,24 @@ class GraphJobDAO:
         )
         return result.scalar()
 
+    async def get_ready_graph_job_by_content_hash(
+        self, content_hash: str, exclude_id: uuid.UUID = None
+    ) -> GraphJob:
+        """
+        Get a graph job with a ready graph of the document with the given content hash.
+        """
+
+        query = select(GraphJob).filter(
+            GraphJob.content_hash == content_hash,
+            GraphJob.status == GraphStatus.GRAPH_READY,
+        )
+        if exclude_id is not None:
+            query = query.filter(GraphJob.id != exclude_id)
+        result = await self.session.execute(
+            query.order_by(GraphJob.created_at).limit(1)
+        )
+        return result.scalar()
+
     async def get_graph_jobs(self, limit: int = 100, offset: int = 0) -> List[GraphJob]:
         """
         Get all graph jobs with limit/offset pagination.
@@ -56,20 +75,57 @@ class GraphJobDAO:
 
         # Create a new graph job and add it to session
         new_graph_job = GraphJob(
-            name=graph_job.name, location=graph_job.location, status=graph_job.status
+            name=graph_job.name,
+            location=graph_job.location,
+            status=graph_job.status,
+            content_hash=graph_job.content_hash,
         )
         self.session.add(new_graph_job)
         await self.session.commit()
         await self.session.refresh(new_graph_job)
         return new_graph_job
 
+    async def update_graph_job_status(self, graph_job: GraphJob, status: str):
+        """
+        Set the status of the graph job and persist it.
+        """
+
+        graph_job.status = status
+        self.session.add(graph_job)
+        await self.session.commit()
+        return graph_job
+
+    async def update_graph_job_progress(
+        self, graph_job: GraphJob, progress: dict, status: str = None
+    ):
+        """
+        Set the progress and optionally the status of the graph job and persist them.
+        """
+
+        graph_job.progress = progress
+        if status is not None:
+            graph_job.status = status
+        self.session.add(graph_job)
+        await self.session.commit()
+        return graph_job
+
     async def delete_graph_job(self, graph_job: GraphJob):
         """
         Delete the graph job
         """
 
-        # Delete the file
-        if os.path.exists(graph_job.location):
+        # Delete the file unless another graph job shares the stored document
+        shared = (
+            await self.session.execute(
+                select(func.count())
+                .select_from(GraphJob)
+                .filter(
+                    GraphJob.location == graph_job.location,
+                    GraphJob.id != graph_job.id,
+                )
+            )
+        ).scalar()
+        if not shared and os.path.exists(graph_job.location):
             os.remove(graph_job.location)
 
         # Delete the graph job
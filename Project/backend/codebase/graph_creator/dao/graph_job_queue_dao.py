@@ -0,0 +1,152 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from fastapi import Depends
+from sqlalchemy import delete, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from common.dependencies import get_db_session
+from graph_creator.models.graph_job import GraphJob
+from graph_creator.models.graph_job_queue import GraphJobQueueItem
+from graph_creator.utils.const import GraphStatus
+
+
+class GraphJobQueueDAO:
+    """Class for accessing graph_job_queue table."""
+
+    def __init__(self, session: AsyncSession = Depends(get_db_session)):
+        self.session = session
+
+    async def enqueue(self, graph_job: GraphJob) -> GraphJobQueueItem:
+        """
+        Add a graph job to the queue, if it is not queued already.
+        """
+
+        item = (
+            await self.session.execute(
+                select(GraphJobQueueItem).filter(
+                    GraphJobQueueItem.graph_job_id == graph_job.id
+                )
+            )
+        ).scalar()
+        if item is None:
+            item = GraphJobQueueItem(graph_job_id=graph_job.id, attempts=0)
+            self.session.add(item)
+            await self.session.commit()
+            await self.session.refresh(item)
+        return item
+
+    async def queue_graph_job(self, graph_job_id: uuid.UUID, options: dict) -> bool:
+        """
+        Set a graph job whose document is uploaded or whose graph creation failed to
+        queued and add it to the queue in one transaction. Concurrent requests for the
+        same graph job queue it once, a graph job already in the queue counts as queued.
+
+        Returns:
+            bool: If the graph job is queued.
+        """
+
+        queued = await self.session.execute(
+            update(GraphJob)
+            .filter(
+                GraphJob.id == graph_job_id,
+                GraphJob.status.in_([GraphStatus.DOC_UPLOADED, GraphStatus.FAILED]),
+            )
+            .values(status=GraphStatus.QUEUED, options=options)
+        )
+        item_id = (
+            await self.session.execute(
+                select(GraphJobQueueItem.id).filter(
+                    GraphJobQueueItem.graph_job_id == graph_job_id
+                )
+            )
+        ).scalar()
+        if queued.rowcount != 1:
+            await self.session.rollback()
+            return item_id is not None
+        if item_id is None:
+            self.session.add(GraphJobQueueItem(graph_job_id=graph_job_id, attempts=0))
+        await self.session.commit()
+        return True
+
+    async def claim_next(
+        self, worker_name: str, lease_seconds: int
+    ) -> Optional[GraphJobQueueItem]:
+        """
+        Claim the oldest queue item that is not locked by another worker.
+        Items of crashed workers become claimable again once their lease ran out.
+        """
+
+        now = datetime.now(timezone.utc)
+        claimable = or_(
+            GraphJobQueueItem.locked_until.is_(None),
+            GraphJobQueueItem.locked_until < now,
+        )
+        item_id = (
+            await self.session.execute(
+                select(GraphJobQueueItem.id)
+                .filter(claimable)
+                .order_by(GraphJobQueueItem.created_at, GraphJobQueueItem.id)
+                .limit(1)
+                .with_for_update(skip_locked=True)
+            )
+        ).scalar()
+        if item_id is None:
+            await self.session.commit()
+            return None
+
+        # the lease condition guards against double claims on databases without row locks
+        claimed = await self.session.execute(
+            update(GraphJobQueueItem)
+            .filter(GraphJobQueueItem.id == item_id, claimable)
+            .values(
+                claimed_by=worker_name,
+                locked_until=now + timedelta(seconds=lease_seconds),
+                attempts=GraphJobQueueItem.attempts + 1,
+            )
+        )
+        await self.session.commit()
+        if claimed.rowcount != 1:
+            return None
+
+        return await self.session.get(
+            GraphJobQueueItem, item_id, populate_existing=True
+        )
+
+    async def extend_lease(self, item_id: uuid.UUID, lease_seconds: int):
+        """
+        Keep a claimed item locked while its graph job is being processed.
+        """
+
+        await self.session.execute(
+            update(GraphJobQueueItem)
+            .filter(GraphJobQueueItem.id == item_id)
+            .values(
+                locked_until=datetime.now(timezone.utc)
+                + timedelta(seconds=lease_seconds)
+            )
+        )
+        await self.session.commit()
+
+    async def release(self, item_id: uuid.UUID):
+        """
+        Unlock a claimed item, so it is claimed again by the next free worker.
+        """
+
+        await self.session.execute(
+            update(GraphJobQueueItem)
+            .filter(GraphJobQueueItem.id == item_id)
+            .values(claimed_by=None, locked_until=None)
+        )
+        await self.session.commit()
+
+    async def remove(self, item_id: uuid.UUID):
+        """
+        Remove a processed item from the queue.
+        """
+
+        await self.session.execute(
+            delete(GraphJobQueueItem).filter(GraphJobQueueItem.id == item_id)
+        )
+        await self.session.commit()
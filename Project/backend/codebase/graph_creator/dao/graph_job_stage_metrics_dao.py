@@ -0,0 +1,42 @@
+import uuid
+from typing import List
+
+from fastapi import Depends
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from common.dependencies import get_db_session
+from graph_creator.models.graph_job_stage_metrics import GraphJobStageMetrics
+
+
+class GraphJobStageMetricsDAO:
+    """Class for accessing graph_job_stage_metrics table."""
+
+    def __init__(self, session: AsyncSession = Depends(get_db_session)):
+        self.session = session
+
+    async def add_stage_metrics(
+        self, graph_job_id: uuid.UUID, metrics: dict
+    ) -> GraphJobStageMetrics:
+        """
+        Store the metrics of a finished stage of a graph job.
+        """
+
+        stage_metrics = GraphJobStageMetrics(graph_job_id=graph_job_id, **metrics)
+        self.session.add(stage_metrics)
+        await self.session.commit()
+        return stage_metrics
+
+    async def get_stage_metrics(
+        self, graph_job_id: uuid.UUID
+    ) -> List[GraphJobStageMetrics]:
+        """
+        Get the metrics of all stages a graph job ran, in the order they started.
+        """
+
+        stage_metrics = await self.session.execute(
+            select(GraphJobStageMetrics)
+            .filter(GraphJobStageMetrics.graph_job_id == graph_job_id)
+            .order_by(GraphJobStageMetrics.started_at)
+        )
+        return list(stage_metrics.scalars().fetchall())
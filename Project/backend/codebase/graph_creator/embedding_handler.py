@@ -2,13 +2,15 @@ import pandas as pd
 import os
 import logging
 from graph_creator.models.graph_job import GraphJob
-from sentence_transformers import SentenceTransformer
-from langchain_community.vectorstores import FAISS
-import pickle
-from scipy.cluster.hierarchy import linkage, fcluster
-from scipy.spatial.distance import pdist, cosine
+from graph_creator.services import embedding_cache
+from graph_creator.services.embedding_store import EmbeddingStore, migrate_pickles
+from graph_creator.services.node_clustering import cluster_nodes, get_cluster_representatives
+from graph_creator.services.node_embeddings import NodeEmbeddings
+from graph_creator.utils.const import DedupMethod
+import shutil
 import numpy as np
 from sklearn.exceptions import NotFittedError
+from settings.defaults import EMBEDDING_MODEL
 
 class embeddings_handler:
 
@@ -20,68 +22,64 @@ class embeddings_handler:
         self.save_dir = ".media/embeddings"
 
         # Model used for embedding
-        self.model_name = "all-MiniLM-L6-v2"
+        self.model_name = EMBEDDING_MODEL
 
         # Ensure the embeddings directory exists
         self.graph_dir = os.path.join(self.save_dir, str(self.graph_id))  # Convert UUID to string
 
-        # Check if Graph already embedded
+        # Check if Graph already embedded, graphs embedded before the embedding store are migrated
         os.makedirs(self.graph_dir, exist_ok=True)
-        self.isEmbedded = os.path.isdir(self.graph_dir) and all(
-            os.path.isfile(os.path.join(self.graph_dir, f"{self.graph_id}_{name}.pkl"))
-            for name in ["faiss_index", "embedding_dict", "merged_nodes", "node_to_merged"]
-        )
+        try:
+            migrate_pickles(self.graph_dir, str(self.graph_id))
+        except Exception as e:
+            logging.error(f"Error migrating embeddings of graph {self.graph_id}: {e}")
+        self.isEmbedded = EmbeddingStore.exists(self.graph_dir, str(self.graph_id))
         self.embeddings = self.load_data() if self.isEmbedded  and not lazyLoad else None
 
     def delete_embeddings(self):
-        files = [os.path.join(self.graph_dir, f"{self.graph_id}_{name}.pkl")
-                    for name in ["faiss_index", "embedding_dict", "merged_nodes", "node_to_merged"]]
-        for file in files:
-            if os.path.exists(file):
-                os.remove(file)
-        if os.path.exists(self.graph_dir):
-            os.rmdir(self.graph_dir)
+        shutil.rmtree(self.graph_dir, ignore_errors=True)
+
+    def copy_embeddings_from(self, source: "embeddings_handler"):
+        """
+        Copy the stored embeddings of another graph, e.g. of an identical document
+
+        Args:
+            source : embeddings_handler of the graph whose embeddings are copied
+        """
+        self.save_data(EmbeddingStore.load(source.graph_dir, str(source.graph_id)))
+        self.isEmbedded = True
 
     def is_embedded(self):
         return self.isEmbedded
 
-    def save_data(self, vector_store, embedding_dict, merged_nodes, node_to_merged):
+    def get_version(self):
         """
-        Serialize and make variables of embedding step persistant
-        
+        Version of the stored embeddings, it changes whenever the graph is embedded again
+        """
+        return EmbeddingStore.get_version(self.graph_dir, str(self.graph_id))
+
+    def save_data(self, embedding_store: EmbeddingStore):
+        """
+        Make the search state of the embedding step persistant
+
         Args:
-            vector_store   : langchain_community.vectorstores.faiss.FAISS
-            embedding_dict : dict
-            merged_nodes   : dict
-            node_to_merged : dict
+            embedding_store : EmbeddingStore of the original nodes and their merged nodes
         """
-        # store dictionaries
-        for name, data in zip(
-            ["faiss_index", "embedding_dict", "merged_nodes", "node_to_merged"],
-            [vector_store, embedding_dict, merged_nodes, node_to_merged],
-        ):
-            with open(os.path.join(self.graph_dir, f"{self.graph_id}_{name}.pkl"), "wb") as f:
-                pickle.dump(data, f)
-
-    def load_data(self) -> list[FAISS, dict, dict, dict]:
-        loaded_data = []
-        for name in ["faiss_index", "embedding_dict", "merged_nodes", "node_to_merged"]:
-            file_path = os.path.join(self.graph_dir, f"{self.graph_id}_{name}.pkl")
-            #print(f"Loading {file_path}")
-            try:
-                with open(file_path, "rb") as f:
-                    data = pickle.load(f)
-                    loaded_data.append(data)
-                    #print(f"Loaded {name}: {data}")
-            except Exception as e:
-                print(f"Error loading {file_path}: {e}")
-                loaded_data.append(None)
-        return loaded_data
+        embedding_store.save(self.graph_dir, str(self.graph_id))
+
+    def load_data(self) -> EmbeddingStore:
+        try:
+            return EmbeddingStore.load(self.graph_dir, str(self.graph_id))
+        except Exception as e:
+            logging.error(f"Error loading embeddings of graph {self.graph_id}: {e}")
+            return None
 
     def generate_embeddings_and_merge_duplicates(
         self,
         data,
         threshold=0.2,
+        node_embeddings: NodeEmbeddings = None,
+        method: DedupMethod = DedupMethod.AUTO,
     ):
         """
         Generates embeddings for nodes in the given data and merges duplicate nodes based on a threshold.
@@ -91,15 +89,12 @@ class embeddings_handler:
             model_name (str, optional): The name of the pre-trained model to use for generating embeddings. Defaults to 'xlm-r-bert-base-nli-stsb-mean-tokens'.
             save_dir (str, optional): The directory to save the generated embeddings and other files. Defaults to 'embeddings'.
             threshold (float, optional): The threshold value for hierarchical clustering. Nodes with a cosine distance below this threshold will be merged. Defaults to 0.2.
+            node_embeddings (NodeEmbeddings, optional): Embeddings of the nodes computed earlier in the graph job, the nodes are embedded if not given.
+            method (DedupMethod, optional): Hierarchical clustering of all pairs of nodes or the approximate nearest neighbor search for large graphs. Defaults to auto, chosen by the number of nodes.
 
         Returns:
-            tuple: A tuple containing the following elements:
-                - embedding_dict (dict): A dictionary mapping nodes to their corresponding embeddings.
-                - merged_nodes (dict): A dictionary mapping merged node names to the original nodes in each cluster.
-                - merged_df (pd.DataFrame): A DataFrame containing the merged data with updated node names.
-                - vector_store (FAISS): The FAISS index created with original embeddings mapped to merged nodes.
-                - model (SentenceTransformer): The SentenceTransformer model used for generating embeddings.
-                - node_to_merged (dict): A dictionary mapping original nodes to their corresponding merged node names.
+            pd.DataFrame: The merged data with updated node names. The embeddings of the original nodes and their
+                merged nodes are stored for the graph search.
         """
         # Debug: Print the DataFrame columns
         print("DataFrame Columns:", data.columns)
@@ -114,64 +109,42 @@ class embeddings_handler:
         data = data.copy()
 
         all_nodes = pd.concat([data["node_1"], data["node_2"]]).unique()
-        model = SentenceTransformer(self.model_name)
-
-        embeddings = model.encode(all_nodes)
-        embedding_dict = {node: emb for node, emb in zip(all_nodes, embeddings)}
-
-        # Hierarchical Clustering
-        distance_matrix = pdist(embeddings, "cosine")
-        Z = linkage(distance_matrix, "ward")
-        labels = fcluster(Z, threshold, criterion="distance")
-
-        merged_nodes = {}
-        node_to_merged = {}
-
-        # The under the command find the average embedding of the cluster and assign the node with the smallest cosine distance to the average embedding as the representative node
-        for label in set(labels):
-            cluster = [all_nodes[i] for i in range(len(all_nodes)) if labels[i] == label]
-            average_embedding = np.mean([embedding_dict[node] for node in cluster], axis=0)
-            representative_node = min(
-                cluster, key=lambda node: cosine(embedding_dict[node], average_embedding)
-            )
-            merged_nodes[representative_node] = cluster
-            for node in cluster:
-                node_to_merged[node] = representative_node
-
-        # Update edges in the graph and avoid duplicate edges
-        seen_edges = set()
-        merged_data = []
-        for _, row in data.iterrows():
-            node_1 = node_to_merged.get(row["node_1"], row["node_1"])
-            node_2 = node_to_merged.get(row["node_2"], row["node_2"])
-            edge = row["edge"]
-            edge_tuple = (node_1, node_2, edge)
-            if node_1 != node_2 and edge_tuple not in seen_edges:
-                merged_data.append(
-                    {
-                        "node_1": node_1,
-                        "node_2": node_2,
-                        "edge": edge,
-                        "chunk_id": row["chunk_id"],
-                        "topic_node_1": row["topic_node_1"],
-                        "topic_node_2": row["topic_node_2"],
-                        "original_Node_1": row["node_1"],
-                        "original_Node_2": row["node_2"],
-                    }
-                )
-                seen_edges.add(edge_tuple)
-
-        merged_df = pd.DataFrame(merged_data).drop_duplicates()
-
-        # Create FAISS index with original embeddings, but map to merged nodes
-        vector_store = FAISS.from_embeddings(
-            [(node_to_merged[node], emb) for node, emb in embedding_dict.items()],
-            embedding=model,
+        if node_embeddings is None:
+            node_embeddings = NodeEmbeddings.from_data(data, self.model_name)
+
+        embeddings = node_embeddings.get(all_nodes)
+
+        # Clustering of duplicate nodes
+        labels = cluster_nodes(embeddings, threshold, method)
+
+        # The node with the smallest cosine distance to the average embedding of its cluster is the representative node,
+        # each node is coded by the position of its representative node
+        clusters, representatives = get_cluster_representatives(embeddings, labels)
+        merged = np.empty(len(all_nodes), dtype=np.int32)
+        for cluster, representative in zip(clusters, representatives):
+            merged[cluster] = representative
+        node_to_merged = dict(zip(all_nodes, all_nodes[merged]))
+
+        # Update edges in the graph and avoid duplicate edges, the first of duplicate edges is kept
+        merged_df = pd.DataFrame(
+            {
+                "node_1": data["node_1"].map(node_to_merged),
+                "node_2": data["node_2"].map(node_to_merged),
+                "edge": data["edge"],
+                "chunk_id": data["chunk_id"],
+                "topic_node_1": data["topic_node_1"],
+                "topic_node_2": data["topic_node_2"],
+                "original_Node_1": data["node_1"],
+                "original_Node_2": data["node_2"],
+            }
         )
+        merged_df = merged_df[merged_df["node_1"] != merged_df["node_2"]]
+        merged_df = merged_df.drop_duplicates(["node_1", "node_2", "edge"]).reset_index(drop=True)
+
+        # Store original embeddings mapped to merged nodes for the search
+        embedding_store = EmbeddingStore(all_nodes, np.asarray(embeddings, dtype=np.float32), merged)
         try:
-            self.save_data(
-                vector_store, embedding_dict, merged_nodes, node_to_merged
-            )
+            self.save_data(embedding_store)
         except Exception as e:
             logging.error(e)
         
@@ -183,34 +156,37 @@ class embeddings_handler:
             logging.error("No embeddings found!")
             return None
 
-        # Load the model
-        model = SentenceTransformer(self.model_name)
-        vector_store, embedding_dict, merged_nodes, node_to_merged = self.embeddings
+        embedding_store = self.embeddings
 
-        query_embedding = model.encode([query])[0]
-        results = vector_store.similarity_search_with_score_by_vector(query_embedding, k=k)
+        # the model is loaded once per process, repeated queries are cached
+        query_embedding = embedding_cache.encode([query], self.model_name)[0]
+        positions = embedding_store.search(query_embedding, k)
         similar_nodes = []
         visited_nodes = (
             set()
         )  # Set to track which merged nodes have been added to the result
 
-        for doc, score in results:
-            merged_node = doc.page_content
+        for position in positions:
+            merged_node = embedding_store.nodes[embedding_store.merged[position]]
             if merged_node in visited_nodes:
                 continue  # Skip this node if it has already been added
 
-            original_nodes = merged_nodes[merged_node]
-            similarities = [
-                1 - cosine(query_embedding, embedding_dict[node]) for node in original_nodes
-            ]
+            cluster = embedding_store.get_cluster(position)
+            original_nodes = [embedding_store.nodes[i] for i in cluster]
+            # cosine similarity of the query and each original node
+            cluster_embeddings = np.asarray(embedding_store.embeddings[cluster], dtype=np.float64)
+            query_vector = np.asarray(query_embedding, dtype=np.float64)
+            similarities = (cluster_embeddings @ query_vector) / (
+                np.linalg.norm(cluster_embeddings, axis=1) * np.linalg.norm(query_vector)
+            )
             avg_similarity = np.mean(similarities)
             similar_nodes.append(
                 {
                     "merged_node": merged_node,
                     "original_nodes": original_nodes,
                     "similarity": avg_similarity,
-                    "individual_similarities": dict(zip(original_nodes, similarities)),
+                    "individual_similarities": dict(zip(original_nodes, similarities.tolist())),
                 }
             )
             visited_nodes.add(merged_node)  # Mark this node as visited
-        return similar_nodes
\ No newline at end of file
+        return similar_nodes
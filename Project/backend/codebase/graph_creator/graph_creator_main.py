@@ -1,105 +1,297 @@
 import logging
 from graph_creator.embedding_handler import embeddings_handler
 from graph_creator import graph_handler
-import os 
 from graph_creator.services.llm.llama_gemini_combination import llama_gemini_combination
 from graph_creator.models.graph_job import GraphJob
+from graph_creator.schemas.graph_job import GraphJobOptions
 from graph_creator.services import netx_graphdb
+from graph_creator.services.checkpoint_store import CheckpointStore
+from graph_creator.services.document_store import DocumentStore
 from graph_creator.services.file_handler import FileHandler
+from graph_creator.services.node_embeddings import NodeEmbeddings
+from graph_creator.services.stage_metrics import StageMetricsRecorder
+from graph_creator.utils.const import GraphStatus, PipelineStage
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-def process_file_to_graph(g_job: GraphJob):
+def process_file_to_graph(
+    g_job: GraphJob, on_status=None, on_progress=None, on_metrics=None
+):
     """
-    Processes a file to create a graph.
+    Processes a file to create a graph. The output of each stage is checkpointed,
+    so a job that failed or was interrupted resumes after its last completed stage.
 
     Args:
         g_job (GraphJob): The GraphJob object containing information about the file and graph.
+        on_status (callable, optional): Called with the GraphStatus of each stage when it starts.
+        on_progress (callable, optional): Called with keyword counters of the current stage,
+            e.g. chunks_extracted and chunks_total.
+        on_metrics (callable, optional): Called with the time and resources of each stage.
 
     Returns:
         None
+
+    Raises:
+        Exception: Any error of a stage, the checkpoints of completed stages are kept.
     """
+    options = GraphJobOptions(**(g_job.options or {}))
+
+    checkpoints = CheckpointStore(g_job.id)
+    if not options.resume_from_checkpoints:
+        checkpoints.clear()
+
     # llm handler that is used for all llm calls during knowledge graph creation
-    llm_handler = llama_gemini_combination()
+    llm_handler = llama_gemini_combination(use_cache=options.use_llm_cache)
+    metrics = StageMetricsRecorder(llm_handler, on_metrics)
 
     # extract entities and relations
+    if on_status is not None:
+        on_status(GraphStatus.EXTRACTING)
     entities_and_relations, chunks = process_file_to_entities_and_relations(
-        g_job.location, llm_handler
+        g_job.location, llm_handler, checkpoints, on_progress, metrics
     )
 
-    # check for error
-    if entities_and_relations is None:
-        return
-
     # connect graph pieces
     uuid = g_job.id
-    create_and_store_graph(uuid, entities_and_relations, chunks, llm_handler)
+    create_and_store_graph(
+        uuid,
+        entities_and_relations,
+        chunks,
+        llm_handler,
+        on_status,
+        checkpoints,
+        on_progress,
+        metrics,
+        options,
+    )
+
+    cache_stats = llm_handler.get_cache_stats()
+    if cache_stats is not None:
+        logger.info(f"LLM response cache of graph job {uuid}: {cache_stats}")
+
+
+def reuse_graph(
+    source_g_job: GraphJob,
+    g_job: GraphJob,
+    on_status=None,
+    on_progress=None,
+    on_metrics=None,
+):
+    """
+    Reuses the graph of a graph job whose document is identical to the one of g_job,
+    instead of extracting, connecting and embedding it again. The graph is created
+    from the document if the source graph job was deleted meanwhile.
 
+    Args:
+        source_g_job (GraphJob): Graph job with a ready graph of the same document.
+        g_job (GraphJob): The GraphJob object whose graph is created.
+        on_status (callable, optional): Called with the GraphStatus of each stage when it starts.
+        on_progress (callable, optional): Unused, nothing is counted while copying.
+        on_metrics (callable, optional): Called with the time and resources of copying.
 
-def process_file_to_entities_and_relations(file: str, llm_handler):
+    Returns:
+        None
+    """
+    graph_db_service = netx_graphdb.NetXGraphDB()
+    # the source graph job cannot be deleted while its graph is copied
+    with DocumentStore().lock(source_g_job.content_hash):
+        reusable = graph_db_service.has_graph(source_g_job.id)
+        if reusable:
+            if on_status is not None:
+                on_status(GraphStatus.EMBEDDING)
+
+            with StageMetricsRecorder(on_metrics=on_metrics).measure(
+                PipelineStage.GRAPH
+            ):
+                CheckpointStore(g_job.id).copy_from(CheckpointStore(source_g_job.id))
+
+                source_embeddings = embeddings_handler(source_g_job, lazyLoad=True)
+                if source_embeddings.is_embedded():
+                    embeddings_handler(g_job, lazyLoad=True).copy_embeddings_from(
+                        source_embeddings
+                    )
+
+                graph_db_service.copy_graph(source_g_job.id, g_job.id)
+
+    if not reusable:
+        logger.info(
+            f"Graph job {source_g_job.id} was deleted, graph job {g_job.id} is created from its document"
+        )
+        process_file_to_graph(g_job, on_status, on_progress, on_metrics)
+
+
+def process_file_to_entities_and_relations(
+    file: str,
+    llm_handler,
+    checkpoints: CheckpointStore,
+    on_progress=None,
+    metrics: StageMetricsRecorder = None,
+):
     """
     Process the given file to extract entities and relations.
 
     Args:
         file (str): The path to the file to be processed.
+        llm_handler: Handler of the llm calls extracting the entities and relations.
+        checkpoints (CheckpointStore): Stored outputs of the stages of the graph job.
+        on_progress (callable, optional): Called with the number of extracted chunks.
+        metrics (StageMetricsRecorder, optional): Measures chunking and extraction.
 
     Returns:
-        list: A list of dictionaries representing the extracted entities and relations.
+        tuple: A list of dictionaries representing the extracted entities and relations
+            of each chunk, and the chunks as dictionaries.
     """
 
-    try:
+    def split_into_chunks():
         file_handler = FileHandler(file)
-        chunks = file_handler.process_file_into_chunks()
-        text_chunks = [
-            {"text": chunk.page_content} for chunk in chunks
-        ]  # Assuming chunk has 'page_content' attribute
+        return [chunk.dict() for chunk in file_handler.process_file_into_chunks()]
 
-        # Generate response using LLM
-        # response_json = process_chunks(text_chunks, prompt_template)
-        response_json = llm_handler.process_chunks(text_chunks)
-        print(response_json)
-    except Exception as e:
-        print("ERROR")
-        logging.error(e)
-        print("------------------")
-        response_json = None
+    metrics = metrics or StageMetricsRecorder(llm_handler)
+    with metrics.measure(PipelineStage.CHUNKS):
+        chunks = checkpoints.load_or_run(PipelineStage.CHUNKS, split_into_chunks)
 
-    return response_json, chunks
+    def report(chunks_extracted, chunks_total):
+        if on_progress is not None:
+            on_progress(chunks_extracted=chunks_extracted, chunks_total=chunks_total)
 
+    def extract():
+        text_chunks = [{"text": chunk["page_content"]} for chunk in chunks]
+        return llm_handler.process_chunks(text_chunks, on_progress=report)
 
-def create_and_store_graph(uuid, entities_and_relations, chunks, llm_handler):
+    with metrics.measure(PipelineStage.EXTRACTIONS):
+        entities_and_relations = checkpoints.load_or_run(
+            PipelineStage.EXTRACTIONS, extract
+        )
+    report(len(chunks), len(chunks))
+
+    return entities_and_relations, chunks
+
+
+def create_and_store_graph(
+    uuid,
+    entities_and_relations,
+    chunks,
+    llm_handler,
+    on_status,
+    checkpoints,
+    on_progress=None,
+    metrics: StageMetricsRecorder = None,
+    options: GraphJobOptions = None,
+):
     """
     Create and store a graph based on the given entities and relations.
 
     Parameters:
     - uuid (str): The unique identifier for the graph.
     - entities_and_relations (list): A list of dictionaries representing the entities and relations.
+    - chunks (list): The chunks of the document as dictionaries.
+    - on_status (callable, optional): Called with the GraphStatus of each stage when it starts.
+    - checkpoints (CheckpointStore): Stored outputs of the stages of the graph job.
+    - on_progress (callable, optional): Called with the number of tried and connected components.
+    - metrics (StageMetricsRecorder, optional): Measures the stages.
+    - options (GraphJobOptions, optional): Options of the graph job, e.g. how components are connected.
 
     Returns:
     None
     """
-    df_e_and_r = graph_handler.build_flattened_dataframe(entities_and_relations)
+
+    def report(components_tried, components_connected, components_total):
+        if on_progress is not None:
+            on_progress(
+                components_tried=components_tried,
+                components_connected=components_connected,
+                components_total=components_total,
+            )
 
     # combine knowledge graph pieces
     # combined = graph_handler.connect_with_chunk_proximity(df_e_and_r)
     # combined['chunk_id'] = '1'
-    for i in range(len(chunks)):
-        chunks[i] = chunks[i].dict()
-    combined = graph_handler.connect_with_llm(df_e_and_r, chunks, llm_handler)
+    options = options or GraphJobOptions()
 
-        # Create an instance of the embeddings handler
+    def connect():
+        df_e_and_r = graph_handler.build_flattened_dataframe(entities_and_relations)
+        df_e_and_r, pre_connections = graph_handler.pre_connect_components(
+            df_e_and_r,
+            options.pre_connection_methods,
+            options.pre_connection_similarity_threshold,
+        )
+        if on_progress is not None:
+            on_progress(
+                **{
+                    f"components_connected_by_{method}": count
+                    for method, count in pre_connections.items()
+                }
+            )
+        return graph_handler.connect_with_llm(
+            df_e_and_r,
+            chunks,
+            llm_handler,
+            on_progress=report,
+            with_topics=False,
+            batch_connections=options.batch_connection_checks,
+            max_llm_calls=options.max_connection_llm_calls,
+        )
+
+    metrics = metrics or StageMetricsRecorder(llm_handler)
+    if on_status is not None:
+        on_status(GraphStatus.CONNECTING)
+    with metrics.measure(PipelineStage.CONNECTED):
+        combined = checkpoints.load_or_run(
+            PipelineStage.CONNECTED,
+            connect,
+            as_dataframe=True,
+            options=options.get_stage_options(PipelineStage.CONNECTED),
+        )
+
+    # embed the nodes once for the topics and the merging of duplicates
+    node_embeddings = None
+    if not all(
+        checkpoints.has(stage, options.get_stage_options(stage))
+        for stage in [PipelineStage.TOPICS, PipelineStage.MERGED]
+    ):
+        with metrics.measure(PipelineStage.NODE_EMBEDDINGS):
+            node_embeddings = NodeEmbeddings.from_data(combined)
+
+    # assign topics to the nodes
+    with metrics.measure(PipelineStage.TOPICS):
+        combined = checkpoints.load_or_run(
+            PipelineStage.TOPICS,
+            lambda: graph_handler.add_topic(
+                combined,
+                node_embeddings=node_embeddings,
+                backend=options.topic_backend,
+            ),
+            as_dataframe=True,
+            options=options.get_stage_options(PipelineStage.TOPICS),
+        )
+
+    if on_status is not None:
+        on_status(GraphStatus.EMBEDDING)
+
+    # Create an instance of the embeddings handler
     embeddings_handler_instance = embeddings_handler(GraphJob(id=uuid))
 
     # Generate embeddings and merge duplicates
-    combined = embeddings_handler_instance.generate_embeddings_and_merge_duplicates(combined)
-    
-    # get graph db service
-    graph_db_service = netx_graphdb.NetXGraphDB()
+    with metrics.measure(PipelineStage.MERGED):
+        combined = checkpoints.load_or_run(
+            PipelineStage.MERGED,
+            lambda: embeddings_handler_instance.generate_embeddings_and_merge_duplicates(
+                combined,
+                node_embeddings=node_embeddings,
+                method=options.dedup_method,
+            ),
+            as_dataframe=True,
+            options=options.get_stage_options(PipelineStage.MERGED),
+        )
+
+    with metrics.measure(PipelineStage.GRAPH):
+        # get graph db service
+        graph_db_service = netx_graphdb.NetXGraphDB()
 
-    # read entities and relations
-    graph = graph_db_service.create_graph_from_df(combined, chunks)
+        # read entities and relations
+        graph = graph_db_service.create_graph_from_df(combined, chunks)
 
-    # save graph as file
-    graph_db_service.save_graph(uuid, graph)
+        # save graph as file
+        graph_db_service.save_graph(uuid, graph)
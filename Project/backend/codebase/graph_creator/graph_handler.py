@@ -5,13 +5,33 @@ import re
 # from graph_creator import llama3
 # from graph_creator import embedding_handler # To be integrated
 
+import numpy as np
 import pandas as pd
-
-from bertopic import BERTopic
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+
+from graph_creator.utils.concurrency import (
+    CallBudget,
+    first_success_concurrently,
+    map_concurrently,
+)
+from graph_creator.services.topic_backends import assign_topics
+from graph_creator.utils.const import PreConnectionMethod, TopicBackend
+from graph_creator.services.model_registry import model_registry
+from graph_creator.services.node_embeddings import NodeEmbeddings
+from settings.defaults import (
+    CONNECTION_ATTEMPTS_PER_COMPONENT,
+    CONNECTION_BATCH_SIZE,
+    EMBEDDING_MODEL,
+)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# columns every relation of the relation table has, stages may add more, e.g. topics
+RELATION_COLUMNS = ["node_1", "node_2", "edge", "chunk_id"]
+
 
 def build_flattened_dataframe(entities_and_relations):
     """
@@ -123,27 +143,46 @@ def index_entity_relation_table(entity_and_relation_df, entities):
         A dictionary to translate entities to an index number
         A List containing all relations as tuples of entity indexes
     """
-    entities_dict = {}
-    # make sure all entities are strings
-    entities = [
-        entity if isinstance(entity, str) else str(entity) for entity in entities
-    ]
-    # for reproducible results
-    entities = sorted(entities)
-    for i in range(len(entities)):
-        entities_dict[entities[i]] = i
+    # make sure all entities are strings, sorted for reproducible results
+    entities = sorted(
+        {entity if isinstance(entity, str) else str(entity) for entity in entities}
+    )
+    entities_dict = dict(zip(entities, range(len(entities))))
 
-    relations = []
-    entity_and_relation_df_withoutna = entity_and_relation_df.dropna()
-    for i, row in entity_and_relation_df_withoutna.iterrows():
-        relations.append([entities_dict[row["node_1"]], entities_dict[row["node_2"]]])
+    relations = encode_relations(entity_and_relation_df.dropna(), entities).tolist()
 
     return entities_dict, relations
 
 
+def encode_relations(entity_and_relation_df, entities):
+    """
+    Translate the nodes of all relations to entity indexes at once
+
+    Parameters
+    ----------
+    entity_and_relation_df :  pandas.dataframe
+        Table of nodes and relations between the nodes
+    entities : list
+        Sorted entities, the index of an entity is its position
+
+    Returns
+    -------
+    numpy.ndarray
+        An array of shape (relations, 2) with the entity indexes of node_1 and node_2
+    """
+    nodes = entity_and_relation_df[["node_1", "node_2"]].astype(str).to_numpy()
+    codes = pd.Categorical(nodes.ravel(), categories=entities).codes
+    if (codes < 0).any():
+        raise KeyError(nodes.ravel()[np.argmax(codes < 0)])
+
+    return codes.astype(np.int64).reshape(-1, 2)
+
+
 def extract_components(relations_list):
     """
-    Extract components of the graph created by the entities and relations
+    Extract components of the graph created by the entities and relations.
+    The connected components are computed on a sparse adjacency matrix, components are
+    ordered by their first relation and their entities by their first appearance.
 
     Parameters
     ----------
@@ -155,46 +194,38 @@ def extract_components(relations_list):
     list
         A list of lists, which each contain the entities of a component
     """
-    components = [[]]
-    for relation in relations_list:
-        node_1 = relation[0]
-        node_2 = relation[1]
-
-        inserte = {"at": -1, "new_node": -1}
-        merge_with = -1
-        for i in range(len(components)):
-            if i >= len(components):
-                break
-            if len(components[i]) == 0 and inserte["at"] == -1:
-                components[i].append(node_1)
-                components[i].append(node_2)
-                components.append([])
-                break
-            for j in range(len(components[i])):
-                if node_1 == components[i][j]:
-                    if inserte["at"] == -1:
-                        inserte["new_node"] = node_2
-                        inserte["at"] = i
-                    else:
-                        merge_with = i
-                    break
-                if node_2 == components[i][j]:
-                    if inserte["at"] == -1:
-                        inserte["new_node"] = node_1
-                        inserte["at"] = i
-                    else:
-                        merge_with = i
-                    break
-        if merge_with >= 0:
-            components[inserte["at"]] += components[merge_with]
-            components.pop(merge_with)
-        elif inserte["at"] >= 0:
-            components[inserte["at"]].append(inserte["new_node"])
-
-    # remove empty components
-    components.pop(len(components) - 1)
-
-    return components
+    relations = np.asarray(relations_list).reshape(-1, 2)
+    if len(relations) == 0:
+        return []
+
+    # map entities to consecutive codes in the order they first appear in the relations
+    entities, first_seen, codes = np.unique(
+        relations.ravel(), return_index=True, return_inverse=True
+    )
+    order = np.argsort(first_seen)
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    entities = entities[order]
+    codes = rank[codes].reshape(-1, 2)
+
+    adjacency = coo_matrix(
+        (np.ones(len(codes), dtype=np.int8), (codes[:, 0], codes[:, 1])),
+        shape=(len(entities), len(entities)),
+    )
+    _, labels = connected_components(adjacency, directed=False)
+
+    # entities are ordered by first appearance, so the label of a component's first
+    # entity decides the position of the component
+    _, component_first_entity = np.unique(labels, return_index=True)
+    component_rank = np.empty_like(component_first_entity)
+    component_rank[np.argsort(component_first_entity)] = np.arange(
+        len(component_first_entity)
+    )
+    entity_rank = component_rank[labels]
+    grouped = np.argsort(entity_rank, kind="stable")
+    boundaries = np.flatnonzero(np.diff(entity_rank[grouped])) + 1
+
+    return [component.tolist() for component in np.split(entities[grouped], boundaries)]
 
 
 def get_entities_by_chunk(entity_and_relation_df, entities_dict):
@@ -213,20 +244,108 @@ def get_entities_by_chunk(entity_and_relation_df, entities_dict):
     dict
         A dictionary containing all entities per chunk as ids
     """
-    entities_by_chunk = {}
     entity_and_relation_df_withoutna = entity_and_relation_df.dropna()
-    for i, row in entity_and_relation_df_withoutna.iterrows():
-        if row["chunk_id"] in entities_by_chunk:
-            entities_by_chunk[row["chunk_id"]].append(entities_dict[row["node_1"]])
-            entities_by_chunk[row["chunk_id"]].append(entities_dict[row["node_2"]])
-        else:
-            entities_by_chunk[row["chunk_id"]] = []
-            entities_by_chunk[row["chunk_id"]].append(entities_dict[row["node_1"]])
-            entities_by_chunk[row["chunk_id"]].append(entities_dict[row["node_2"]])
+    entities = sorted(entities_dict, key=entities_dict.get)
+    relations = encode_relations(entity_and_relation_df_withoutna, entities)
+
+    # node_1 and node_2 of each relation, grouped by chunk in order of first appearance
+    chunk_codes, chunk_ids = pd.factorize(
+        entity_and_relation_df_withoutna["chunk_id"], sort=False
+    )
+    chunk_codes = np.repeat(chunk_codes, 2)
+    grouped = np.argsort(chunk_codes, kind="stable")
+    boundaries = np.flatnonzero(np.diff(chunk_codes[grouped])) + 1
+    entities_by_chunk = {
+        chunk_id: chunk_entities.tolist()
+        for chunk_id, chunk_entities in zip(
+            chunk_ids, np.split(relations.ravel()[grouped], boundaries)
+        )
+    }
 
     return entities_by_chunk
 
 
+class ChunkIndex:
+    """
+    Index of the chunks from which the entities of the graph components were extracted.
+    Chunks are numbered by their position in entity_chunks_list, the chunks of an entity
+    or a component are a bitmap of these positions, so shared chunks of two components
+    are found with a single and.
+    """
+
+    def __init__(self, entity_chunks_list, components):
+        """
+        Parameters
+        ----------
+        entity_chunks_list : dict
+            A dictionary containing all entities per chunk as ids
+        components : list
+            A list of lists, which each contain the entities of a component
+        """
+        self.chunk_ids = list(entity_chunks_list.keys())
+        self.chunk_entities = [
+            set(chunk_entities) for chunk_entities in entity_chunks_list.values()
+        ]
+
+        # inverted index: chunk bitmap of each entity
+        self.chunks_by_entity = {}
+        for position, chunk_entities in enumerate(self.chunk_entities):
+            bit = 1 << position
+            for entity in chunk_entities:
+                self.chunks_by_entity[entity] = (
+                    self.chunks_by_entity.get(entity, 0) | bit
+                )
+
+        self.component_by_entity = {}
+        self.chunks_by_component = []
+        for i, component in enumerate(components):
+            component_chunks = 0
+            for entity in component:
+                self.component_by_entity[entity] = i
+                component_chunks |= self.chunks_by_entity.get(entity, 0)
+            self.chunks_by_component.append(component_chunks)
+
+    def get_shared_chunks(self, component1, component2):
+        """
+        Get the shared chunks of two components, see get_shared_chunks_by_component
+
+        Parameters
+        ----------
+        component1 : int
+            Position of component1 in the indexed components
+        component2 : int
+            Position of component2 in the indexed components
+
+        Returns
+        -------
+        list, dict
+            A list containing the chunk_ids of all shared chunks
+            A dictionary containing for each shared chunk the nodes from component1 and component2 (seperated)
+        """
+        shared = (
+            self.chunks_by_component[component1] & self.chunks_by_component[component2]
+        )
+        shared_chunks = []
+        intersections = {}
+        while shared:
+            lowest_bit = shared & -shared
+            shared ^= lowest_bit
+            position = lowest_bit.bit_length() - 1
+
+            chunk_id = self.chunk_ids[position]
+            intersection = {"c1": set(), "c2": set()}
+            for entity in self.chunk_entities[position]:
+                component = self.component_by_entity.get(entity)
+                if component == component1:
+                    intersection["c1"].add(entity)
+                elif component == component2:
+                    intersection["c2"].add(entity)
+            shared_chunks.append(chunk_id)
+            intersections[chunk_id] = intersection
+
+        return shared_chunks, intersections
+
+
 def get_shared_chunks_by_component(component1, component2, entity_chunks_list):
     """
     For two graph components get the shared chunks from which entities for both components were extracted
@@ -246,21 +365,9 @@ def get_shared_chunks_by_component(component1, component2, entity_chunks_list):
         A list containing the chunk_ids of all shared chunks
         A dictionary containing for each shared chunk the nodes from component1 and component2 (seperated)
     """
-    entities_component_1 = set(component1)
-    entities_component_2 = set(component2)
-    shared_chunks = []
+    chunk_index = ChunkIndex(entity_chunks_list, [component1, component2])
 
-    keys = list(entity_chunks_list.keys())
-    intersections = {}
-    for i in range(len(entity_chunks_list)):
-        chunk_entities = set(entity_chunks_list[keys[i]])
-        intersection_c1 = chunk_entities.intersection(entities_component_1)
-        intersection_c2 = chunk_entities.intersection(entities_component_2)
-        if len(intersection_c1) > 0 and len(intersection_c2) > 0:
-            shared_chunks.append(keys[i])
-            intersections[keys[i]] = {"c1": intersection_c1, "c2": intersection_c2}
-
-    return shared_chunks, intersections
+    return chunk_index.get_shared_chunks(0, 1)
 
 
 def translate_entity_list(entity_list, reverse_entities_dict):
@@ -303,13 +410,59 @@ def extract_relation_from_llm_output(llm_output, entities_c1, entities_c2):
     x = re.search(r"\{.*?\}", llm_output, re.DOTALL)
     if x is None:
         return None
+    return _validate_relation(x.group(0), entities_c1, entities_c2)
+
+
+def extract_relations_from_llm_output(llm_output, entities_c1, entities_components):
+    """
+    Extract the relations of a list in the llm output, at most one for each component
+
+    Parameters
+    ----------
+    llm_output : str
+        The llm output
+    entities_c1 : list
+        The entities of component1
+    entities_components : list
+        A list of lists, which each contain the entities of another component
+
+    Returns
+    -------
+    list
+        For each of the other components the first relation connecting it to component1
+        as a dictionary, or None
+    """
+    component_by_entity = {
+        entity: i
+        for i, entities in enumerate(entities_components)
+        for entity in entities
+    }
+    relations = [None] * len(entities_components)
+    for x in re.finditer(r"\{.*?\}", llm_output, re.DOTALL):
+        relation = _validate_relation(x.group(0), entities_c1, component_by_entity)
+        if relation is None:
+            continue
+        i = component_by_entity[relation["node_2"]]
+        if relations[i] is None:
+            relations[i] = relation
+
+    return relations
+
+
+def _validate_relation(relation_json, entities_c1, entities_c2):
     try:
-        relation = json.loads(x.group(0))
+        relation = json.loads(relation_json)
     except json.JSONDecodeError:
         return None
+    if not isinstance(relation, dict):
+        return None
     keys = relation.keys()
     if "node_1" not in keys or "node_2" not in keys or "edge" not in keys:
         return None
+    if not isinstance(relation["node_1"], str) or not isinstance(
+        relation["node_2"], str
+    ):
+        return None
     if relation["node_1"] in entities_c1 and relation["node_2"] in entities_c2:
         return relation
     else:
@@ -318,14 +471,15 @@ def extract_relation_from_llm_output(llm_output, entities_c1, entities_c2):
 
 def add_relations_to_data(entity_and_relation_df, new_relations):
     """
-    Add a relation to the table of relations
+    Add relations to the table of relations, relations missing one of the
+    RELATION_COLUMNS are skipped
 
     Parameters
     ----------
     entity_and_relation_df : pandas.dataframe
         Table of nodes and relations between the nodes
-    new_relations : dict
-        A new relation
+    new_relations : list
+        New relations as dictionaries
 
 
     Returns
@@ -334,34 +488,92 @@ def add_relations_to_data(entity_and_relation_df, new_relations):
         The updated dataframe
 
     """
+    valid_relations = []
     for relation in new_relations:
-        try:
-            node_1 = relation["node_1"]
-            node_2 = relation["node_2"]
-            edge = relation["edge"]
-            chunk_id = relation["chunk_id"]
+        if all(relation.get(column) is not None for column in RELATION_COLUMNS):
+            valid_relations.append(
+                {column: relation[column] for column in RELATION_COLUMNS}
+            )
+        else:
+            logger.warning(f"Skipped incomplete relation: {relation}")
 
-            pos = len(entity_and_relation_df.index)
-            entity_and_relation_df.loc[pos] = [node_1, node_2, edge, chunk_id]
-        except ValueError:
-            print(f"Error in add_relations_to_data: ,", node_1, node_2, edge, chunk_id)
-            pass
-    return entity_and_relation_df.dropna()
+    return append_relations(entity_and_relation_df, valid_relations).dropna()
 
 
-def add_topic(data: pd.DataFrame, max_topics: int = 25) -> pd.DataFrame:
+def append_relations(entity_and_relation_df, new_relations):
+    """
+    Append relations to a table of relations with a single concatenation. The new relations
+    need all RELATION_COLUMNS and no columns the table does not have, other columns of the
+    table are left empty.
+
+    Parameters
+    ----------
+    entity_and_relation_df : pandas.dataframe
+        Table of nodes and relations between the nodes
+    new_relations : list or pandas.dataframe
+        New relations as dictionaries or as a table
+
+    Returns
+    -------
+    pandas.dataframe
+        A new table with the old and new relations
+
+    Raises
+    ------
+    ValueError
+        If the new relations do not match the columns of the table
+    """
+    new_relations = pd.DataFrame(new_relations)
+    if new_relations.empty:
+        return entity_and_relation_df
+
+    missing = [c for c in RELATION_COLUMNS if c not in new_relations.columns]
+    unknown = [c for c in new_relations.columns if c not in entity_and_relation_df]
+    if missing or unknown:
+        raise ValueError(
+            f"Relations do not match the relation table, missing columns: {missing}, "
+            f"unknown columns: {unknown}"
+        )
+
+    return pd.concat(
+        [entity_and_relation_df, new_relations], ignore_index=True, sort=False
+    )
+
+
+def add_topic(
+    data: pd.DataFrame,
+    max_topics: int = 25,
+    node_embeddings: NodeEmbeddings = None,
+    backend: TopicBackend = TopicBackend.BERTOPIC,
+) -> pd.DataFrame:
+    """
+    Add the topics of node_1 and node_2 to the table of relations, nodes outside of the
+    max_topics largest topics get the topic "other"
+
+    Parameters
+    ----------
+    data : pandas.dataframe
+        Table of nodes and relations between the nodes
+    max_topics : int, optional
+        Number of topics that are kept
+    node_embeddings : NodeEmbeddings, optional
+        Embeddings of the nodes, computed by the clustering backends if not given
+    backend : TopicBackend, optional
+        How topics are assigned, see topic_backends.assign_topics
+
+    Returns
+    -------
+    pandas.dataframe
+        The table with the columns topic_node_1 and topic_node_2
+    """
     documents = list(set(data["node_1"]).union(set(data["node_2"])))
 
-    topic_model = BERTopic()
-    topics, probabilities = topic_model.fit_transform(documents)
-    topic_info = topic_model.get_topic_info()
+    topics, topic_name_info = assign_topics(
+        documents, backend, max_topics, node_embeddings
+    )
 
     # Keep only the top given number of topics
-    top_topics = topic_model.get_topic_info().head(max_topics)["Topic"].tolist()
-
-    topic_name_info = {
-        row["Topic"]: row["Name"] for _, row in topic_info.iterrows()
-    }
+    top_topics = list(topic_name_info)[:max_topics]
 
     # Create a mapping for "other" topics
     doc_topic_map = {doc: (topic if topic in top_topics else "other") for doc, topic in zip(documents, topics)}
@@ -380,7 +592,243 @@ def add_topic(data: pd.DataFrame, max_topics: int = 25) -> pd.DataFrame:
     return data
 
 
-def connect_with_llm(data, text_chunks, llm_handler, restrict_attempts=-1):
+def normalize_entity_name(entity):
+    """
+    Normalize an entity name for matching: lower case, punctuation and repeated
+    whitespace replaced by a single space
+
+    Parameters
+    ----------
+    entity : str
+        The entity name
+
+    Returns
+    -------
+    str
+        The normalized name
+    """
+    return re.sub(r"[\W_]+", " ", str(entity).lower()).strip()
+
+
+def pre_connect_components(
+    data,
+    methods,
+    similarity_threshold=0.9,
+    model_name=EMBEDDING_MODEL,
+):
+    """
+    Connect graph components with cheap signals before the llm is asked, each method adds
+    relations only between entities of components that are not connected yet
+
+    - name_match: entities with the same normalized name, edge "same as"
+    - chunk_proximity: entities extracted from the same text chunk, edge "text proximity"
+      like connect_with_chunk_proximity
+    - embedding_similarity: entities whose name embeddings have a cosine similarity of at
+      least similarity_threshold, edge "similar to"
+
+    Parameters
+    ----------
+    data : pandas.dataframe
+        Table of nodes and relations between the nodes
+    methods : list
+        The PreConnectionMethods to apply in the given order
+    similarity_threshold : float, optional
+        Minimum cosine similarity of two entities for embedding_similarity
+    model_name : str, optional
+        SentenceTransformer model embedding the entity names for embedding_similarity
+
+    Returns
+    -------
+    pandas.dataframe, dict
+        A table of the old and new relations
+        The number of components each method connected
+    """
+    counts = {str(method): 0 for method in methods}
+    if not methods or data.empty:
+        return data, counts
+
+    entities = extract_entity_set(data)
+    entities_dict, relations_list = index_entity_relation_table(data, entities)
+    components = extract_components(relations_list)
+    entity_chunks_list = get_entities_by_chunk(data, entities_dict)
+    reverse_entities_dict = {v: k for k, v in entities_dict.items()}
+
+    component_by_entity = {
+        entity: i for i, component in enumerate(components) for entity in component
+    }
+    # first chunk of each entity, the chunk of relations between entities of different chunks
+    chunk_by_entity = {}
+    for chunk_id, chunk_entities in entity_chunks_list.items():
+        for entity in chunk_entities:
+            chunk_by_entity.setdefault(entity, chunk_id)
+
+    # union-find over the components
+    parents = list(range(len(components)))
+
+    def find(component):
+        while parents[component] != component:
+            parents[component] = parents[parents[component]]
+            component = parents[component]
+        return component
+
+    relations = []
+
+    def link(entity_1, entity_2, edge, chunk_id):
+        root_1 = find(component_by_entity[entity_1])
+        root_2 = find(component_by_entity[entity_2])
+        if root_1 == root_2:
+            return 0
+        parents[root_2] = root_1
+        relations.append(
+            {
+                "node_1": reverse_entities_dict[entity_1],
+                "node_2": reverse_entities_dict[entity_2],
+                "edge": edge,
+                "chunk_id": chunk_id,
+            }
+        )
+        return 1
+
+    connected_entities = sorted(component_by_entity)
+    for method in methods:
+        if method == PreConnectionMethod.NAME_MATCH:
+            entities_by_name = {}
+            for entity in connected_entities:
+                name = normalize_entity_name(reverse_entities_dict[entity])
+                entities_by_name.setdefault(name, []).append(entity)
+            for same_entities in entities_by_name.values():
+                for entity in same_entities[1:]:
+                    counts[method] += link(
+                        same_entities[0], entity, "same as", chunk_by_entity[entity]
+                    )
+
+        elif method == PreConnectionMethod.CHUNK_PROXIMITY:
+            for chunk_id, chunk_entities in entity_chunks_list.items():
+                for entity in chunk_entities[1:]:
+                    counts[method] += link(
+                        chunk_entities[0], entity, "text proximity", chunk_id
+                    )
+
+        elif method == PreConnectionMethod.EMBEDDING_SIMILARITY:
+            for entity_1, entity_2 in _find_similar_entities(
+                [reverse_entities_dict[entity] for entity in connected_entities],
+                similarity_threshold,
+                model_name,
+            ):
+                entity_1 = connected_entities[entity_1]
+                entity_2 = connected_entities[entity_2]
+                counts[method] += link(
+                    entity_1, entity_2, "similar to", chunk_by_entity[entity_2]
+                )
+
+        else:
+            raise ValueError(f"Unknown pre-connection method: {method}")
+
+    logger.info(f"Connected components before asking the llm: {counts}")
+
+    return add_relations_to_data(data, relations), counts
+
+
+def _find_similar_entities(names, similarity_threshold, model_name, block_size=1024):
+    """
+    Pairs of names (as positions) with a cosine similarity of at least similarity_threshold,
+    most similar first
+    """
+    embeddings = model_registry.encode(names, model_name, normalize_embeddings=True)
+    pairs = []
+    for start in range(0, len(names), block_size):
+        similarities = embeddings[start : start + block_size] @ embeddings.T
+        rows, columns = np.nonzero(similarities >= similarity_threshold)
+        rows += start
+        upper = rows < columns
+        for row, column in zip(rows[upper], columns[upper]):
+            pairs.append((similarities[row - start, column], row, column))
+    pairs.sort(key=lambda pair: -pair[0])
+
+    return [(row, column) for _, row, column in pairs]
+
+
+def connect_components_in_batches(
+    attempts_by_component, check_batch, batch_size, on_progress=None
+):
+    """
+    Try to connect components to the main component with batched llm calls. In each round
+    every remaining component is assigned to one of its untried shared chunks, preferring
+    chunks shared by many components, and the components assigned to the same chunk are
+    checked together. Rounds repeat until every component is connected or out of chunks.
+
+    Parameters
+    ----------
+    attempts_by_component : list
+        For each component a list of its shared chunks as tuples of chunk_id and intersections
+    check_batch : callable
+        Called with a chunk_id and the intersections of the components of a batch within that
+        chunk, returns for each of these components a connecting relation or None
+    batch_size : int
+        Maximum number of components checked together
+    on_progress : callable, optional
+        Called with the number of components finished, the number of components connected
+        and the number of all components, after each round
+
+    Returns
+    -------
+    list
+        For each component its connecting relation, or None
+    """
+    untried = [dict(attempts) for attempts in attempts_by_component]
+    relations = [None] * len(untried)
+    pending = [i for i in range(len(untried)) if untried[i]]
+
+    while pending:
+        # rank chunks by the number of remaining components that share them
+        chunk_counts = {}
+        for i in pending:
+            for chunk_id in untried[i]:
+                chunk_counts[chunk_id] = chunk_counts.get(chunk_id, 0) + 1
+        components_by_chunk = {}
+        for i in pending:
+            chunk_id = max(untried[i], key=chunk_counts.get)
+            components_by_chunk.setdefault(chunk_id, []).append(i)
+
+        batches = [
+            (chunk_id, components[start : start + batch_size])
+            for chunk_id, components in components_by_chunk.items()
+            for start in range(0, len(components), batch_size)
+        ]
+        batch_relations = map_concurrently(
+            lambda batch: check_batch(
+                batch[0], [untried[i][batch[0]] for i in batch[1]]
+            ),
+            batches,
+        )
+
+        for (chunk_id, components), results in zip(batches, batch_relations):
+            for i, relation in zip(components, results):
+                if relation is not None:
+                    relations[i] = relation
+                    untried[i] = {}
+                else:
+                    del untried[i][chunk_id]
+        pending = [i for i in pending if untried[i]]
+
+        if on_progress is not None:
+            connected = sum(relation is not None for relation in relations)
+            on_progress(len(untried) - len(pending), connected, len(untried))
+
+    return relations
+
+
+def connect_with_llm(
+    data,
+    text_chunks,
+    llm_handler,
+    restrict_attempts=-1,
+    on_progress=None,
+    with_topics=True,
+    max_attempts_per_component=CONNECTION_ATTEMPTS_PER_COMPONENT,
+    batch_connections=False,
+    max_llm_calls=None,
+):
     """
     Connect the pieces of the knowlege graph by extracting new relations between disjoint
     graph pieces from the text chunks using the llm
@@ -391,6 +839,19 @@ def connect_with_llm(data, text_chunks, llm_handler, restrict_attempts=-1):
         Table of nodes and relations between the nodes
     text_chunks : list
         A list of dictionaries containing the text chunks
+    on_progress : callable, optional
+        Called with the number of components tried, the number of components
+        connected and the number of components to try, after each component
+    with_topics : bool, optional
+        Add the topics of the nodes to the table, see add_topic
+    max_attempts_per_component : int, optional
+        Number of shared chunks of one component that are tried at the same time,
+        the attempts of a component are cancelled once one of them succeeds
+    batch_connections : bool, optional
+        Check all components that share a chunk with one llm call,
+        see connect_components_in_batches
+    max_llm_calls : int, optional
+        Budget of llm calls, components that are not tried within it stay unconnected
 
     Returns
     -------
@@ -412,56 +873,94 @@ def connect_with_llm(data, text_chunks, llm_handler, restrict_attempts=-1):
     # sort existing components by length
     components.sort(reverse=True, key=len)
     reverse_entities_dict = {v: k for k, v in entities_dict.items()}
+    chunk_index = ChunkIndex(entity_chunks_list, components)
 
-    # try connecting small components to the biggest component
-    connections = 0
-    llm_calls = 0
-    connecting_relations = []
+    # try connecting small components to the biggest component, the components are
+    # tried concurrently and the shared chunks of each component one after another
     connect_components = len(components) if restrict_attempts < 0 else restrict_attempts
+    attempts_by_component = []
     for i in range(1, connect_components):
-        main_component = components[0]
-        current_component = components[i]
+        sharedChunks, intersections = chunk_index.get_shared_chunks(0, i)
+        attempts_by_component.append(
+            [
+                (key_shared_chunk, intersections[key_shared_chunk])
+                for key_shared_chunk in sharedChunks
+            ]
+        )
 
-        sharedChunks, intersections = get_shared_chunks_by_component(
-            main_component, current_component, entity_chunks_list
+    llm_calls = CallBudget(max_llm_calls)
+
+    def try_connection(attempt):
+        if not llm_calls.acquire():
+            return None
+        key_shared_chunk, chunk_intersections = attempt
+        main_chunk_entities = translate_entity_list(
+            chunk_intersections["c1"], reverse_entities_dict
+        )
+        current_chunk_entities = translate_entity_list(
+            chunk_intersections["c2"], reverse_entities_dict
         )
 
-        # try to find new connection within each chunk
-        for key_shared_chunk in sharedChunks:
-            chunk_intersections = intersections[key_shared_chunk]
-            main_chunk_entities = chunk_intersections["c1"]
-            current_chunk_entities = chunk_intersections["c2"]
-            main_chunk_entities = translate_entity_list(
-                main_chunk_entities, reverse_entities_dict
-            )
-            current_chunk_entities = translate_entity_list(
-                current_chunk_entities, reverse_entities_dict
-            )
+        # make call to llm with chunk and the entities of both components from that chunk
+        text_chunk = text_chunks[int(key_shared_chunk)]
 
-            # make call to llm with chunk and the entities of both components from that chunk
-            text_chunk = text_chunks[int(key_shared_chunk)]
+        connecting_relation = llm_handler.check_for_connecting_relation(
+            text_chunk["page_content"], main_chunk_entities, current_chunk_entities
+        )
 
-            connecting_relation = llm_handler.check_for_connecting_relation(
-                text_chunk["page_content"], main_chunk_entities, current_chunk_entities
-            )
-            llm_calls += 1
+        relation = extract_relation_from_llm_output(
+            connecting_relation, main_chunk_entities, current_chunk_entities
+        )
 
-            relation = extract_relation_from_llm_output(
-                connecting_relation, main_chunk_entities, current_chunk_entities
-            )
+        # if relation is extracted than a valid relation containing only existing entities can be added
+        if relation is not None:
+            relation["chunk_id"] = key_shared_chunk
+        return relation
+
+    def try_batch(key_shared_chunk, intersections):
+        if not llm_calls.acquire():
+            return [None] * len(intersections)
+        main_chunk_entities = translate_entity_list(
+            intersections[0]["c1"], reverse_entities_dict
+        )
+        chunk_entities_components = [
+            translate_entity_list(intersection["c2"], reverse_entities_dict)
+            for intersection in intersections
+        ]
+        text_chunk = text_chunks[int(key_shared_chunk)]
+
+        connecting_relations = llm_handler.check_for_connecting_relations(
+            text_chunk["page_content"], main_chunk_entities, chunk_entities_components
+        )
 
-            # if relation is extracted than a valid relation containing only existing entities can be added
+        relations = extract_relations_from_llm_output(
+            connecting_relations, main_chunk_entities, chunk_entities_components
+        )
+        for relation in relations:
             if relation is not None:
                 relation["chunk_id"] = key_shared_chunk
-                connecting_relations.append(relation)
-                connections += 1
-                break
+        return relations
+
+    if batch_connections:
+        relations = connect_components_in_batches(
+            attempts_by_component, try_batch, CONNECTION_BATCH_SIZE, on_progress
+        )
+    else:
+        relations = first_success_concurrently(
+            try_connection,
+            attempts_by_component,
+            max_attempts_per_item=max_attempts_per_component,
+            on_done=on_progress,
+        )
+    connecting_relations = [relation for relation in relations if relation is not None]
+    connections = len(connecting_relations)
 
     logger.info(
-        f"Made {connections} new connections and thereby reduced the graph "
-        f"to {number_components - connections} components "
+        f"Made {connections} new connections with {llm_calls.used} llm calls and thereby "
+        f"reduced the graph to {number_components - connections} components "
     )
     data = add_relations_to_data(data, connecting_relations)
-    data = add_topic(data)
+    if with_topics:
+        data = add_topic(data)
 
     return data
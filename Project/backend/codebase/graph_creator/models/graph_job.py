@@ -1,6 +1,6 @@
 import uuid
 
-from sqlalchemy import Column, String, Uuid
+from sqlalchemy import JSON, Column, String, Uuid
 
 from common.models import TrackedModel, Base
 
@@ -18,3 +18,8 @@ class GraphJob(Base, TrackedModel):
     name = Column(String, nullable=False)
     location = Column(String, nullable=False)
     status = Column(String, nullable=False)
+    options = Column(JSON, nullable=True)
+    # current stage of a running graph job with its start time and counters
+    progress = Column(JSON, nullable=True)
+    # SHA-256 of the uploaded document, graph jobs of identical documents share it
+    content_hash = Column(String(64), nullable=True, index=True)
@@ -0,0 +1,26 @@
+import uuid
+
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Uuid
+
+from common.models import TrackedModel, Base
+
+
+class GraphJobQueueItem(Base, TrackedModel):
+    """Class for representing a table for graph jobs
+    that are waiting for or in graph creation"""
+
+    # Define the table name
+    __tablename__ = "graph_job_queue"
+    __table_args__ = {"extend_existing": True}
+
+    # Define the columns
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
+    graph_job_id = Column(
+        Uuid,
+        ForeignKey("graph_job.id", ondelete="CASCADE"),
+        nullable=False,
+        unique=True,
+    )
+    claimed_by = Column(String, nullable=True)
+    locked_until = Column(DateTime(timezone=True), nullable=True, index=True)
+    attempts = Column(Integer, nullable=False, default=0)
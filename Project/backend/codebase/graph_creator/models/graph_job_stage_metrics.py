@@ -0,0 +1,41 @@
+import uuid
+
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    Integer,
+    String,
+    Uuid,
+)
+
+from common.models import TrackedModel, Base
+
+
+class GraphJobStageMetrics(Base, TrackedModel):
+    """Class for representing a table for the time and
+    resources each stage of a graph job needed"""
+
+    # Define the table name
+    __tablename__ = "graph_job_stage_metrics"
+    __table_args__ = {"extend_existing": True}
+
+    # Define the columns
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
+    graph_job_id = Column(
+        Uuid,
+        ForeignKey("graph_job.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    stage = Column(String, nullable=False)
+    started_at = Column(DateTime(timezone=True), nullable=False)
+    # seconds
+    wall_time = Column(Float, nullable=False)
+    cpu_time = Column(Float, nullable=False)
+    # bytes, of the whole process
+    peak_rss = Column(BigInteger, nullable=False)
+    llm_calls = Column(Integer, nullable=False, default=0)
+    llm_tokens = Column(Integer, nullable=False, default=0)
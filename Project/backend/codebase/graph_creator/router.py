@@ -1,25 +1,41 @@
 import json
 import logging
-import os
 import uuid
-from typing import Optional
+from typing import List, Optional
 
 from fastapi import APIRouter, Depends
 from fastapi import UploadFile, File, HTTPException
-from starlette.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, StreamingResponse
 
 from graph_creator.embedding_handler import embeddings_handler
 from graph_creator.schemas.graph_query import QueryRequest
-import graph_creator.graph_creator_main as graph_creator_main
 from graph_creator.dao.graph_job_dao import GraphJobDAO
-from graph_creator.schemas.graph_job import GraphJobCreate
+from graph_creator.dao.graph_job_queue_dao import GraphJobQueueDAO
+from graph_creator.dao.graph_job_stage_metrics_dao import GraphJobStageMetricsDAO
+from graph_creator.schemas.graph_job import (
+    GraphJobCreate,
+    GraphJobOptions,
+    GraphJobStageMetricsResponse,
+)
 from graph_creator.schemas.graph_vis import (
     GraphVisData,
     QueryInputData,
     GraphQueryOutput,
 )
+from graph_creator.services.checkpoint_store import CheckpointStore
+from graph_creator.services.document_store import (
+    DocumentStore,
+    DocumentTooLarge,
+    get_document_store,
+)
+from graph_creator.services.graph_job_runner import (
+    GraphJobRunner,
+    get_graph_job_runner,
+)
 from graph_creator.services.netx_graphdb import NetXGraphDB
 from graph_creator.services.query_graph import GraphQuery
+from graph_creator.services.search_index_cache import search_index_cache
 from graph_creator.utils.const import GraphStatus, AllowedUploadFileFormat
 from graph_analysis.graph_analysis import analyze_graph_structure
 
@@ -32,72 +48,59 @@ logger = logging.getLogger(__name__)
 # Endpoint for uploading PDF documents
 @router.post("/upload/")
 async def upload_pdf(
-    file: UploadFile = File(...), graph_job_dao: GraphJobDAO = Depends()
+    file: UploadFile = File(...),
+    graph_job_dao: GraphJobDAO = Depends(),
+    document_store: DocumentStore = Depends(get_document_store),
 ):
     """
-    Uploads a PDF document.
+    Uploads a PDF document. Documents are streamed to disk and stored by the hash
+    of their content, so uploading an identical document again does not store a second copy.
 
     Args:
         file (UploadFile): PDF document to be uploaded.
         graph_job_dao (GraphJobDAO):
+        document_store (DocumentStore): Content-addressed storage of the documents
 
     Returns:
         dict: A dictionary containing the filename and status.
             id (uuid.UUID): Id of the uploaded file
             filename (str): Name of the uploaded file.
             location (str): Location of the uploaded file.
+            content_hash (str): SHA-256 hash of the uploaded file.
             status (str): Status message of the file.
 
     Raises:
-        HTTPException: If the uploaded file type is not valid (not PDF).
+        HTTPException: If the uploaded file type is not valid (not PDF) or the file is too large.
     """
 
     # Check if the uploaded file type is correct
     if file.content_type not in AllowedUploadFileFormat.get_list_of_formats():
         raise HTTPException(status_code=400, detail="Uploaded file is not a PDF.")
 
-    # Define the directory for saving files
-    documents_directory = os.path.join(
-        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".media/documents"
-    )
-    if not os.path.exists(documents_directory):
-        os.makedirs(documents_directory)
-
-    # Define file path
-    file_path = os.path.join(documents_directory, file.filename)
-
-    # Check if file with the same name exists
-    if os.path.isfile(file_path):
-        raise HTTPException(
-            status_code=400,
-            detail=f"File with name '{file.filename}' has already been uploaded.",
-        )
-
     # Save file
-    with open(file_path, "wb") as f:
-        f.write(file.file.read())
-    logger.info(f" Uploaded file is saved here {file_path}")
-
-    graph_job = GraphJobCreate(
-        name=file.filename, location=file_path, status=GraphStatus.DOC_UPLOADED
-    )
-    # Check if graph job exists
-    existing_graph_job = await graph_job_dao.get_graph_job_by_name(graph_job.name)
-
-    # If graph job exists raise error
-    if existing_graph_job:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Graph job with name '{graph_job.name}' has already been added.",
+    try:
+        temp_path, content_hash = await document_store.receive(file)
+    except DocumentTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+    # Create a record in the database, the stored document of an identical upload
+    # must not be deleted with its last graph job in between
+    async with document_store.lock_async(content_hash):
+        file_path = await document_store.commit(temp_path, content_hash, file.filename)
+        logger.info(f" Uploaded file is saved here {file_path}")
+        graph_job = GraphJobCreate(
+            name=file.filename,
+            location=file_path,
+            status=GraphStatus.DOC_UPLOADED,
+            content_hash=content_hash,
         )
-
-    # Create a record in the database
-    graph_job = await graph_job_dao.create_graph_job_model(graph_job=graph_job)
+        graph_job = await graph_job_dao.create_graph_job_model(graph_job=graph_job)
 
     return {
         "id": graph_job.id,
         "file_name": graph_job.name,
         "file_location": graph_job.location,
+        "content_hash": graph_job.content_hash,
         "status": graph_job.status,
     }
 
@@ -146,6 +149,69 @@ async def read_graph_job_by_id(
     return graph_job
 
 
+@router.get("/graph_jobs/{graph_job_id}/events")
+async def stream_graph_job_events(
+    graph_job_id: uuid.UUID,
+    graph_job_dao: GraphJobDAO = Depends(),
+    graph_job_runner: GraphJobRunner = Depends(get_graph_job_runner),
+):
+    """
+    Streams the status and progress of a graph job as server-sent events,
+    until its graph is ready or failed.
+
+    Args:
+        graph_job_id (uuid.UUID): ID of the graph job
+        graph_job_dao (GraphJobDAO):
+        graph_job_runner (GraphJobRunner): Worker pool reporting the progress
+
+    Returns:
+        StreamingResponse: `progress` events with the id, status and progress of the graph job.
+
+    Raises:
+        HTTPException: If there is no graph job with the given ID.
+    """
+    graph_job = await graph_job_dao.get_graph_job_by_id(graph_job_id)
+    if graph_job is None:
+        raise HTTPException(status_code=404, detail="Graph job not found")
+
+    return StreamingResponse(
+        graph_job_runner.stream_progress(graph_job_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get(
+    "/graph_jobs/{graph_job_id}/metrics",
+    response_model=List[GraphJobStageMetricsResponse],
+)
+async def read_graph_job_metrics(
+    graph_job_id: uuid.UUID,
+    graph_job_dao: GraphJobDAO = Depends(),
+    stage_metrics_dao: GraphJobStageMetricsDAO = Depends(),
+) -> List[GraphJobStageMetricsResponse]:
+    """
+    Reads the time and resources each stage of a graph job needed. A stage appears
+    once per run, e.g. again if a failed graph job was resumed.
+
+    Args:
+        graph_job_id (uuid.UUID): ID of the graph job
+        graph_job_dao (GraphJobDAO):
+        stage_metrics_dao (GraphJobStageMetricsDAO):
+
+    Returns:
+        list(GraphJobStageMetricsResponse): Wall time, cpu time, peak rss, llm calls and
+            llm tokens of each stage, in the order the stages started.
+
+    Raises:
+        HTTPException: If there is no graph job with the given ID.
+    """
+    graph_job = await graph_job_dao.get_graph_job_by_id(graph_job_id)
+    if graph_job is None:
+        raise HTTPException(status_code=404, detail="Graph job not found")
+    return await stage_metrics_dao.get_stage_metrics(graph_job_id)
+
+
 @router.get("/graph_jobs/name/{graph_job_name}")
 async def read_graph_job_by_name(
     graph_job_name: str, graph_job_dao: GraphJobDAO = Depends()
@@ -178,53 +244,86 @@ async def delete_graph_job(
     graph_job_id: uuid.UUID,
     graph_job_dao: GraphJobDAO = Depends(),
     netx_services: NetXGraphDB = Depends(),
+    document_store: DocumentStore = Depends(get_document_store),
 ):
     """
-    Delete a graph job with the given name
+    Delete a graph job with the given name. Its document is deleted with the last graph
+    job referring to it, uploads of and graph reuses for an identical document wait.
 
     Args:
         graph_job_id (uuid.UUID): ID of the graph job
         graph_job_dao (GraphJobDAO):
         netx_services (NetXGraphDB):
+        document_store (DocumentStore): Content-addressed storage of the documents
 
     Raises:
-        HTTPException: If there is no graph job with the given name.
+        HTTPException: If there is no graph job with the given name or its graph is being created.
     """
     graph_job = await graph_job_dao.get_graph_job_by_id(graph_job_id)
     if graph_job is None:
         raise HTTPException(status_code=404, detail="Graph job not found")
+    if graph_job.status in GraphStatus.get_list_of_in_progress():
+        raise HTTPException(
+            status_code=400,
+            detail="Graph job cannot be deleted while its graph is being created",
+        )
     graph_job_id = graph_job.id
-    await graph_job_dao.delete_graph_job(graph_job)
-    netx_services.delete_graph(graph_job_id)
-    graphEmbeddingsHandler = embeddings_handler(graph_job, lazyLoad=True)
-    graphEmbeddingsHandler.delete_embeddings()
+    async with document_store.lock_async(graph_job.content_hash):
+        await graph_job_dao.delete_graph_job(graph_job)
+        netx_services.delete_graph(graph_job_id)
+        graphEmbeddingsHandler = embeddings_handler(graph_job, lazyLoad=True)
+        graphEmbeddingsHandler.delete_embeddings()
+    search_index_cache.invalidate(graph_job_id)
+    CheckpointStore(graph_job_id).clear()
 
 
 
 @router.post("/create_graph/{graph_job_id}")
 async def create_graph(
     graph_job_id: uuid.UUID,
+    options: Optional[GraphJobOptions] = None,
     graph_job_dao: GraphJobDAO = Depends(),
+    graph_job_queue_dao: GraphJobQueueDAO = Depends(),
+    graph_job_runner: GraphJobRunner = Depends(get_graph_job_runner),
 ):
+    """
+    Queues the graph creation for a graph job. The graph is created in the
+    background, its progress can be polled via the status of the graph job.
+
+    Args:
+        graph_job_id (uuid.UUID): ID of the graph job
+        options (GraphJobOptions): Options of the graph creation, e.g. to bypass the llm cache
+        graph_job_dao (GraphJobDAO):
+        graph_job_queue_dao (GraphJobQueueDAO):
+        graph_job_runner (GraphJobRunner): Worker pool running the graph creation
+
+    Returns:
+        dict: The id and the status of the queued graph job.
+
+    Raises:
+        HTTPException: If there is no graph job with the given ID or its graph cannot be created.
+    """
     g_job = await graph_job_dao.get_graph_job_by_id(graph_job_id)
 
     if not g_job:
         raise HTTPException(status_code=404, detail="Graph job not found")
-    if g_job.status != GraphStatus.DOC_UPLOADED:
+
+    # trigger graph creation, the status is only changed if the graph job can be queued
+    queued = await graph_job_queue_dao.queue_graph_job(
+        g_job.id, (options or GraphJobOptions()).model_dump()
+    )
+    if not queued:
         raise HTTPException(
             status_code=400,
-            detail=f"Graph job status is not `{GraphStatus.DOC_UPLOADED}`",
+            detail=f"Graph job status is not `{GraphStatus.DOC_UPLOADED}` or `{GraphStatus.FAILED}`",
         )
+    # a search index of an earlier graph is outdated
+    search_index_cache.invalidate(g_job.id)
+    graph_job_runner.notify()
 
-    # trigger graph creation
-    graph_creator_main.process_file_to_graph(g_job)
-
-    g_job.status = GraphStatus.GRAPH_READY
-    graph_job_dao.session.add(g_job)
-    await graph_job_dao.session.commit()
     return JSONResponse(
-        content={"id": str(g_job.id), "status": GraphStatus.GRAPH_READY},
-        status_code=201,
+        content={"id": str(g_job.id), "status": GraphStatus.QUEUED},
+        status_code=202,
     )
 
 
@@ -340,11 +439,14 @@ async def query_graph(
     user_query = request.query
     #print(f"Received query: {user_query}")
 
-    graphEmbeddingsHandler = embeddings_handler(g_job)
+    # the search index of the graph is loaded once and cached
+    graphEmbeddingsHandler = await run_in_threadpool(search_index_cache.get, g_job)
 
     if graphEmbeddingsHandler.is_embedded():
         #do search
-        result = graphEmbeddingsHandler.search_graph(user_query, k=4)
+        result = await run_in_threadpool(
+            graphEmbeddingsHandler.search_graph, user_query, k=4
+        )
         #print(result)
         answer = json.dumps(result)
     else:
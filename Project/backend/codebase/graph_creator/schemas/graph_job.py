@@ -1,18 +1,82 @@
 import uuid
+from datetime import datetime
+from typing import List, Optional
 
 from pydantic import BaseModel, ConfigDict
 
+from graph_creator.utils.const import (
+    DedupMethod,
+    PipelineStage,
+    PreConnectionMethod,
+    TopicBackend,
+)
+
 
 class GraphJobBase(BaseModel):
     name: str
     location: str
     status: str
+    content_hash: Optional[str] = None
 
 
 class GraphJobCreate(GraphJobBase):
     pass
 
 
+class GraphJobOptions(BaseModel):
+    """Options of a graph job, chosen when its graph creation is triggered."""
+
+    use_llm_cache: bool = True
+    # reuse the graph of an identical document instead of creating it again
+    reuse_existing_graph: bool = True
+    # continue after the last stage a previous run of the job completed
+    resume_from_checkpoints: bool = True
+    # check all graph components sharing a text chunk with one llm call
+    batch_connection_checks: bool = False
+    # cheap signals connecting graph components before the llm is asked, in this order
+    pre_connection_methods: List[PreConnectionMethod] = [PreConnectionMethod.NAME_MATCH]
+    # minimum cosine similarity of two entity names for the embedding_similarity method
+    pre_connection_similarity_threshold: float = 0.9
+    # budget of llm calls for connecting graph components, unlimited if None
+    max_connection_llm_calls: Optional[int] = None
+    # how topics are assigned to the nodes, auto chooses by the number of nodes
+    topic_backend: TopicBackend = TopicBackend.AUTO
+    # how duplicate nodes are found, auto chooses by the number of nodes
+    dedup_method: DedupMethod = DedupMethod.AUTO
+
+    def get_stage_options(self, stage: PipelineStage) -> dict:
+        """
+        Options changing the output of a stage, its checkpoint is reused only with them.
+        """
+        return self.model_dump(mode="json", include=set(STAGE_OPTIONS.get(stage, [])))
+
+
+# options changing the output of each checkpointed stage
+STAGE_OPTIONS = {
+    PipelineStage.CONNECTED: [
+        "batch_connection_checks",
+        "pre_connection_methods",
+        "pre_connection_similarity_threshold",
+        "max_connection_llm_calls",
+    ],
+    PipelineStage.TOPICS: ["topic_backend"],
+    PipelineStage.MERGED: ["dedup_method"],
+}
+
+
 class GraphJobResponse(GraphJobBase):
     id: uuid.UUID
     model_config = ConfigDict(from_attributes=True)
+
+
+class GraphJobStageMetricsResponse(BaseModel):
+    """Time and resources one stage of a graph job needed."""
+
+    stage: str
+    started_at: datetime
+    wall_time: float
+    cpu_time: float
+    peak_rss: int
+    llm_calls: int
+    llm_tokens: int
+    model_config = ConfigDict(from_attributes=True)
@@ -0,0 +1,156 @@
+import json
+import logging
+import os
+import shutil
+import tempfile
+import uuid
+
+import pandas as pd
+
+from graph_creator.utils.const import PipelineStage
+from settings.defaults import GRAPH_JOBS_DIRECTORY
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class CheckpointStore:
+    """
+    Persists the output of each stage of the graph creation under the storage
+    directory of a graph job, so a failed or restarted job resumes from its last
+    completed stage instead of repeating all llm calls.
+    Outputs are stored as json and written atomically, a checkpoint either
+    exists completely or not at all. The options a stage was run with are stored
+    next to its output, an output of other options is discarded with the outputs
+    of all later stages.
+    """
+
+    def __init__(
+        self, graph_job_id: uuid.UUID, jobs_directory: str = GRAPH_JOBS_DIRECTORY
+    ):
+        self.graph_job_id = graph_job_id
+        self.job_directory = os.path.join(jobs_directory, str(graph_job_id))
+
+    def has(self, stage: PipelineStage, options: dict = None) -> bool:
+        """
+        Check if the output of a stage is stored, with the given options if any.
+        """
+        if not os.path.isfile(self._get_path(stage)):
+            return False
+        return options is None or self._load_options(stage) == _to_json(options)
+
+    def save(self, stage: PipelineStage, data, options: dict = None):
+        """
+        Store the output of a stage, a DataFrame or json serializable data, and the
+        options it was created with.
+        """
+        if isinstance(data, pd.DataFrame):
+            content = data.to_json(orient="records", force_ascii=False)
+        else:
+            content = json.dumps(data, ensure_ascii=False, default=str)
+
+        os.makedirs(self.job_directory, exist_ok=True)
+        # the options are written before the output, an output stored without its
+        # options is treated as created with other options
+        self._write(self._get_options_path(stage), json.dumps(_to_json(options or {})))
+        self._write(self._get_path(stage), content)
+
+    def load(self, stage: PipelineStage):
+        """
+        Load the stored output of a stage as json data.
+        """
+        with open(self._get_path(stage), encoding="utf-8") as f:
+            return json.load(f)
+
+    def load_dataframe(self, stage: PipelineStage) -> pd.DataFrame:
+        """
+        Load the stored output of a stage as DataFrame, values keep their json types.
+        """
+        return pd.DataFrame(self.load(stage))
+
+    def load_or_run(
+        self,
+        stage: PipelineStage,
+        run,
+        as_dataframe: bool = False,
+        options: dict = None,
+    ):
+        """
+        Load the stored output of a stage, or run the stage and store its output.
+
+        Args:
+            stage (PipelineStage): The stage.
+            run (callable): Computes the output of the stage.
+            as_dataframe (bool): Load a stored output as DataFrame.
+            options (dict, optional): Options changing the output of the stage, a stored
+                output of other options is discarded with the outputs of all later stages.
+
+        Returns:
+            The output of the stage.
+        """
+        options = options or {}
+        if self.has(stage, options):
+            logger.info(f"Graph job {self.graph_job_id} resumes after stage `{stage}`")
+            return self.load_dataframe(stage) if as_dataframe else self.load(stage)
+        if self.has(stage):
+            logger.info(
+                f"Graph job {self.graph_job_id} runs stage `{stage}` and the later "
+                "stages again with changed options"
+            )
+            self.discard_from(stage)
+        output = run()
+        self.save(stage, output, options)
+        return output
+
+    def discard_from(self, stage: PipelineStage):
+        """
+        Delete the stored outputs of a stage and of all later stages.
+        """
+        stages = list(PipelineStage)
+        for later_stage in stages[stages.index(stage) :]:
+            for path in [
+                self._get_path(later_stage),
+                self._get_options_path(later_stage),
+            ]:
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def copy_from(self, source: "CheckpointStore"):
+        """
+        Copy the stored outputs of another graph job, e.g. of an identical document.
+        """
+        if os.path.isdir(source.job_directory):
+            shutil.copytree(
+                source.job_directory, self.job_directory, dirs_exist_ok=True
+            )
+
+    def clear(self):
+        """
+        Delete all stored outputs of the graph job.
+        """
+        shutil.rmtree(self.job_directory, ignore_errors=True)
+
+    def _get_path(self, stage: PipelineStage) -> str:
+        return os.path.join(self.job_directory, f"{stage}.json")
+
+    def _get_options_path(self, stage: PipelineStage) -> str:
+        return os.path.join(self.job_directory, f"{stage}.options.json")
+
+    def _load_options(self, stage: PipelineStage):
+        try:
+            with open(self._get_options_path(stage), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _write(self, path: str, content: str):
+        with tempfile.NamedTemporaryFile(
+            "w", dir=self.job_directory, suffix=".part", delete=False, encoding="utf-8"
+        ) as temp_file:
+            temp_file.write(content)
+        os.replace(temp_file.name, path)
+
+
+def _to_json(options: dict):
+    # options as they are compared after being stored, e.g. enums as strings
+    return json.loads(json.dumps(options, default=str))
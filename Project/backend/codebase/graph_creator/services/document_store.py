@@ -0,0 +1,180 @@
+import fcntl
+import hashlib
+import os
+import tempfile
+from contextlib import asynccontextmanager, contextmanager
+
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+
+from settings.defaults import DOCUMENTS_DIRECTORY, UPLOAD_MAX_BYTES
+
+# bytes read from an upload at once while it is hashed and written
+READ_CHUNK_SIZE = 1024 * 1024
+
+
+class DocumentTooLarge(Exception):
+    """Raised if an uploaded document exceeds the maximum upload size."""
+
+    def __init__(self, max_size_bytes: int):
+        super().__init__(
+            f"Uploaded file is larger than {max_size_bytes // (1024 * 1024)} MB."
+        )
+        self.max_size_bytes = max_size_bytes
+
+
+class DocumentStore:
+    """
+    Content-addressed storage of uploaded documents. A document is stored under the
+    SHA-256 hash of its bytes, so identical uploads are stored once whatever their
+    file name is, and documents with the same name but different content do not clash.
+    A stored document is shared by the graph jobs of identical uploads, storing it and
+    creating a graph job, deleting a graph job and its document, and reusing the graph
+    of an identical document are serialized by a lock per content hash.
+    """
+
+    def __init__(
+        self,
+        documents_directory: str = DOCUMENTS_DIRECTORY,
+        max_size_bytes: int = UPLOAD_MAX_BYTES,
+    ):
+        self.documents_directory = documents_directory
+        self.max_size_bytes = max_size_bytes
+
+    def get_location(self, content_hash: str, filename: str) -> str:
+        """
+        Location of a stored document, the extension of the file name is kept
+        because the file handler picks the document loader by it.
+        """
+        extension = os.path.splitext(filename)[1].lower()
+        return os.path.join(self.documents_directory, f"{content_hash}{extension}")
+
+    async def save(self, upload: UploadFile) -> tuple[str, str]:
+        """
+        Store an uploaded document, see receive and commit.
+
+        Args:
+            upload (UploadFile): The uploaded document.
+
+        Returns:
+            tuple[str, str]: The location of the stored document and its content hash.
+
+        Raises:
+            DocumentTooLarge: If the document exceeds the maximum upload size.
+        """
+        temp_path, content_hash = await self.receive(upload)
+        async with self.lock_async(content_hash):
+            location = await self.commit(temp_path, content_hash, upload.filename)
+        return location, content_hash
+
+    async def receive(self, upload: UploadFile) -> tuple[str, str]:
+        """
+        Write an uploaded document to a temporary file. It is streamed to disk in bounded
+        chunks and hashed on the fly, blocking file operations run in the thread pool.
+
+        Args:
+            upload (UploadFile): The uploaded document.
+
+        Returns:
+            tuple[str, str]: The path of the temporary file and the content hash.
+
+        Raises:
+            DocumentTooLarge: If the document exceeds the maximum upload size.
+        """
+        if upload.size is not None and upload.size > self.max_size_bytes:
+            raise DocumentTooLarge(self.max_size_bytes)
+
+        await run_in_threadpool(os.makedirs, self.documents_directory, exist_ok=True)
+        temp_file = await run_in_threadpool(
+            tempfile.NamedTemporaryFile,
+            dir=self.documents_directory,
+            suffix=".part",
+            delete=False,
+        )
+        content_hash = hashlib.sha256()
+        size = 0
+        try:
+            with temp_file:
+                while chunk := await upload.read(READ_CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > self.max_size_bytes:
+                        raise DocumentTooLarge(self.max_size_bytes)
+                    content_hash.update(chunk)
+                    await run_in_threadpool(temp_file.write, chunk)
+        except BaseException:
+            await run_in_threadpool(os.remove, temp_file.name)
+            raise
+
+        return temp_file.name, content_hash.hexdigest()
+
+    async def commit(self, temp_path: str, content_hash: str, filename: str) -> str:
+        """
+        Move a received document to its location, callers hold the lock of its content
+        hash until a graph job refers to it.
+
+        Returns:
+            str: The location of the stored document.
+        """
+        location = self.get_location(content_hash, filename)
+        await run_in_threadpool(self._commit, temp_path, location)
+        return location
+
+    @staticmethod
+    def _commit(temp_path: str, location: str):
+        if os.path.isfile(location):
+            # an identical document is already stored
+            os.remove(temp_path)
+        else:
+            os.replace(temp_path, location)
+
+    @contextmanager
+    def lock(self, content_hash: str):
+        """
+        Lock of the documents with the given content hash, shared by all threads and
+        processes of one machine. Graph jobs without a content hash are not locked.
+        """
+        lock_file = self._lock(content_hash) if content_hash else None
+        try:
+            yield
+        finally:
+            if lock_file is not None:
+                lock_file.close()
+
+    @asynccontextmanager
+    async def lock_async(self, content_hash: str):
+        """
+        Lock of the documents with the given content hash for the event loop, it is
+        acquired in the thread pool.
+        """
+        lock_file = (
+            await run_in_threadpool(self._lock, content_hash) if content_hash else None
+        )
+        try:
+            yield
+        finally:
+            if lock_file is not None:
+                lock_file.close()
+
+    def _lock(self, content_hash: str):
+        # lock files are kept beside the documents, they are never deleted because
+        # deleting a lock file races with processes waiting for it
+        locks_directory = f"{self.documents_directory.rstrip(os.sep)}.locks"
+        os.makedirs(locks_directory, exist_ok=True)
+        lock_file = open(os.path.join(locks_directory, f"{content_hash}.lock"), "w")
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        return lock_file
+
+    @staticmethod
+    def delete(location: str):
+        """
+        Delete a stored document, callers make sure no graph job refers to it anymore.
+        """
+        if os.path.exists(location):
+            os.remove(location)
+
+
+def get_document_store() -> DocumentStore:
+    """
+    Get the document store of uploaded documents.
+    """
+    return DocumentStore()
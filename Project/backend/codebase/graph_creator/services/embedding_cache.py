@@ -0,0 +1,240 @@
+import hashlib
+import os
+import threading
+import time
+import unicodedata
+
+import numpy as np
+
+from graph_creator.services.model_registry import model_registry
+from graph_creator.utils.sqlite_store import SqliteStore
+from settings.defaults import (
+    EMBEDDING_CACHE_DIRECTORY,
+    EMBEDDING_CACHE_MAX_BYTES,
+    EMBEDDING_MODEL,
+)
+
+# sqlite limits the number of parameters of one statement
+QUERY_BATCH_SIZE = 500
+
+
+class EmbeddingCache(SqliteStore):
+    """
+    Persistent cache of text embeddings shared by all graph jobs and searches, keyed by
+    model and a hash of the normalized text. The embeddings of each model are kept in a
+    memory-mapped float32 matrix, the rows of the keys in a SQLite index. Each matrix
+    holds at most max_size_bytes, the rows of the least recently used keys are reused
+    once it is full. Writes and reads of rows happen inside a transaction of the index,
+    so the cache can be shared by all threads and processes of one machine.
+    """
+
+    def __init__(
+        self,
+        directory: str = EMBEDDING_CACHE_DIRECTORY,
+        max_size_bytes: int = EMBEDDING_CACHE_MAX_BYTES,
+    ):
+        super().__init__(os.path.join(directory, "index.sqlite3"))
+        self.directory = directory
+        self.max_size_bytes = max_size_bytes
+        self.matrices = {}
+        self.matrices_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stats_lock = threading.Lock()
+
+        with self.transaction() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS embedding_matrix ("
+                "model TEXT PRIMARY KEY, dimensions INTEGER NOT NULL, "
+                "capacity INTEGER NOT NULL)"
+            )
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS embedding ("
+                "key TEXT PRIMARY KEY, model TEXT NOT NULL, row INTEGER NOT NULL, "
+                "last_used REAL NOT NULL)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS ix_embedding_model_last_used "
+                "ON embedding (model, last_used)"
+            )
+
+    @staticmethod
+    def get_key(model: str, text: str) -> str:
+        """
+        Cache key of a text, texts differing only in unicode normalization or
+        whitespace share a key.
+        """
+        text = " ".join(unicodedata.normalize("NFC", str(text)).split())
+        return hashlib.sha256("\0".join([model, text]).encode("utf-8")).hexdigest()
+
+    def encode(self, texts, model: str, encode) -> np.ndarray:
+        """
+        Embeddings of the texts, only texts missing in the cache are encoded.
+
+        Args:
+            texts (list): The texts.
+            model (str): The name of the model.
+            encode (callable): Encodes a list of texts with the model.
+
+        Returns:
+            np.ndarray: The embedding of each text, one row per text.
+        """
+        texts = list(texts)
+        if not texts:
+            return encode(texts, model)
+        keys = [self.get_key(model, text) for text in texts]
+        text_by_key = dict(zip(keys, texts))
+        embeddings = self.get(model, list(text_by_key))
+
+        missing = [key for key in text_by_key if key not in embeddings]
+        if missing:
+            encoded = np.asarray(
+                encode([text_by_key[key] for key in missing], model), dtype=np.float32
+            )
+            self.put(model, missing, encoded)
+            embeddings.update(zip(missing, encoded))
+
+        with self.stats_lock:
+            self.hits += len(text_by_key) - len(missing)
+            self.misses += len(missing)
+        return np.stack([embeddings[key] for key in keys])
+
+    def get(self, model: str, keys: list) -> dict:
+        """
+        Get the cached embeddings of the keys found.
+        """
+        with self.transaction() as connection:
+            rows = self._get_rows(connection, keys)
+            if not rows:
+                return {}
+            now = time.time()
+            connection.executemany(
+                "UPDATE embedding SET last_used = ? WHERE key = ?",
+                [(now, key) for key in rows],
+            )
+            # copy the rows before other writers may reuse them
+            vectors = np.array(self._get_matrix(connection, model)[list(rows.values())])
+        return dict(zip(rows, vectors))
+
+    def put(self, model: str, keys: list, embeddings: np.ndarray):
+        """
+        Store embeddings and reuse the rows of least recently used keys if needed.
+        The rows are written once the index holds the new keys, a failed write
+        leaves neither the new keys nor the evicted keys in the index.
+        """
+        error = None
+        with self.transaction() as connection:
+            matrix = self._get_matrix(connection, model, embeddings.shape[1])
+            # keys stored by another process meanwhile are skipped,
+            # more embeddings than fit are not stored
+            stored = self._get_rows(connection, keys)
+            new = [i for i, key in enumerate(keys) if key not in stored][: len(matrix)]
+            keys, embeddings = [keys[i] for i in new], embeddings[new]
+            used = connection.execute(
+                "SELECT COUNT(*) FROM embedding WHERE model = ?", (model,)
+            ).fetchone()[0]
+            rows = list(range(used, min(used + len(keys), len(matrix))))
+            if len(rows) < len(keys):
+                evicted = connection.execute(
+                    "SELECT key, row FROM embedding WHERE model = ? "
+                    "ORDER BY last_used LIMIT ?",
+                    (model, len(keys) - len(rows)),
+                ).fetchall()
+                connection.executemany(
+                    "DELETE FROM embedding WHERE key = ?",
+                    [(key,) for key, _ in evicted],
+                )
+                rows += [row for _, row in evicted]
+
+            now = time.time()
+            connection.executemany(
+                "INSERT INTO embedding (key, model, row, last_used) VALUES (?, ?, ?, ?)",
+                [(key, model, row, now) for key, row in zip(keys, rows)],
+            )
+            try:
+                matrix[rows] = embeddings
+                matrix.flush()
+            except Exception as e:
+                # the evicted rows may be partly overwritten, so the eviction is
+                # committed without the new keys instead of being rolled back
+                connection.executemany(
+                    "DELETE FROM embedding WHERE key = ?", [(key,) for key in keys]
+                )
+                error = e
+        if error is not None:
+            raise error
+
+    def get_stats(self) -> dict:
+        with self.stats_lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+    @staticmethod
+    def _get_rows(connection, keys: list) -> dict:
+        rows = {}
+        for start in range(0, len(keys), QUERY_BATCH_SIZE):
+            batch = keys[start : start + QUERY_BATCH_SIZE]
+            rows.update(
+                connection.execute(
+                    "SELECT key, row FROM embedding WHERE key IN "
+                    f"({', '.join('?' * len(batch))})",
+                    batch,
+                ).fetchall()
+            )
+        return rows
+
+    def _get_matrix(self, connection, model: str, dimensions: int = None) -> np.memmap:
+        with self.matrices_lock:
+            matrix = self.matrices.get(model)
+            if matrix is not None:
+                return matrix
+            path = os.path.join(
+                self.directory, hashlib.sha256(model.encode("utf-8")).hexdigest()[:16]
+            )
+            row = connection.execute(
+                "SELECT dimensions, capacity FROM embedding_matrix WHERE model = ?",
+                (model,),
+            ).fetchone()
+            if row is None:
+                capacity = max(self.max_size_bytes // (4 * dimensions), 1)
+                connection.execute(
+                    "INSERT INTO embedding_matrix (model, dimensions, capacity) "
+                    "VALUES (?, ?, ?)",
+                    (model, dimensions, capacity),
+                )
+                matrix = np.memmap(
+                    f"{path}.f32", np.float32, "w+", shape=(capacity, dimensions)
+                )
+            else:
+                dimensions, capacity = row
+                matrix = np.memmap(
+                    f"{path}.f32", np.float32, "r+", shape=(capacity, dimensions)
+                )
+            self.matrices[model] = matrix
+            return matrix
+
+
+embedding_cache = None
+embedding_cache_lock = threading.Lock()
+
+
+def get_embedding_cache():
+    """
+    The embedding cache of the process, None if it is disabled.
+    """
+    global embedding_cache
+    if EMBEDDING_CACHE_MAX_BYTES <= 0:
+        return None
+    with embedding_cache_lock:
+        if embedding_cache is None:
+            embedding_cache = EmbeddingCache()
+        return embedding_cache
+
+
+def encode(sentences, model_name: str = EMBEDDING_MODEL) -> np.ndarray:
+    """
+    Encode sentences with a model of the model registry, cached across documents.
+    """
+    cache = get_embedding_cache()
+    if cache is None:
+        return model_registry.encode(sentences, model_name)
+    return cache.encode(sentences, model_name, model_registry.encode)
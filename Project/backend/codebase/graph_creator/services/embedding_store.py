@@ -0,0 +1,245 @@
+import argparse
+import fcntl
+import json
+import logging
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# pickles of the search state written before the store existed
+PICKLE_FILES = ["faiss_index", "embedding_dict", "merged_nodes", "node_to_merged"]
+
+
+class EmbeddingStore:
+    """
+    Search state of one graph: the embedding of each original node and the merged node
+    of each original node, coded as the position of the representative node. It is
+    stored as a float32 .npy matrix and an int32 .npy vector, which are memory-mapped
+    when loaded, so the OS page cache shares them between all processes searching the
+    graph. The nearest nodes are searched exactly on the memory-mapped matrix, a faiss
+    flat index would hold a second copy of the embeddings in the heap of each process.
+    Each save writes a new version directory, a manifest names the current version.
+    """
+
+    def __init__(self, nodes, embeddings: np.ndarray, merged: np.ndarray):
+        """
+        Args:
+            nodes (list): The original nodes.
+            embeddings (np.ndarray): The embedding of each node, one row per node.
+            merged (np.ndarray): Position of the merged (representative) node of each node.
+        """
+        # numpy scalars are not json serializable
+        self.nodes = [
+            node.item() if isinstance(node, np.generic) else node for node in nodes
+        ]
+        self.embeddings = embeddings
+        self.merged = merged
+        # squared norms of the embeddings, computed on the first search
+        self.squared_norms = None
+
+    @classmethod
+    def from_mapping(
+        cls, nodes, embeddings: np.ndarray, node_to_merged: dict
+    ) -> "EmbeddingStore":
+        """
+        Store of nodes and their merged nodes given as dictionary of node to merged node.
+        """
+        position = {node: i for i, node in enumerate(nodes)}
+        merged = np.array(
+            [position[node_to_merged[node]] for node in nodes], dtype=np.int32
+        )
+        return cls(nodes, np.asarray(embeddings, dtype=np.float32), merged)
+
+    def get_node_to_merged(self) -> dict:
+        """
+        Dictionary of each original node to its merged node.
+        """
+        return {node: self.nodes[m] for node, m in zip(self.nodes, self.merged)}
+
+    def get_merged_nodes(self) -> dict:
+        """
+        Dictionary of each merged node to its original nodes in node order.
+        """
+        merged_nodes = {}
+        for node, m in zip(self.nodes, self.merged):
+            merged_nodes.setdefault(self.nodes[m], []).append(node)
+        return merged_nodes
+
+    def search(self, query_embedding: np.ndarray, k: int) -> np.ndarray:
+        """
+        Positions of the k nodes nearest to the query by L2 distance, nearest first and
+        the first node on ties, as the flat L2 index of faiss finds them.
+        """
+        k = min(k, len(self.nodes))
+        if k <= 0:
+            return np.array([], dtype=int)
+        if self.squared_norms is None:
+            self.squared_norms = np.einsum("ij,ij->i", self.embeddings, self.embeddings)
+        query = np.asarray(query_embedding, dtype=np.float32)
+        # the squared norm of the query is the same for all nodes and left out
+        distances = self.squared_norms - 2 * (self.embeddings @ query)
+        nearest = np.argpartition(distances, k - 1)[:k]
+        return nearest[np.lexsort((nearest, distances[nearest]))]
+
+    def get_cluster(self, node_position: int) -> np.ndarray:
+        """
+        Positions of the original nodes merged into the same node as the given node.
+        """
+        return np.flatnonzero(self.merged == self.merged[node_position])
+
+    def get_memory(self) -> int:
+        """
+        Estimated bytes of the store in memory, memory-mapped pages included.
+        """
+        return (
+            self.embeddings.nbytes
+            + self.merged.nbytes
+            + sum(sys.getsizeof(node) for node in self.nodes)
+        )
+
+    def save(self, directory: str, prefix: str):
+        """
+        Write the store into a new version directory and switch the manifest of the graph
+        to it, readers and crashes see either the previous or the new store completely.
+        Older versions are deleted, the previous one is kept for readers still opening it.
+        """
+        os.makedirs(directory, exist_ok=True)
+        previous_version = EmbeddingStore.get_version(directory, prefix)
+        # directories being written end with .part and are not deleted by other writers
+        part_directory = tempfile.mkdtemp(
+            dir=directory, prefix=f"{prefix}_", suffix=".part"
+        )
+        try:
+            _write_array(
+                os.path.join(part_directory, "embeddings.npy"),
+                np.asarray(self.embeddings, dtype=np.float32),
+            )
+            _write_array(os.path.join(part_directory, "merged.npy"), self.merged)
+            _write_json(os.path.join(part_directory, "nodes.json"), self.nodes)
+        except BaseException:
+            shutil.rmtree(part_directory, ignore_errors=True)
+            raise
+        version_directory = part_directory[: -len(".part")]
+        os.rename(part_directory, version_directory)
+
+        version = os.path.basename(version_directory)
+        manifest_file, manifest_part = tempfile.mkstemp(dir=directory, suffix=".part")
+        os.close(manifest_file)
+        _write_json(manifest_part, {"version": version})
+        os.replace(manifest_part, _get_manifest_path(directory, prefix))
+
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if (
+                name.startswith(f"{prefix}_")
+                and not name.endswith(".part")
+                and name not in [version, previous_version]
+                and os.path.isdir(path)
+            ):
+                shutil.rmtree(path, ignore_errors=True)
+
+    @classmethod
+    def load(cls, directory: str, prefix: str) -> "EmbeddingStore":
+        """
+        Load the current version of a store, the embeddings and merged nodes are
+        memory-mapped.
+        """
+        version = cls.get_version(directory, prefix)
+        if version is None:
+            raise FileNotFoundError(f"No embedding store in {directory}")
+        version_directory = os.path.join(directory, version)
+        with open(os.path.join(version_directory, "nodes.json"), encoding="utf-8") as f:
+            nodes = json.load(f)
+        return cls(
+            nodes,
+            np.load(os.path.join(version_directory, "embeddings.npy"), mmap_mode="r"),
+            np.load(os.path.join(version_directory, "merged.npy"), mmap_mode="r"),
+        )
+
+    @staticmethod
+    def exists(directory: str, prefix: str) -> bool:
+        version = EmbeddingStore.get_version(directory, prefix)
+        return version is not None and os.path.isdir(os.path.join(directory, version))
+
+    @staticmethod
+    def get_version(directory: str, prefix: str):
+        """
+        Current version of a store, it changes whenever the store is saved again, None
+        if there is no store.
+        """
+        try:
+            with open(_get_manifest_path(directory, prefix), encoding="utf-8") as f:
+                return json.load(f)["version"]
+        except FileNotFoundError:
+            return None
+
+
+def migrate_pickles(directory: str, prefix: str) -> bool:
+    """
+    Convert the pickled search state of a graph into a store and delete the pickles.
+    Only the embeddings and the merged node of each node are needed. Processes
+    migrating the same graph at once are serialized by a lock file, the later ones
+    find the pickles gone.
+
+    Returns:
+        bool: If pickles were migrated.
+    """
+    paths = {
+        name: os.path.join(directory, f"{prefix}_{name}.pkl") for name in PICKLE_FILES
+    }
+    if not all(os.path.isfile(path) for path in paths.values()):
+        return False
+    with open(os.path.join(directory, f"{prefix}_migration.lock"), "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        if not all(os.path.isfile(path) for path in paths.values()):
+            return False
+        with open(paths["embedding_dict"], "rb") as f:
+            embedding_dict = pickle.load(f)
+        with open(paths["node_to_merged"], "rb") as f:
+            node_to_merged = pickle.load(f)
+
+        nodes = list(embedding_dict)
+        embeddings = np.stack([embedding_dict[node] for node in nodes])
+        EmbeddingStore.from_mapping(nodes, embeddings, node_to_merged).save(
+            directory, prefix
+        )
+        # the store is complete, the pickles can go in any order
+        for path in paths.values():
+            os.remove(path)
+    logger.info(f"Migrated pickled embeddings of graph {prefix}")
+    return True
+
+
+def _get_manifest_path(directory: str, prefix: str) -> str:
+    return os.path.join(directory, f"{prefix}_store.json")
+
+
+def _write_array(path: str, array: np.ndarray):
+    with open(path, "wb") as f:
+        np.save(f, array)
+
+
+def _write_json(path: str, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Migrate the pickled embeddings of all graphs to embedding stores."
+    )
+    parser.add_argument("--directory", default=".media/embeddings")
+    args = parser.parse_args()
+
+    for graph_id in sorted(os.listdir(args.directory)):
+        try:
+            migrate_pickles(os.path.join(args.directory, graph_id), graph_id)
+        except Exception:
+            logger.exception(f"Migration of the embeddings of graph {graph_id} failed")
@@ -0,0 +1,107 @@
+import json
+import threading
+import time
+from datetime import datetime, timezone
+
+from graph_creator.models.graph_job import GraphJob
+from settings.defaults import GRAPH_PROGRESS_INTERVAL
+
+
+class GraphJobProgress:
+    """
+    Progress of a running graph job: its current stage with the start time and the
+    counters the pipeline reports for that stage, e.g. chunks_extracted of chunks_total.
+    Counters are reported from worker threads, updates within `interval` seconds are
+    coalesced so the database is not written for every single llm call. Coalesced
+    counters are published once the interval expired or their stage finished.
+    """
+
+    def __init__(self, publish, interval: float = GRAPH_PROGRESS_INTERVAL):
+        """
+        Args:
+            publish (callable): Called with a copy of the progress whenever it is published.
+            interval (float): Minimum seconds between two published counter updates.
+        """
+        self.publish = publish
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.started_at = datetime.now(timezone.utc).isoformat()
+        self.state = {}
+        self.published_at = 0.0
+        # publishes the pending counters once the interval expired
+        self.timer = None
+
+    def start_stage(self, stage: str) -> dict:
+        """
+        Start a stage with empty counters and return its progress, which is
+        persisted together with the status of the graph job. Pending counters of
+        the previous stage are published first.
+        """
+        with self.lock:
+            self._publish_pending()
+            self.state = {
+                "stage": str(stage),
+                "started_at": self.started_at,
+                "stage_started_at": datetime.now(timezone.utc).isoformat(),
+            }
+            self.published_at = time.monotonic()
+            return with_elapsed(self.state)
+
+    def update(self, **counters):
+        """
+        Update counters of the current stage, published at most every `interval` seconds.
+        """
+        with self.lock:
+            self.state.update(counters)
+            remaining = self.published_at + self.interval - time.monotonic()
+            if remaining > 0:
+                if self.timer is None:
+                    self.timer = threading.Timer(remaining, self.flush)
+                    self.timer.daemon = True
+                    self.timer.start()
+                return
+            self._publish()
+
+    def flush(self):
+        """
+        Publish the counters coalesced since the last publish, e.g. when the pipeline ended.
+        """
+        with self.lock:
+            self._publish_pending()
+
+    def _publish_pending(self):
+        if self.timer is not None:
+            self._publish()
+
+    def _publish(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        self.published_at = time.monotonic()
+        # published under the lock, so updates reach the database in order
+        self.publish(with_elapsed(self.state))
+
+
+def with_elapsed(progress: dict) -> dict:
+    """
+    Copy of a progress with the seconds elapsed since its stage started.
+    """
+    progress = dict(progress or {})
+    if "stage_started_at" in progress:
+        stage_started_at = datetime.fromisoformat(progress["stage_started_at"])
+        progress["stage_elapsed"] = round(
+            (datetime.now(timezone.utc) - stage_started_at).total_seconds(), 1
+        )
+    return progress
+
+
+def to_server_sent_event(g_job: GraphJob) -> str:
+    """
+    Server-sent event with the status and the progress of a graph job.
+    """
+    data = {
+        "id": str(g_job.id),
+        "status": g_job.status,
+        "progress": with_elapsed(g_job.progress) if g_job.progress else None,
+    }
+    return f"event: progress\ndata: {json.dumps(data)}\n\n"
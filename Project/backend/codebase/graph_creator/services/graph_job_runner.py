@@ -0,0 +1,319 @@
+import asyncio
+import functools
+import logging
+import os
+import socket
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from starlette.requests import Request
+
+import graph_creator.graph_creator_main as graph_creator_main
+from graph_creator.dao.graph_job_dao import GraphJobDAO
+from graph_creator.dao.graph_job_queue_dao import GraphJobQueueDAO
+from graph_creator.dao.graph_job_stage_metrics_dao import GraphJobStageMetricsDAO
+from graph_creator.models.graph_job import GraphJob
+from graph_creator.models.graph_job_queue import GraphJobQueueItem
+from graph_creator.schemas.graph_job import GraphJobOptions
+from graph_creator.services.graph_job_progress import (
+    GraphJobProgress,
+    to_server_sent_event,
+)
+from graph_creator.utils.const import GraphStatus
+from settings.defaults import (
+    GRAPH_JOB_LEASE_SECONDS,
+    GRAPH_JOB_MAX_ATTEMPTS,
+    GRAPH_JOB_POLL_INTERVAL,
+    GRAPH_JOB_WORKERS,
+    GRAPH_PROGRESS_INTERVAL,
+)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class GraphJobRunner:
+    """
+    Runs graph creation jobs from the graph job queue in a managed worker pool,
+    so that the long running pipeline does not block the event loop of the API.
+    Several runners (in the API and in worker.py processes) can share one queue.
+    The current stage of a job is written to its status in the database,
+    the progress within the stage to its progress.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker,
+        max_workers: int = None,
+        worker_name: str = None,
+        poll_interval: float = GRAPH_JOB_POLL_INTERVAL,
+        lease_seconds: int = GRAPH_JOB_LEASE_SECONDS,
+    ):
+        self.session_factory = session_factory
+        self.max_workers = GRAPH_JOB_WORKERS if max_workers is None else max_workers
+        self.worker_name = worker_name or f"{socket.gethostname()}-{os.getpid()}"
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.executor = ThreadPoolExecutor(
+            max_workers=max(self.max_workers, 1),
+            thread_name_prefix="graph_job",
+        )
+        self.consumers = []
+        self.stopping = None
+        self.wakeup = None
+        # per graph job, set whenever this runner persisted progress of the job
+        self.progress_events = {}
+
+    def start(self):
+        """
+        Start consuming the graph job queue with `max_workers` parallel jobs.
+        """
+        self.stopping = asyncio.Event()
+        self.wakeup = asyncio.Event()
+        self.consumers = [
+            asyncio.create_task(self._consume(f"{self.worker_name}-{i}"))
+            for i in range(self.max_workers)
+        ]
+
+    async def serve(self):
+        """
+        Consume the graph job queue until the runner is shut down.
+        """
+        self.start()
+        await asyncio.gather(*self.consumers, return_exceptions=True)
+
+    def notify(self):
+        """
+        Wake up idle consumers, e.g. after a graph job was queued.
+        """
+        if self.wakeup is not None:
+            self.wakeup.set()
+
+    async def shutdown(self):
+        """
+        Stop claiming jobs and wait for the running ones to finish.
+        """
+        if self.stopping is not None:
+            self.stopping.set()
+            self.wakeup.set()
+            await asyncio.gather(*self.consumers, return_exceptions=True)
+        self.executor.shutdown(wait=True)
+
+    async def _consume(self, consumer_name: str):
+        while not self.stopping.is_set():
+            try:
+                async with self.session_factory() as session:
+                    item = await GraphJobQueueDAO(session).claim_next(
+                        consumer_name, self.lease_seconds
+                    )
+            except Exception:
+                logger.exception("Could not claim a graph job from the queue")
+                item = None
+
+            if item is None:
+                self.wakeup.clear()
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            try:
+                await self.process_item(item)
+            except Exception:
+                logger.exception(
+                    f"Could not process graph job {item.graph_job_id} from the queue"
+                )
+
+    async def process_item(self, item: GraphJobQueueItem):
+        """
+        Create the graph of a claimed queue item and remove the item afterwards.
+        If the graph job could not be run or its status not be persisted, e.g. on a
+        database error, the item is released and retried up to GRAPH_JOB_MAX_ATTEMPTS
+        times, its graph job is failed afterwards.
+        """
+        heartbeat = asyncio.create_task(self._heartbeat(item.id))
+        try:
+            if item.attempts > GRAPH_JOB_MAX_ATTEMPTS:
+                logger.error(
+                    f"Graph job {item.graph_job_id} was abandoned {item.attempts - 1} times"
+                )
+                await self._set_status(item.graph_job_id, GraphStatus.FAILED)
+            else:
+                await self.run_graph_job(item.graph_job_id)
+        except Exception:
+            logger.exception(
+                f"Graph job {item.graph_job_id} could not be processed, it is retried"
+            )
+            # the lease runs out if the item cannot be released either
+            async with self.session_factory() as session:
+                await GraphJobQueueDAO(session).release(item.id)
+            return
+        finally:
+            heartbeat.cancel()
+
+        async with self.session_factory() as session:
+            await GraphJobQueueDAO(session).remove(item.id)
+
+    async def run_graph_job(self, graph_job_id: uuid.UUID):
+        """
+        Run the graph creation pipeline of a graph job in the worker pool.
+        The graph of an identical document is reused if one is ready.
+        """
+        loop = asyncio.get_running_loop()
+
+        async with self.session_factory() as session:
+            g_job = await GraphJobDAO(session).get_graph_job_by_id(graph_job_id)
+        if g_job is None:
+            logger.warning(f"Graph job {graph_job_id} vanished before it was run")
+            return
+
+        source_g_job = await self._get_reusable_graph_job(g_job)
+        if source_g_job is not None:
+            logger.info(
+                f"Graph job {graph_job_id} reuses the graph of graph job {source_g_job.id}"
+            )
+            pipeline = functools.partial(graph_creator_main.reuse_graph, source_g_job)
+        else:
+            pipeline = graph_creator_main.process_file_to_graph
+
+        # progress and status updates are persisted one after the other in order
+        write_lock = asyncio.Lock()
+
+        async def persist(status: GraphStatus = None, progress: dict = None):
+            async with write_lock:
+                try:
+                    await self._set_status(graph_job_id, status, progress)
+                except Exception:
+                    if status is not None:
+                        raise
+                    logger.exception(
+                        f"Could not persist progress of graph job {graph_job_id}"
+                    )
+
+        def publish(progress: dict):
+            # called from worker threads, persisting is not awaited
+            asyncio.run_coroutine_threadsafe(persist(progress=progress), loop)
+
+        progress = GraphJobProgress(publish, GRAPH_PROGRESS_INTERVAL)
+
+        def on_status(status: GraphStatus):
+            # called from the worker thread, persist the stage on the event loop
+            asyncio.run_coroutine_threadsafe(
+                persist(status, progress.start_stage(status)), loop
+            ).result()
+
+        def on_metrics(metrics: dict):
+            # called from the worker thread once a stage finished
+            asyncio.run_coroutine_threadsafe(
+                self._add_stage_metrics(graph_job_id, metrics), loop
+            ).result()
+
+        def run_pipeline(*args):
+            try:
+                pipeline(*args, on_progress=progress.update, on_metrics=on_metrics)
+            finally:
+                # coalesced counters reach the database before the final status
+                progress.flush()
+
+        try:
+            await loop.run_in_executor(self.executor, run_pipeline, g_job, on_status)
+        except Exception:
+            logger.exception(f"Graph creation failed for graph job {graph_job_id}")
+            await persist(GraphStatus.FAILED, progress.start_stage(GraphStatus.FAILED))
+            return
+
+        await persist(
+            GraphStatus.GRAPH_READY, progress.start_stage(GraphStatus.GRAPH_READY)
+        )
+
+    async def wait_for_progress(self, graph_job_id: uuid.UUID, timeout: float):
+        """
+        Wait until this runner persisted progress of the graph job, at most `timeout` seconds.
+        """
+        event = self.progress_events.setdefault(graph_job_id, asyncio.Event())
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def stream_progress(self, graph_job_id: uuid.UUID):
+        """
+        Server-sent events with the status and progress of a graph job until it is
+        no longer in progress. Events are sent right away for jobs run by this runner,
+        progress of jobs run by other workers is read from the database every poll interval.
+        """
+        while True:
+            async with self.session_factory() as session:
+                g_job = await GraphJobDAO(session).get_graph_job_by_id(graph_job_id)
+            if g_job is None:
+                return
+            yield to_server_sent_event(g_job)
+            if g_job.status not in GraphStatus.get_list_of_in_progress():
+                return
+            await self.wait_for_progress(graph_job_id, self.poll_interval)
+
+    async def _get_reusable_graph_job(self, g_job: GraphJob):
+        options = GraphJobOptions(**(g_job.options or {}))
+        if not options.reuse_existing_graph or g_job.content_hash is None:
+            return None
+        async with self.session_factory() as session:
+            return await GraphJobDAO(session).get_ready_graph_job_by_content_hash(
+                g_job.content_hash, exclude_id=g_job.id
+            )
+
+    async def _heartbeat(self, item_id: uuid.UUID):
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                async with self.session_factory() as session:
+                    await GraphJobQueueDAO(session).extend_lease(
+                        item_id, self.lease_seconds
+                    )
+            except Exception:
+                logger.exception(f"Could not extend the lease of queue item {item_id}")
+
+    async def _add_stage_metrics(self, graph_job_id: uuid.UUID, metrics: dict):
+        try:
+            async with self.session_factory() as session:
+                await GraphJobStageMetricsDAO(session).add_stage_metrics(
+                    graph_job_id, metrics
+                )
+        except Exception:
+            logger.exception(
+                f"Could not store stage metrics of graph job {graph_job_id}"
+            )
+        logger.info(
+            f"Graph job {graph_job_id} finished stage `{metrics['stage']}` in "
+            f"{metrics['wall_time']:.1f}s"
+        )
+
+    async def _set_status(
+        self,
+        graph_job_id: uuid.UUID,
+        status: GraphStatus = None,
+        progress: dict = None,
+    ):
+        async with self.session_factory() as session:
+            graph_job_dao = GraphJobDAO(session)
+            g_job = await graph_job_dao.get_graph_job_by_id(graph_job_id)
+            if g_job is None:
+                return
+            if progress is None:
+                await graph_job_dao.update_graph_job_status(g_job, status)
+            else:
+                await graph_job_dao.update_graph_job_progress(g_job, progress, status)
+
+        event = self.progress_events.pop(graph_job_id, None)
+        if event is not None:
+            event.set()
+        if status is not None:
+            logger.info(f"Graph job {graph_job_id} is now `{status}`")
+
+
+def get_graph_job_runner(request: Request) -> GraphJobRunner:
+    """
+    Get the graph job runner of the application.
+    """
+    return request.app.state.graph_job_runner
@@ -1,9 +1,14 @@
 import os
 import logging
+import threading
 from datetime import datetime
 import google.generativeai as genai
 from graph_creator.services.llm.llm_Interface import LlmInterface
+from graph_creator.services.llm.rate_limiter import RateLimiter, estimate_tokens
+from graph_creator.services.llm.response_cache import LlmResponseCache
 from graph_creator.services.json_handler import transform_llm_output_to_dict
+from graph_creator.utils.concurrency import map_concurrently
+from settings.defaults import GEMINI_REQUESTS_PER_MINUTE, GEMINI_TOKENS_PER_MINUTE
 from google.generativeai.types.generation_types import StopCandidateException
 
 
@@ -12,8 +17,17 @@ class gemini(LlmInterface):
     Gemini llm handler
     """
 
-    def __init__(self) -> None:
+    def __init__(self, use_cache: bool = True) -> None:
         super().__init__()
+        self.model_name = "gemini-1.5-flash-latest"
+        self.response_cache = LlmResponseCache() if use_cache else None
+        self.llm_calls = 0
+        self.llm_tokens = 0
+        # connection checks can run concurrently, so the usage is shared between threads
+        self.llm_calls_lock = threading.Lock()
+        self.rate_limiter = RateLimiter(
+            "gemini", GEMINI_REQUESTS_PER_MINUTE, GEMINI_TOKENS_PER_MINUTE
+        )
         self.configure_genai()
         self.genai_client = self.get_genai_client()
 
@@ -30,7 +44,7 @@ class gemini(LlmInterface):
     def get_genai_client(self):
         genai_client = genai.GenerativeModel(
             # model_name="gemini-1.5-pro-latest",
-            model_name="gemini-1.5-flash-latest",
+            model_name=self.model_name,
             safety_settings=[
                 {
                     "category": "HARM_CATEGORY_HARASSMENT",
@@ -76,10 +90,41 @@ class gemini(LlmInterface):
 
     def execute_llm_call(self, chat_session, message):
         """
-        Execute the prompt with the gemini client
+        Execute the prompt with the gemini client and return the text of the response.
+        Responses are served from the llm response cache if the prompt was run before.
         """
+        if self.response_cache is not None:
+            cached_response = self.response_cache.get(
+                "gemini", self.model_name, message
+            )
+            if cached_response is not None:
+                return cached_response
+
+        # only make calls to the llm if the rate limits of gemini allow for it
+        ticket = self.rate_limiter.acquire(estimate_tokens(message))
+        with self.llm_calls_lock:
+            self.llm_calls += 1
         logging.info("Run prompt with gemini")
-        return chat_session.send_message(message)
+        response = chat_session.send_message(message)
+        usage = getattr(response, "usage_metadata", None)
+        if usage is not None:
+            self.rate_limiter.settle(ticket, usage.total_token_count)
+            with self.llm_calls_lock:
+                self.llm_tokens += usage.total_token_count
+
+        if self.response_cache is not None:
+            self.response_cache.put("gemini", self.model_name, message, response.text)
+        return response.text
+
+    def get_cache_stats(self):
+        return self.response_cache.get_stats() if self.response_cache else None
+
+    def get_usage(self):
+        """
+        Number of llm calls made and tokens used, cached responses are not counted
+        """
+        with self.llm_calls_lock:
+            return {"llm_calls": self.llm_calls, "llm_tokens": self.llm_tokens}
 
     def extract_entities_and_relations(self, chunk):
         """
@@ -114,9 +159,7 @@ class gemini(LlmInterface):
 
         chat_session = self.genai_client.start_chat(history=[])
         message = SYS_PROMPT + USER_PROMPT
-        response = self.execute_llm_call(chat_session, message)
-
-        return response.text
+        return self.execute_llm_call(chat_session, message)
 
     def check_for_connecting_relation(
         self, chunk, entities_component_1, entities_component_2
@@ -145,24 +188,64 @@ class gemini(LlmInterface):
         message = SYS_PROMPT + USER_PROMPT
         result = ""
         try:
-            response = self.execute_llm_call(chat_session, message)
-            result = response.text
+            result = self.execute_llm_call(chat_session, message)
         except StopCandidateException as googleException:
             logging.error(googleException)
 
         return result
 
-    def process_chunks(self, chunks):
+    def check_for_connecting_relations(
+        self, chunk, entities_main_component, entities_components
+    ):
         """
-        Process a list of chunks through the generative model.
+        Check for connecting relations between the entities of a main component and each of
+        several other components, all in one prompt.
         """
-        responses = []
+        components = "".join(
+            f"component_{i + 1}: {entities}\n"
+            for i, entities in enumerate(entities_components)
+        )
+        SYS_PROMPT = (
+            "Only answer in JSON format. \n"
+            "Your task is to help create a knowledge graph by extracting relations between any entity of main_component and the entities of each other component.\n"
+            "We want to connect the subgraphs of nodes and relations that were extracted from the given text chunk (delimited by ```)."
+            "For this one more relation needs to be extracted from the given text chunk between any entity of main_component and any entity of each other component:\n"
+            f"main_component: {entities_main_component}\n"
+            f"{components}"
+            "Only use the exact entities given in the lists. Skip a component if the text chunk does not relate it to main_component."
+            "Return at most one connecting relation per component as a list in the following format:\n"
+            "[\n"
+            "    {\n"
+            '        "node_1": "An entity from main_component",\n'
+            '        "node_2": "An entity from the other component",\n'
+            '        "edge": "relationship between the two entities, node_1 and node_2"\n'
+            "    }, {...}\n"
+            "]"
+        )
+        USER_PROMPT = f"text chunk: ```{chunk}``` \n\n output: "
 
-        for chunk in chunks:
-            text_content = chunk["text"]
+        chat_session = self.genai_client.start_chat(history=[])
+        message = SYS_PROMPT + USER_PROMPT
+        result = ""
+        try:
+            result = self.execute_llm_call(chat_session, message)
+        except StopCandidateException as googleException:
+            logging.error(googleException)
 
-            response_json = self.extract_entities_and_relations(text_content)
+        return result
 
-            responses.append(transform_llm_output_to_dict(response_json))
+    def process_chunks(self, chunks, on_progress=None):
+        """
+        Process a list of chunks through the generative model.
+        Chunks are processed concurrently, the responses keep the order of the chunks.
+        on_progress is called with the number of processed chunks and of all chunks.
+        """
+        return map_concurrently(self.process_chunk, chunks, on_done=on_progress)
+
+    def process_chunk(self, chunk):
+        """
+        Extract entities and relations from a single chunk.
+        """
+        response_json = self.extract_entities_and_relations(chunk["text"])
 
-        return responses
+        return transform_llm_output_to_dict(response_json)
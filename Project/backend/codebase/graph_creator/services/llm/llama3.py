@@ -1,10 +1,14 @@
 import os
-import time
+import threading
 from datetime import datetime
 from groq import Groq
 
 from graph_creator.services.llm.llm_Interface import LlmInterface
+from graph_creator.services.llm.rate_limiter import RateLimiter, estimate_tokens
+from graph_creator.services.llm.response_cache import LlmResponseCache
 from graph_creator.services.json_handler import transform_llm_output_to_dict
+from graph_creator.utils.concurrency import map_concurrently
+from settings.defaults import GROQ_REQUESTS_PER_MINUTE, GROQ_TOKENS_PER_MINUTE
 
 
 class llama3(LlmInterface):
@@ -12,27 +16,34 @@ class llama3(LlmInterface):
     Llama3 llm handler that works with the provider groq
     """
 
-    def __init__(self) -> None:
+    def __init__(self, use_cache: bool = True) -> None:
+        self.model_name = "llama3-8b-8192"
+        self.response_cache = LlmResponseCache() if use_cache else None
         self.llm_calls = 0
-        self.llm_rate_limit = 30
-        self.rate_timeout = 60
+        self.llm_tokens = 0
+        # chunks are processed concurrently, so the call count is shared between threads
+        self.llm_calls_lock = threading.Lock()
+        self.rate_limiter = RateLimiter(
+            "groq", GROQ_REQUESTS_PER_MINUTE, GROQ_TOKENS_PER_MINUTE
+        )
 
         self.genai_client = self.configure_groq()
 
     def get_llm_calls(self):
         return self.llm_calls
 
-    def get_llm_rate_limit(self):
-        return self.llm_rate_limit
-
-    def get_rate_timeout(self):
-        return self.rate_timeout
-
-    def reset_llm_call_count(self):
+    def get_usage(self):
         """
-        Reset llm call tracking because groq limits the request rate
+        Number of llm calls made and tokens used, cached responses are not counted
         """
-        self.llm_calls = 0
+        with self.llm_calls_lock:
+            return {"llm_calls": self.llm_calls, "llm_tokens": self.llm_tokens}
+
+    def get_rate_limiter(self):
+        return self.rate_limiter
+
+    def get_cache_stats(self):
+        return self.response_cache.get_stats() if self.response_cache else None
 
     def configure_groq(self):
         """
@@ -60,19 +71,33 @@ class llama3(LlmInterface):
 
     def execute_llm_call(self, message):
         """
-        Execute a prompt with the groq client
+        Execute a prompt with the groq client and return the content of the response.
+        Responses are served from the llm response cache if the prompt was run before.
         """
-        # only make calls to the llm if request rate allows for it
-        if self.llm_calls > 0 and self.llm_calls % self.llm_rate_limit == 0:
-            # wait 60s so that available requests are refreshed
-            time.sleep(self.rate_timeout)
+        if self.response_cache is not None:
+            cached_response = self.response_cache.get("groq", self.model_name, message)
+            if cached_response is not None:
+                return cached_response
+
+        # only make calls to the llm if the rate limits of groq allow for it
+        ticket = self.rate_limiter.acquire(
+            estimate_tokens(*[m["content"] for m in message])
+        )
+        with self.llm_calls_lock:
+            self.llm_calls += 1
         result = self.genai_client.chat.completions.create(
             messages=message,
-            model="llama3-8b-8192",
+            model=self.model_name,
         )
-        self.llm_calls += 1
+        if result.usage is not None:
+            self.rate_limiter.settle(ticket, result.usage.total_tokens)
+            with self.llm_calls_lock:
+                self.llm_tokens += result.usage.total_tokens
 
-        return result
+        content = result.choices[0].message.content
+        if self.response_cache is not None:
+            self.response_cache.put("groq", self.model_name, message, content)
+        return content
 
     def extract_entities_and_relations(self, chunk):
         """
@@ -107,8 +132,7 @@ class llama3(LlmInterface):
             {"role": "system", "content": SYS_PROMPT},
             {"role": "user", "content": USER_PROMPT},
         ]
-        chat_completion = self.execute_llm_call(messages)
-        return chat_completion.choices[0].message.content
+        return self.execute_llm_call(messages)
 
     def check_for_connecting_relation(
         self, chunk, entities_component_1, entities_component_2
@@ -136,20 +160,55 @@ class llama3(LlmInterface):
             {"role": "system", "content": SYS_PROMPT},
             {"role": "user", "content": USER_PROMPT},
         ]
-        chat_completion = self.execute_llm_call(messages)
-        return chat_completion.choices[0].message.content
+        return self.execute_llm_call(messages)
 
-    def process_chunks(self, chunks):
+    def check_for_connecting_relations(
+        self, chunk, entities_main_component, entities_components
+    ):
         """
-        Process a list of chunks through the generative model.
+        Check for connecting relations between the entities of a main component and each of
+        several other components, all in one prompt.
         """
-        responses = []
-
-        for chunk in chunks:
-            text_content = chunk["text"]
+        components = "".join(
+            f"component_{i + 1}: {entities}\n"
+            for i, entities in enumerate(entities_components)
+        )
+        SYS_PROMPT = (
+            "Only answer in JSON format. \n"
+            "Your task is to help create a knowledge graph by extracting relations between any entity of main_component and the entities of each other component.\n"
+            "We want to connect the subgraphs of nodes and relations that were extracted from the given text chunk (delimited by ```)."
+            "For this one more relation needs to be extracted from the given text chunk between any entity of main_component and any entity of each other component:\n"
+            f"main_component: {entities_main_component}\n"
+            f"{components}"
+            "Only use the exact entities given in the lists. Skip a component if the text chunk does not relate it to main_component."
+            "Return at most one connecting relation per component as a list in the following format:\n"
+            "[\n"
+            "    {\n"
+            '        "node_1": "An entity from main_component",\n'
+            '        "node_2": "An entity from the other component",\n'
+            '        "edge": "relationship between the two entities, node_1 and node_2"\n'
+            "    }, {...}\n"
+            "]"
+        )
+        USER_PROMPT = f"text chunk: ```{chunk}``` \n\n output: "
+        messages = [
+            {"role": "system", "content": SYS_PROMPT},
+            {"role": "user", "content": USER_PROMPT},
+        ]
+        return self.execute_llm_call(messages)
 
-            response_json = self.extract_entities_and_relations(text_content)
+    def process_chunks(self, chunks, on_progress=None):
+        """
+        Process a list of chunks through the generative model.
+        Chunks are processed concurrently, the responses keep the order of the chunks.
+        on_progress is called with the number of processed chunks and of all chunks.
+        """
+        return map_concurrently(self.process_chunk, chunks, on_done=on_progress)
 
-            responses.append(transform_llm_output_to_dict(response_json))
+    def process_chunk(self, chunk):
+        """
+        Extract entities and relations from a single chunk.
+        """
+        response_json = self.extract_entities_and_relations(chunk["text"])
 
-        return responses
+        return transform_llm_output_to_dict(response_json)
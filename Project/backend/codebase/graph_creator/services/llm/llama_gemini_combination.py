@@ -1,9 +1,9 @@
-import time
-import logging
 from graph_creator.services.llm.gemini import gemini
 from graph_creator.services.llm.llama3 import llama3
 from graph_creator.services.llm.llm_Interface import LlmInterface
+from graph_creator.services.llm.rate_limiter import estimate_tokens
 from graph_creator.services.json_handler import transform_llm_output_to_dict
+from graph_creator.utils.concurrency import map_concurrently
 
 
 class llama_gemini_combination(LlmInterface):
@@ -11,53 +11,59 @@ class llama_gemini_combination(LlmInterface):
     Class that combines llm handlers for llama3 and gemini
     """
 
-    def __init__(self) -> None:
-        self.gemini = gemini()
-        self.llama3 = llama3()
-        self.start_waiting_time = 0
-        self.currently_waiting = False
+    def __init__(self, use_cache: bool = True) -> None:
+        self.gemini = gemini(use_cache=use_cache)
+        self.llama3 = llama3(use_cache=use_cache)
 
     def orchestrate_llm_calls(self, function, *args):
         """
-        Direct llm calls to groq and llama to achive higher performance (only during graph connection phase)
+        Direct llm calls to groq and gemini to achive higher performance. Extraction waits for the
+        rate limit of groq, connection checks use gemini while the rate limit of groq is exhausted.
         """
-        llama_rate_timeout = self.llama3.get_rate_timeout()
-        if self.currently_waiting:
-            waiting_time = time.time() - self.start_waiting_time
-            if waiting_time > llama_rate_timeout:
-                self.llama3.reset_llm_call_count()
-                self.currently_waiting = False
-
-        llama_rate_limit = self.llama3.get_llm_rate_limit()
-        current_llm_call_count = self.llama3.get_llm_calls()
-
-        # capture waiting time in last call of current rate frame
-        captureTime = current_llm_call_count == llama_rate_limit - 1
-
         match function:
             case self.extract_entities_and_relations:
-                if current_llm_call_count < llama_rate_limit:
-                    result = self.llama3.extract_entities_and_relations(args[0])
-                else:
-                    time.sleep(llama_rate_timeout)
-                    logging.info("Wait 60s until groq allows more requests")
-                    return self.orchestrate_llm_calls(function, args)
+                result = self.llama3.extract_entities_and_relations(args[0])
             case self.check_for_connecting_relation:
-                if current_llm_call_count < llama_rate_limit:
+                llama_rate_limiter = self.llama3.get_rate_limiter()
+                if llama_rate_limiter.wait_time(estimate_tokens(*args)) > 0:
+                    result = self.gemini.check_for_connecting_relation(
+                        args[0], args[1], args[2]
+                    )
+                else:
                     result = self.llama3.check_for_connecting_relation(
                         args[0], args[1], args[2]
                     )
+            case self.check_for_connecting_relations:
+                llama_rate_limiter = self.llama3.get_rate_limiter()
+                if llama_rate_limiter.wait_time(estimate_tokens(*args)) > 0:
+                    result = self.gemini.check_for_connecting_relations(
+                        args[0], args[1], args[2]
+                    )
                 else:
-                    result = self.gemini.check_for_connecting_relation(
+                    result = self.llama3.check_for_connecting_relations(
                         args[0], args[1], args[2]
                     )
 
-        if captureTime:
-            self.start_waiting_time = time.time()
-            self.currently_waiting = True
-
         return result
 
+    def get_cache_stats(self):
+        """
+        Hits and misses of the llm response cache of both handlers, None if the cache is bypassed
+        """
+        llama3_stats = self.llama3.get_cache_stats()
+        gemini_stats = self.gemini.get_cache_stats()
+        if llama3_stats is None or gemini_stats is None:
+            return None
+        return {key: llama3_stats[key] + gemini_stats[key] for key in llama3_stats}
+
+    def get_usage(self):
+        """
+        Number of llm calls made and tokens used by both handlers
+        """
+        llama3_usage = self.llama3.get_usage()
+        gemini_usage = self.gemini.get_usage()
+        return {key: llama3_usage[key] + gemini_usage[key] for key in llama3_usage}
+
     def extract_entities_and_relations(self, chunk):
         """
         Extracts entities and relations from the text chunk
@@ -79,20 +85,35 @@ class llama_gemini_combination(LlmInterface):
             entities_component_2,
         )
 
-    def process_chunks(self, chunks):
+    def check_for_connecting_relations(
+        self, text_chunk, entities_main_component, entities_components
+    ):
         """
-        Itterate over all text chunks and extract entities and relations
+        Tries to connect several graph components to the main component with one llm call. All
+        lists of nodes are from the same text chunk, the llm returns a list of connecting relations.
         """
-        responses = []
-
-        for chunk in chunks:
-            text_content = chunk["text"]
+        return self.orchestrate_llm_calls(
+            self.check_for_connecting_relations,
+            text_chunk,
+            entities_main_component,
+            entities_components,
+        )
 
-            response_json = self.extract_entities_and_relations(text_content)
+    def process_chunks(self, chunks, on_progress=None):
+        """
+        Extract entities and relations from all text chunks.
+        Chunks are processed concurrently, the responses keep the order of the chunks.
+        on_progress is called with the number of processed chunks and of all chunks.
+        """
+        return map_concurrently(self.process_chunk, chunks, on_done=on_progress)
 
-            responses.append(transform_llm_output_to_dict(response_json))
+    def process_chunk(self, chunk):
+        """
+        Extract entities and relations from a single text chunk
+        """
+        response_json = self.extract_entities_and_relations(chunk["text"])
 
-        return responses
+        return transform_llm_output_to_dict(response_json)
 
     def execute_llm_call(self, chat_session, message):
         pass  # not used
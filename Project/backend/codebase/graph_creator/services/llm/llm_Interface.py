@@ -21,5 +21,11 @@ class LlmInterface(ABC):
         pass
 
     @abstractmethod
-    def process_chunks(self, chunks):
+    def check_for_connecting_relations(
+        self, text_chunk, entities_main_component, entities_components
+    ):
+        pass
+
+    @abstractmethod
+    def process_chunks(self, chunks, on_progress=None):
         pass
@@ -0,0 +1,133 @@
+import logging
+import time
+
+from graph_creator.utils.sqlite_store import SqliteStore
+from settings.defaults import LLM_RATE_LIMIT_DB
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class RateLimitExceeded(Exception):
+    """Raised by a non-blocking acquire if the rate limit leaves no capacity."""
+
+    def __init__(self, wait_time: float):
+        super().__init__(
+            f"Rate limit reached, capacity is available in {wait_time:.1f}s"
+        )
+        self.wait_time = wait_time
+
+
+class RateLimiter(SqliteStore):
+    """
+    Sliding window rate limiter for requests and tokens per minute of an llm provider.
+    Calls are recorded in a SQLite database, so one limit is shared by all threads
+    and processes (API and workers) that use the same database file.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        requests_per_minute: int,
+        tokens_per_minute: int = None,
+        db_path: str = LLM_RATE_LIMIT_DB,
+        window: float = 60,
+    ):
+        super().__init__(db_path)
+        self.name = name
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.window = window
+
+        with self.transaction() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS llm_call ("
+                "id INTEGER PRIMARY KEY, limiter TEXT NOT NULL, "
+                "called_at REAL NOT NULL, tokens INTEGER NOT NULL)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS ix_llm_call_limiter_called_at "
+                "ON llm_call (limiter, called_at)"
+            )
+
+    def acquire(self, tokens: int = 0, blocking: bool = True) -> int:
+        """
+        Record a call that is about to be made, waiting until the limits allow for it.
+
+        Args:
+            tokens (int): Estimated number of tokens of the call.
+            blocking (bool): Wait for capacity instead of raising RateLimitExceeded.
+
+        Returns:
+            int: Ticket of the call, used to settle its actual token usage.
+        """
+        while True:
+            ticket, wait_time = self._try_acquire(tokens)
+            if ticket is not None:
+                return ticket
+            if not blocking:
+                raise RateLimitExceeded(wait_time)
+            logger.info(f"Rate limit of {self.name} reached, waiting {wait_time:.1f}s")
+            time.sleep(wait_time)
+
+    def settle(self, ticket: int, tokens: int):
+        """
+        Replace the estimated tokens of a call with its actual token usage.
+        """
+        with self.transaction() as connection:
+            connection.execute(
+                "UPDATE llm_call SET tokens = ? WHERE id = ?", (tokens, ticket)
+            )
+
+    def wait_time(self, tokens: int = 0) -> float:
+        """
+        Seconds until a call with the given tokens would be allowed, 0 if it is allowed now.
+        """
+        with self.transaction() as connection:
+            return self._wait_time(connection, tokens, time.time())
+
+    def _try_acquire(self, tokens: int):
+        now = time.time()
+        with self.transaction() as connection:
+            wait_time = self._wait_time(connection, tokens, now)
+            if wait_time > 0:
+                return None, wait_time
+            cursor = connection.execute(
+                "INSERT INTO llm_call (limiter, called_at, tokens) VALUES (?, ?, ?)",
+                (self.name, now, tokens),
+            )
+            return cursor.lastrowid, 0
+
+    def _wait_time(self, connection, tokens: int, now: float) -> float:
+        connection.execute(
+            "DELETE FROM llm_call WHERE limiter = ? AND called_at <= ?",
+            (self.name, now - self.window),
+        )
+        calls = connection.execute(
+            "SELECT called_at, tokens FROM llm_call WHERE limiter = ? ORDER BY called_at",
+            (self.name,),
+        ).fetchall()
+
+        wait_until = now
+        # the oldest calls have to leave the window until one more request fits
+        if len(calls) >= self.requests_per_minute:
+            wait_until = calls[len(calls) - self.requests_per_minute][0] + self.window
+
+        if self.tokens_per_minute:
+            # a single call larger than the limit is allowed once the window is empty
+            tokens = min(tokens, self.tokens_per_minute)
+            excess = sum(call[1] for call in calls) + tokens - self.tokens_per_minute
+            for called_at, call_tokens in calls:
+                if excess <= 0:
+                    break
+                excess -= call_tokens
+                wait_until = max(wait_until, called_at + self.window)
+
+        return max(wait_until - now, 0)
+
+
+def estimate_tokens(*texts, max_output_tokens: int = 1024) -> int:
+    """
+    Rough token estimate of a call (about 4 characters per token plus the expected output).
+    """
+    return sum(len(str(text)) for text in texts) // 4 + max_output_tokens
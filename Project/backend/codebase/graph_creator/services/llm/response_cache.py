@@ -0,0 +1,128 @@
+import hashlib
+import json
+import threading
+import time
+
+from graph_creator.utils.sqlite_store import SqliteStore
+from settings.defaults import LLM_CACHE_DB, LLM_CACHE_MAX_BYTES
+
+
+class LlmResponseCache(SqliteStore):
+    """
+    Persistent cache of llm responses keyed by provider, model and a hash of the prompt.
+    The least recently used responses are evicted once the cache exceeds its size.
+    Hits and misses are counted per instance, i.e. per llm handler of a graph job.
+    """
+
+    def __init__(
+        self, db_path: str = LLM_CACHE_DB, max_size_bytes: int = LLM_CACHE_MAX_BYTES
+    ):
+        super().__init__(db_path)
+        self.max_size_bytes = max_size_bytes
+        self.hits = 0
+        self.misses = 0
+        self.stats_lock = threading.Lock()
+
+        with self.transaction() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS llm_response ("
+                "key TEXT PRIMARY KEY, provider TEXT NOT NULL, model TEXT NOT NULL, "
+                "response TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS ix_llm_response_last_used "
+                "ON llm_response (last_used)"
+            )
+            # running total of the response sizes, so storing a response does not
+            # scan the whole table while it holds the write lock
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS llm_response_meta ("
+                "id INTEGER PRIMARY KEY CHECK (id = 0), total_size INTEGER NOT NULL)"
+            )
+            connection.execute(
+                "INSERT OR IGNORE INTO llm_response_meta (id, total_size) "
+                "SELECT 0, COALESCE(SUM(size), 0) FROM llm_response"
+            )
+
+    @staticmethod
+    def get_key(provider: str, model: str, prompt) -> str:
+        """
+        Cache key of a prompt, the prompt can be a string or json serializable messages.
+        """
+        if not isinstance(prompt, str):
+            prompt = json.dumps(prompt, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(
+            "\0".join([provider, model, prompt]).encode("utf-8")
+        ).hexdigest()
+
+    def get(self, provider: str, model: str, prompt):
+        """
+        Get the cached response of a prompt or None.
+        """
+        key = self.get_key(provider, model, prompt)
+        with self.transaction() as connection:
+            row = connection.execute(
+                "SELECT response FROM llm_response WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                connection.execute(
+                    "UPDATE llm_response SET last_used = ? WHERE key = ?",
+                    (time.time(), key),
+                )
+
+        with self.stats_lock:
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return None if row is None else row[0]
+
+    def put(self, provider: str, model: str, prompt, response: str):
+        """
+        Store the response of a prompt and evict least recently used responses if needed.
+        """
+        key = self.get_key(provider, model, prompt)
+        size = len(response.encode("utf-8"))
+        with self.transaction() as connection:
+            replaced = connection.execute(
+                "SELECT size FROM llm_response WHERE key = ?", (key,)
+            ).fetchone()
+            connection.execute(
+                "INSERT OR REPLACE INTO llm_response "
+                "(key, provider, model, response, size, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, provider, model, response, size, time.time()),
+            )
+            total_size = self._add_to_total_size(
+                connection, size - (replaced[0] if replaced else 0)
+            )
+            if total_size > self.max_size_bytes:
+                freed = self._evict(connection, total_size - self.max_size_bytes)
+                self._add_to_total_size(connection, -freed)
+
+    def get_stats(self) -> dict:
+        with self.stats_lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+    @staticmethod
+    def _add_to_total_size(connection, size: int) -> int:
+        connection.execute(
+            "UPDATE llm_response_meta SET total_size = total_size + ? WHERE id = 0",
+            (size,),
+        )
+        return connection.execute(
+            "SELECT total_size FROM llm_response_meta WHERE id = 0"
+        ).fetchone()[0]
+
+    @staticmethod
+    def _evict(connection, bytes_to_free: int) -> int:
+        freed = 0
+        keys = []
+        for key, size in connection.execute(
+            "SELECT key, size FROM llm_response ORDER BY last_used"
+        ):
+            if freed >= bytes_to_free:
+                break
+            keys.append((key,))
+            freed += size
+        connection.executemany("DELETE FROM llm_response WHERE key = ?", keys)
+        return freed
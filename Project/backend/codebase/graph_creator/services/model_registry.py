@@ -0,0 +1,100 @@
+import logging
+import threading
+import time
+
+import torch
+from sentence_transformers import SentenceTransformer
+
+from settings.defaults import EMBEDDING_MODEL
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class ModelRegistry:
+    """
+    Process-wide registry of sentence transformers. Each model is loaded from disk once
+    and shared by all graph jobs and search requests of the process. Models are loaded
+    under a lock per model, so threads asking for the same model wait for one load
+    instead of loading it again, and encoding is serialized per model because the fast
+    tokenizers of sentence transformers must not be used by two threads at once.
+    """
+
+    def __init__(self, loader=SentenceTransformer):
+        """
+        Args:
+            loader (callable): Loads a model by its name.
+        """
+        self.loader = loader
+        self.lock = threading.Lock()
+        self.models = {}
+        self.model_locks = {}
+        self.load_times = {}
+
+    def get(self, model_name: str = EMBEDDING_MODEL) -> SentenceTransformer:
+        """
+        Get a model, it is loaded on first use.
+        """
+        model_lock = self._get_model_lock(model_name)
+        with model_lock:
+            model = self.models.get(model_name)
+            if model is None:
+                start = time.perf_counter()
+                model = self.loader(model_name)
+                with self.lock:
+                    self.load_times[model_name] = time.perf_counter() - start
+                    self.models[model_name] = model
+                logger.info(
+                    f"Loaded embedding model {model_name} in "
+                    f"{self.load_times[model_name]:.1f}s, "
+                    f"{get_model_memory(model) / 2**20:.0f} MB"
+                )
+            return model
+
+    def encode(self, sentences, model_name: str = EMBEDDING_MODEL, **kwargs):
+        """
+        Encode sentences with a model, see SentenceTransformer.encode.
+        """
+        model = self.get(model_name)
+        with self._get_model_lock(model_name):
+            return model.encode(sentences, **kwargs)
+
+    def warmup(self, model_names=(EMBEDDING_MODEL,)):
+        """
+        Load the models and encode once, so the first request does not pay for it.
+        """
+        for model_name in model_names:
+            self.encode(["warmup"], model_name)
+
+    def get_stats(self) -> list:
+        """
+        Name, load time and memory of the parameters of each loaded model.
+        """
+        with self.lock:
+            models = list(self.models.items())
+            load_times = dict(self.load_times)
+        return [
+            {
+                "model_name": model_name,
+                "load_time": load_times[model_name],
+                "memory_bytes": get_model_memory(model),
+            }
+            for model_name, model in models
+        ]
+
+    def _get_model_lock(self, model_name: str) -> threading.RLock:
+        with self.lock:
+            return self.model_locks.setdefault(model_name, threading.RLock())
+
+
+def get_model_memory(model) -> int:
+    """
+    Bytes of the parameters and buffers of a torch model, 0 for other models.
+    """
+    if not isinstance(model, torch.nn.Module):
+        return 0
+    tensors = list(model.parameters()) + list(model.buffers())
+    return sum(tensor.numel() * tensor.element_size() for tensor in tensors)
+
+
+model_registry = ModelRegistry()
@@ -1,4 +1,5 @@
 import os
+import shutil
 import uuid
 
 import networkx as nx
@@ -98,6 +99,21 @@ class NetXGraphDB:
         graph_local_storage = self._get_graph_file_path_local_storage(graph_job_id)
         return nx.read_gml(graph_local_storage)
 
+    def has_graph(self, graph_job_id: uuid.UUID) -> bool:
+        """
+        Whether a graph of the GraphJob is stored
+        """
+        return os.path.isfile(self._get_graph_file_path_local_storage(graph_job_id))
+
+    def copy_graph(self, source_graph_job_id: uuid.UUID, graph_job_id: uuid.UUID):
+        """
+        Copy the stored graph of another GraphJob, e.g. of an identical document
+        """
+        shutil.copyfile(
+            self._get_graph_file_path_local_storage(source_graph_job_id),
+            self._get_graph_file_path_local_storage(graph_job_id),
+        )
+
     def delete_graph(self, graph_job_id: uuid.UUID):
         file_location = self._get_graph_file_path_local_storage(graph_job_id)
         if os.path.exists(file_location):
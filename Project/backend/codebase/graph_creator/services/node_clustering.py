@@ -0,0 +1,110 @@
+import faiss
+import numpy as np
+from scipy.cluster.hierarchy import fcluster, linkage
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from scipy.spatial.distance import cosine, pdist
+
+from graph_creator.utils.const import DedupMethod
+from settings.defaults import DEDUP_ANN_MIN_NODES, DEDUP_ANN_NEIGHBORS
+
+
+def select_dedup_method(method: DedupMethod, number_of_nodes: int) -> DedupMethod:
+    """
+    Resolve the auto method by the number of nodes: hierarchical clustering for small
+    graphs, its distance matrix grows quadratically, and the ann search for large graphs.
+    """
+    if method != DedupMethod.AUTO:
+        return DedupMethod(method)
+    if number_of_nodes < DEDUP_ANN_MIN_NODES:
+        return DedupMethod.HIERARCHICAL
+    return DedupMethod.ANN
+
+
+def cluster_nodes(
+    embeddings: np.ndarray, threshold: float, method: DedupMethod = DedupMethod.AUTO
+) -> np.ndarray:
+    """
+    Cluster the embeddings of the nodes into groups of duplicates.
+
+    Args:
+        embeddings (np.ndarray): The embedding of each node, one row per node.
+        threshold (float): Nodes closer than this cosine distance are duplicates.
+        method (DedupMethod): The clustering method, auto is resolved by the number of nodes.
+
+    Returns:
+        np.ndarray: The cluster label of each node.
+    """
+    if len(embeddings) < 2:
+        return np.ones(len(embeddings), dtype=int)
+    if select_dedup_method(method, len(embeddings)) == DedupMethod.HIERARCHICAL:
+        return get_hierarchical_labels(embeddings, threshold)
+    return get_ann_labels(embeddings, threshold)
+
+
+def get_hierarchical_labels(embeddings: np.ndarray, threshold: float) -> np.ndarray:
+    """
+    Ward linkage of the cosine distances of all pairs of nodes, cut at the threshold.
+    Needs memory quadratic in the number of nodes.
+    """
+    distance_matrix = pdist(embeddings, "cosine")
+    Z = linkage(distance_matrix, "ward")
+    return fcluster(Z, threshold, criterion="distance")
+
+
+def get_ann_labels(
+    embeddings: np.ndarray, threshold: float, neighbors: int = DEDUP_ANN_NEIGHBORS
+) -> np.ndarray:
+    """
+    Connect each node to its approximate nearest neighbors within the threshold and
+    label the connected groups. Needs memory linear in the number of nodes, but a group
+    can be chained together from pairs that are each close enough.
+    """
+    vectors = np.array(embeddings, dtype=np.float32)
+    faiss.normalize_L2(vectors)
+    index = faiss.IndexHNSWFlat(vectors.shape[1], 32, faiss.METRIC_INNER_PRODUCT)
+    index.add(vectors)
+    similarities, neighbor_ids = index.search(vectors, min(neighbors, len(vectors)))
+
+    # pairs within the threshold, missing neighbors have the id -1
+    is_pair = (neighbor_ids >= 0) & (similarities >= 1 - threshold)
+    rows = np.broadcast_to(np.arange(len(vectors))[:, None], neighbor_ids.shape)
+    pairs = coo_matrix(
+        (np.ones(is_pair.sum()), (rows[is_pair], neighbor_ids[is_pair])),
+        shape=(len(vectors), len(vectors)),
+    )
+    _, labels = connected_components(pairs, directed=False)
+    return labels + 1
+
+
+def get_cluster_representatives(embeddings: np.ndarray, labels: np.ndarray):
+    """
+    Group the nodes by cluster and choose the node closest to the average embedding of
+    its cluster by cosine distance as representative, the first node on ties.
+
+    Args:
+        embeddings (np.ndarray): The embedding of each node, one row per node.
+        labels (np.ndarray): The cluster label of each node.
+
+    Returns:
+        tuple: The node positions of each cluster in node order, in order of the labels,
+            and the node position of the representative of each cluster.
+    """
+    labels = np.asarray(labels)
+    _, cluster_ids = np.unique(labels, return_inverse=True)
+    order = np.argsort(cluster_ids, kind="stable")
+    clusters = np.split(order, np.cumsum(np.bincount(cluster_ids))[:-1])
+
+    # nodes of a cluster are often equally close to its average, e.g. both nodes of
+    # a pair, so the distances are computed with the arithmetic of the merging step
+    # before, the average in the dtype of the embeddings and scipy's cosine distance,
+    # to break such ties by rounding the same way
+    embeddings = np.asarray(embeddings)
+    representatives = np.array([cluster[0] for cluster in clusters], dtype=int)
+    for i, cluster in enumerate(clusters):
+        if len(cluster) > 1:
+            average_embedding = np.mean(embeddings[cluster], axis=0)
+            representatives[i] = min(
+                cluster, key=lambda node: cosine(embeddings[node], average_embedding)
+            )
+    return clusters, representatives
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+from sentence_transformers import SentenceTransformer
+
+from graph_creator.services import embedding_cache
+from graph_creator.services.model_registry import model_registry
+from settings.defaults import EMBEDDING_MODEL
+
+
+class NodeEmbeddings:
+    """
+    Embeddings of the nodes of a relation table. They are computed once per graph job
+    and shared by the topic assignment and the merging of duplicate nodes.
+    """
+
+    def __init__(
+        self, nodes, embeddings: np.ndarray, model_name: str = EMBEDDING_MODEL
+    ):
+        """
+        Args:
+            nodes (list): The embedded nodes.
+            embeddings (np.ndarray): The embedding of each node, one row per node.
+            model_name (str): The model that embedded the nodes.
+        """
+        self.nodes = list(nodes)
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.index = {node: i for i, node in enumerate(self.nodes)}
+
+    @property
+    def model(self) -> SentenceTransformer:
+        """
+        The model that embedded the nodes, shared by the whole process.
+        """
+        return model_registry.get(self.model_name)
+
+    @classmethod
+    def from_data(
+        cls, data: pd.DataFrame, model_name: str = EMBEDDING_MODEL
+    ) -> "NodeEmbeddings":
+        """
+        Embed all nodes of a relation table in the order they appear in node_1 and node_2.
+        """
+        nodes = pd.concat([data["node_1"], data["node_2"]]).unique()
+        return cls.from_nodes(nodes, model_name)
+
+    @classmethod
+    def from_nodes(cls, nodes, model_name: str = EMBEDDING_MODEL) -> "NodeEmbeddings":
+        """
+        Embed the given nodes.
+        """
+        return cls(nodes, embedding_cache.encode(nodes, model_name), model_name)
+
+    def get(self, nodes) -> np.ndarray:
+        """
+        Embeddings of the given nodes, one row per node. Nodes that were not embedded
+        yet are embedded and kept.
+        """
+        missing = [node for node in dict.fromkeys(nodes) if node not in self.index]
+        if missing:
+            self.embeddings = np.vstack(
+                [self.embeddings, embedding_cache.encode(missing, self.model_name)]
+            )
+            for node in missing:
+                self.index[node] = len(self.nodes)
+                self.nodes.append(node)
+        return self.embeddings[[self.index[node] for node in nodes]]
@@ -0,0 +1,120 @@
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from graph_creator.embedding_handler import embeddings_handler
+from graph_creator.models.graph_job import GraphJob
+from settings.defaults import SEARCH_INDEX_CACHE_MAX_BYTES
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class SearchIndexCache:
+    """
+    Least recently used cache of the loaded search indexes (embeddings handlers) of
+    graphs, bounded by their estimated memory. A cached index is used as long as the
+    version of its stored embeddings is unchanged, so a graph embedded again by any
+    process is reloaded. Concurrent requests for an index that is not cached share
+    one load of it.
+    """
+
+    def __init__(self, max_size_bytes: int = SEARCH_INDEX_CACHE_MAX_BYTES):
+        self.max_size_bytes = max_size_bytes
+        self.lock = threading.Lock()
+        # graph id -> (version, size, embeddings handler), least recently used first
+        self.entries = OrderedDict()
+        # (graph id, version, generation) -> future of the embeddings handler being loaded
+        self.loading = {}
+        # graph id -> number of invalidations, loads started before one are not cached
+        self.generations = {}
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def get(self, g_job: GraphJob) -> embeddings_handler:
+        """
+        Get the embeddings handler of a graph with its search index loaded.
+        """
+        handler = embeddings_handler(g_job, lazyLoad=True)
+        graph_id = str(g_job.id)
+        if not handler.is_embedded():
+            self.invalidate(graph_id)
+            return handler
+
+        version = handler.get_version()
+        with self.lock:
+            entry = self.entries.get(graph_id)
+            if entry is not None and entry[0] == version:
+                self.entries.move_to_end(graph_id)
+                self.hits += 1
+                return entry[2]
+            key = (graph_id, version, self.generations.get(graph_id, 0))
+            future = self.loading.get(key)
+            is_loader = future is None
+            if is_loader:
+                future = Future()
+                self.loading[key] = future
+                self.misses += 1
+            else:
+                self.coalesced += 1
+        if not is_loader:
+            return future.result()
+
+        try:
+            handler.embeddings = handler.load_data()
+        except BaseException as e:
+            with self.lock:
+                del self.loading[key]
+            future.set_exception(e)
+            raise
+        with self.lock:
+            del self.loading[key]
+            # an invalidation during the load must not be undone by caching its result
+            is_current = key[2] == self.generations.get(graph_id, 0)
+            if handler.embeddings is not None and is_current:
+                self._put(graph_id, version, handler)
+        future.set_result(handler)
+        return handler
+
+    def invalidate(self, graph_id):
+        """
+        Drop the index of a graph, e.g. when the graph is deleted or created again.
+        """
+        with self.lock:
+            self.generations[str(graph_id)] = self.generations.get(str(graph_id), 0) + 1
+            entry = self.entries.pop(str(graph_id), None)
+            if entry is not None:
+                self.size_bytes -= entry[1]
+
+    def get_stats(self) -> dict:
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "entries": len(self.entries),
+                "size_bytes": self.size_bytes,
+                "max_size_bytes": self.max_size_bytes,
+            }
+
+    def _put(self, graph_id: str, version, handler: embeddings_handler):
+        old_entry = self.entries.pop(graph_id, None)
+        if old_entry is not None:
+            self.size_bytes -= old_entry[1]
+        size = handler.embeddings.get_memory()
+        self.entries[graph_id] = (version, size, handler)
+        self.size_bytes += size
+        # the newest index is kept even if it alone exceeds the size
+        while self.size_bytes > self.max_size_bytes and len(self.entries) > 1:
+            evicted_id, (_, evicted_size, _) = self.entries.popitem(last=False)
+            self.size_bytes -= evicted_size
+            self.evictions += 1
+            logger.info(f"Evicted search index of graph {evicted_id}")
+
+
+search_index_cache = SearchIndexCache()
@@ -0,0 +1,89 @@
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import psutil
+
+# seconds between two samples of the resident memory during a stage
+RSS_SAMPLE_INTERVAL = 0.1
+
+
+class StageMetricsRecorder:
+    """
+    Measures the stages of a graph job: wall time, cpu time, peak resident memory,
+    llm calls and llm tokens. CPU time and memory are those of the whole process,
+    so they include other graph jobs if the process runs several at once.
+    """
+
+    def __init__(self, llm_handler=None, on_metrics=None):
+        """
+        Args:
+            llm_handler: Handler whose llm usage is attributed to the measured stages.
+            on_metrics (callable, optional): Called with the metrics of each finished stage.
+        """
+        self.llm_handler = llm_handler
+        self.on_metrics = on_metrics
+        self.metrics = []
+
+    @contextmanager
+    def measure(self, stage: str):
+        """
+        Context manager measuring the stage that runs within it. Failed stages are measured too.
+        """
+        process = psutil.Process()
+        peak_rss = _PeakRssSampler(process)
+        usage = self._get_llm_usage()
+        started_at = datetime.now(timezone.utc)
+        wall_start = time.perf_counter()
+        cpu_start = _get_cpu_time(process)
+        peak_rss.start()
+        try:
+            yield
+        finally:
+            peak_rss.stop()
+            llm_usage = self._get_llm_usage()
+            metrics = {
+                "stage": str(stage),
+                "started_at": started_at,
+                "wall_time": time.perf_counter() - wall_start,
+                "cpu_time": _get_cpu_time(process) - cpu_start,
+                "peak_rss": peak_rss.peak,
+                "llm_calls": llm_usage["llm_calls"] - usage["llm_calls"],
+                "llm_tokens": llm_usage["llm_tokens"] - usage["llm_tokens"],
+            }
+            self.metrics.append(metrics)
+            if self.on_metrics is not None:
+                self.on_metrics(metrics)
+
+    def _get_llm_usage(self) -> dict:
+        if self.llm_handler is None:
+            return {"llm_calls": 0, "llm_tokens": 0}
+        return self.llm_handler.get_usage()
+
+
+class _PeakRssSampler(threading.Thread):
+    """Samples the resident memory of a process in the background and keeps the peak."""
+
+    def __init__(self, process: psutil.Process):
+        super().__init__(daemon=True, name="rss_sampler")
+        self.process = process
+        self.peak = process.memory_info().rss
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(RSS_SAMPLE_INTERVAL):
+            self._sample()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+        self._sample()
+
+    def _sample(self):
+        self.peak = max(self.peak, self.process.memory_info().rss)
+
+
+def _get_cpu_time(process: psutil.Process) -> float:
+    cpu_times = process.cpu_times()
+    return cpu_times.user + cpu_times.system
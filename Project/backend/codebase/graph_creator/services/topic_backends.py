@@ -0,0 +1,137 @@
+import math
+
+import numpy as np
+from bertopic import BERTopic
+from sklearn.cluster import AgglomerativeClustering, MiniBatchKMeans
+from sklearn.feature_extraction.text import CountVectorizer
+
+from graph_creator.services.node_embeddings import NodeEmbeddings
+from graph_creator.utils.const import TopicBackend
+from settings.defaults import TOPIC_BERTOPIC_MAX_NODES, TOPIC_BERTOPIC_MIN_NODES
+
+# number of words in the name of a topic, as in the names of BERTopic
+TOPIC_NAME_WORDS = 4
+
+
+def select_topic_backend(backend: TopicBackend, number_of_nodes: int) -> TopicBackend:
+    """
+    Resolve the auto backend by the number of nodes: agglomerative clustering for small
+    graphs, mini batch k-means for large graphs and BERTopic in between.
+    """
+    if backend != TopicBackend.AUTO:
+        return TopicBackend(backend)
+    if number_of_nodes < TOPIC_BERTOPIC_MIN_NODES:
+        return TopicBackend.AGGLOMERATIVE
+    if number_of_nodes > TOPIC_BERTOPIC_MAX_NODES:
+        return TopicBackend.KMEANS
+    return TopicBackend.BERTOPIC
+
+
+def assign_topics(
+    documents: list,
+    backend: TopicBackend,
+    max_topics: int,
+    node_embeddings: NodeEmbeddings = None,
+):
+    """
+    Assign a topic to each document (node) with the given backend.
+
+    Args:
+        documents (list): The nodes.
+        backend (TopicBackend): The backend, auto is resolved by the number of nodes.
+        max_topics (int): Maximum number of topics of the clustering backends.
+        node_embeddings (NodeEmbeddings, optional): Embeddings of the nodes, BERTopic embeds
+            the nodes itself if not given.
+
+    Returns:
+        tuple: The topic of each document and the topics ordered by their size
+            as a dictionary of topic to topic name.
+    """
+    backend = select_topic_backend(backend, len(documents))
+
+    if backend == TopicBackend.NONE or not documents:
+        return [-1] * len(documents), {}
+
+    if len(documents) < 2:
+        # a single node cannot be clustered, it is its own topic
+        topics = [0] * len(documents)
+        return topics, get_topic_names(documents, topics)
+
+    if backend == TopicBackend.BERTOPIC:
+        if node_embeddings is None:
+            topic_model = BERTopic()
+            topics, _ = topic_model.fit_transform(documents)
+        else:
+            # reuse the embeddings of the graph job instead of embedding all nodes again
+            topic_model = BERTopic(embedding_model=node_embeddings.model)
+            topics, _ = topic_model.fit_transform(
+                documents, embeddings=node_embeddings.get(documents)
+            )
+        topic_info = topic_model.get_topic_info()
+        return topics, dict(zip(topic_info["Topic"], topic_info["Name"]))
+
+    if node_embeddings is None:
+        node_embeddings = NodeEmbeddings.from_nodes(documents)
+    embeddings = node_embeddings.get(documents)
+    number_of_topics = get_number_of_topics(len(documents), max_topics)
+    if backend == TopicBackend.KMEANS:
+        clustering = MiniBatchKMeans(
+            n_clusters=number_of_topics, random_state=0, n_init=3
+        )
+    elif backend == TopicBackend.AGGLOMERATIVE:
+        clustering = AgglomerativeClustering(
+            n_clusters=number_of_topics, metric="cosine", linkage="average"
+        )
+    else:
+        raise ValueError(f"Unknown topic backend: {backend}")
+    topics = clustering.fit_predict(embeddings).tolist()
+
+    return topics, get_topic_names(documents, topics)
+
+
+def get_number_of_topics(number_of_documents: int, max_topics: int) -> int:
+    """
+    Number of clusters for the clustering backends, about sqrt(n / 2) like the rule of
+    thumb for k-means, at most max_topics.
+    """
+    return max(1, min(max_topics, round(math.sqrt(number_of_documents / 2))))
+
+
+def get_topic_names(documents: list, topics: list) -> dict:
+    """
+    Name each topic by its most representative words with c-TF-IDF: the documents of a
+    topic are joined into one document and words are weighted by their frequency in the
+    topic times the inverse of their frequency over all topics, as BERTopic does.
+
+    Returns:
+        dict: The topics ordered by their size, each with a name like `0_word_word_word_word`.
+    """
+    labels, topic_of_document, sizes = np.unique(
+        topics, return_inverse=True, return_counts=True
+    )
+    topic_documents = [""] * len(labels)
+    for document, topic in zip(documents, topic_of_document):
+        topic_documents[topic] += f" {document}"
+
+    vectorizer = CountVectorizer(token_pattern=r"(?u)\b\w+\b")
+    try:
+        counts = vectorizer.fit_transform(topic_documents).toarray().astype(float)
+    except ValueError:
+        # no words at all, e.g. only punctuation
+        return {int(label): str(label) for label in labels[np.argsort(-sizes)]}
+    words = vectorizer.get_feature_names_out()
+
+    term_frequency = counts / np.maximum(counts.sum(axis=1, keepdims=True), 1)
+    average_words = counts.sum() / len(labels)
+    inverse_frequency = np.log(1 + average_words / np.maximum(counts.sum(axis=0), 1))
+    c_tf_idf = term_frequency * inverse_frequency
+
+    names = {}
+    for i in np.argsort(-sizes, kind="stable"):
+        top_words = [
+            words[j]
+            for j in np.argsort(-c_tf_idf[i], kind="stable")[:TOPIC_NAME_WORDS]
+            if c_tf_idf[i, j] > 0
+        ]
+        names[int(labels[i])] = "_".join([str(labels[i])] + top_words)
+    return names
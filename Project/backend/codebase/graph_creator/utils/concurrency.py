@@ -0,0 +1,187 @@
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+
+from settings.defaults import LLM_MAX_CONCURRENCY
+
+
+class CallBudget:
+    """
+    Thread-safe budget of calls, e.g. the llm calls a graph job may make for one stage
+    """
+
+    def __init__(self, max_calls: int = None):
+        """
+        Parameters
+        ----------
+        max_calls : int, optional
+            Number of calls in the budget, unlimited if None
+        """
+        self.max_calls = max_calls
+        self.used = 0
+        self.lock = threading.Lock()
+
+    def acquire(self) -> bool:
+        """
+        Take one call from the budget, returns False if the budget is exhausted
+        """
+        with self.lock:
+            if self.max_calls is not None and self.used >= self.max_calls:
+                return False
+            self.used += 1
+            return True
+
+
+def map_concurrently(
+    function, items, max_concurrency: int = None, on_done=None
+) -> list:
+    """
+    Apply a blocking function (e.g. an llm call) to all items in a thread pool
+
+    Parameters
+    ----------
+    function : callable
+        Function that is called with each item
+    items : list
+        The items to process
+    max_concurrency : int, optional
+        Maximum number of calls in flight at the same time, defaults to LLM_MAX_CONCURRENCY
+    on_done : callable, optional
+        Called with the number of finished items and the number of all items
+        whenever an item is finished
+
+    Returns
+    -------
+    list
+        The results in the order of the given items
+    """
+    max_concurrency = max_concurrency or LLM_MAX_CONCURRENCY
+    if max_concurrency <= 1 or len(items) <= 1:
+        results = []
+        for item in items:
+            results.append(function(item))
+            if on_done is not None:
+                on_done(len(results), len(items))
+        return results
+
+    with ThreadPoolExecutor(
+        max_workers=min(max_concurrency, len(items)), thread_name_prefix="llm"
+    ) as executor:
+        futures = [executor.submit(function, item) for item in items]
+        for done, future in enumerate(as_completed(futures), start=1):
+            future.result()
+            if on_done is not None:
+                on_done(done, len(items))
+        return [future.result() for future in futures]
+
+
+def first_success_concurrently(
+    function,
+    attempts_by_item,
+    max_concurrency: int = None,
+    max_attempts_per_item: int = 1,
+    on_done=None,
+) -> list:
+    """
+    Find for each item the first of its attempts for which a blocking function (e.g. an
+    llm call) returns a result other than None. Attempts of different items run at the
+    same time, once an attempt of an item succeeds its later attempts are cancelled.
+
+    Parameters
+    ----------
+    function : callable
+        Function that is called with each attempt, returns None if the attempt failed
+    attempts_by_item : list
+        For each item a list of its attempts in the order they are preferred
+    max_concurrency : int, optional
+        Maximum number of calls in flight at the same time, defaults to LLM_MAX_CONCURRENCY
+    max_attempts_per_item : int, optional
+        Maximum number of attempts of one item in flight at the same time. Attempts beyond
+        the first are speculative, they may be cancelled if an earlier attempt succeeds.
+    on_done : callable, optional
+        Called with the number of finished items, the number of items with a successful
+        attempt and the number of all items whenever an item is finished
+
+    Returns
+    -------
+    list
+        For each item the result of its first successful attempt in the given order, or None.
+        The results are the same as if the attempts were tried one after another.
+    """
+    max_concurrency = max(max_concurrency or LLM_MAX_CONCURRENCY, 1)
+    total = len(attempts_by_item)
+    results = [None] * total
+    # position of the first successful attempt of each item
+    succeeded_at = [None] * total
+    next_attempt = [0] * total
+    in_flight = [{} for _ in range(total)]
+    finished = [False] * total
+    done = 0
+    succeeded = 0
+
+    def is_finished(item):
+        pending = in_flight[item].values()
+        if succeeded_at[item] is not None:
+            # an earlier attempt that is still running might succeed as well
+            return all(position > succeeded_at[item] for position in pending)
+        return not pending and next_attempt[item] >= len(attempts_by_item[item])
+
+    def finish(item):
+        nonlocal done, succeeded
+        finished[item] = True
+        for future in in_flight[item]:
+            future.cancel()
+        in_flight[item].clear()
+        done += 1
+        succeeded += results[item] is not None
+        if on_done is not None:
+            on_done(done, succeeded, total)
+
+    for item in range(total):
+        if not attempts_by_item[item]:
+            finish(item)
+
+    with ThreadPoolExecutor(
+        max_workers=max_concurrency, thread_name_prefix="llm"
+    ) as executor:
+        running = {}
+        first_open = 0
+        while done < total:
+            while finished[first_open]:
+                first_open += 1
+            # dispatch attempts, earlier items first
+            for item in range(first_open, total):
+                if len(running) >= max_concurrency:
+                    break
+                while (
+                    not finished[item]
+                    and succeeded_at[item] is None
+                    and len(running) < max_concurrency
+                    and len(in_flight[item]) < max_attempts_per_item
+                    and next_attempt[item] < len(attempts_by_item[item])
+                ):
+                    position = next_attempt[item]
+                    next_attempt[item] += 1
+                    future = executor.submit(function, attempts_by_item[item][position])
+                    running[future] = item
+                    in_flight[item][future] = position
+
+            completed, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in completed:
+                item = running.pop(future)
+                if finished[item]:
+                    # cancelled attempt, its item is already finished
+                    continue
+                position = in_flight[item].pop(future)
+                result = future.result()
+                if result is not None and (
+                    succeeded_at[item] is None or position < succeeded_at[item]
+                ):
+                    succeeded_at[item] = position
+                    results[item] = result
+                if is_finished(item):
+                    for cancelled in in_flight[item]:
+                        if cancelled.cancel():
+                            running.pop(cancelled, None)
+                    finish(item)
+
+    return results
@@ -3,7 +3,55 @@ from enum import StrEnum
 
 class GraphStatus(StrEnum):
     DOC_UPLOADED = "document_uploaded"
+    QUEUED = "queued"
+    EXTRACTING = "extracting"
+    CONNECTING = "connecting"
+    EMBEDDING = "embedding"
     GRAPH_READY = "graph_ready"
+    FAILED = "failed"
+
+    @classmethod
+    def get_list_of_in_progress(cls) -> list:
+        return [cls.QUEUED, cls.EXTRACTING, cls.CONNECTING, cls.EMBEDDING]
+
+
+class PipelineStage(StrEnum):
+    """Stages of the graph creation named after their output, in pipeline order.
+    The outputs of all but the node embeddings and the last stage are checkpointed."""
+
+    CHUNKS = "chunks"
+    EXTRACTIONS = "extractions"
+    CONNECTED = "connected"
+    NODE_EMBEDDINGS = "node_embeddings"
+    TOPICS = "topics"
+    MERGED = "merged"
+    GRAPH = "graph"
+
+
+class PreConnectionMethod(StrEnum):
+    """Cheap signals that connect graph components before the llm is asked."""
+
+    NAME_MATCH = "name_match"
+    CHUNK_PROXIMITY = "chunk_proximity"
+    EMBEDDING_SIMILARITY = "embedding_similarity"
+
+
+class TopicBackend(StrEnum):
+    """Ways to assign topics to the nodes, auto chooses by the number of nodes."""
+
+    AUTO = "auto"
+    BERTOPIC = "bertopic"
+    KMEANS = "kmeans"
+    AGGLOMERATIVE = "agglomerative"
+    NONE = "none"
+
+
+class DedupMethod(StrEnum):
+    """Ways to find duplicate nodes, auto chooses by the number of nodes."""
+
+    AUTO = "auto"
+    HIERARCHICAL = "hierarchical"
+    ANN = "ann"
 
 
 class AllowedUploadFileFormat(StrEnum):
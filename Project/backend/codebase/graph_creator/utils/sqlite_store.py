@@ -0,0 +1,42 @@
+import os
+import sqlite3
+import threading
+
+
+class SqliteStore:
+    """
+    Base for small stores kept in a local SQLite database file. The file can be
+    shared by all threads and processes (API and workers) of one machine.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.local = threading.local()
+
+    def transaction(self) -> "SqliteTransaction":
+        """
+        Write transaction that locks the database for other threads and processes.
+        """
+        return SqliteTransaction(self._connection())
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite connections must not be shared between threads
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            connection = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self.local.connection = connection
+        return connection
+
+
+class SqliteTransaction:
+    def __init__(self, connection: sqlite3.Connection):
+        self.connection = connection
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.connection.execute("BEGIN IMMEDIATE")
+        return self.connection
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.connection.execute("ROLLBACK" if exc_type else "COMMIT")
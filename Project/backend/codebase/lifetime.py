@@ -1,9 +1,12 @@
 from typing import Awaitable, Callable
 
 from fastapi import FastAPI
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 
-from settings.defaults import DB_URL
+from graph_creator.services.graph_job_runner import GraphJobRunner
+from graph_creator.services.model_registry import model_registry
+from settings.defaults import DB_URL, EMBEDDING_MODEL_WARMUP
 
 import logging
 
@@ -32,6 +35,32 @@ def _setup_db(app: FastAPI) -> None:  # pragma: no cover
     logger.info(app.state.db_session_factory)
 
 
+def _setup_graph_job_runner(app: FastAPI) -> None:  # pragma: no cover
+    """
+    Creates the worker pool that runs queued graph creation jobs.
+
+    :param app: fastAPI application.
+    """
+    app.state.graph_job_runner = GraphJobRunner(app.state.db_session_factory)
+    app.state.graph_job_runner.start()
+
+
+async def _setup_embedding_models(app: FastAPI) -> None:  # pragma: no cover
+    """
+    Loads and warms up the embedding model, so the first graph job or search
+    does not wait for it. A failing warmup is logged, the model is then loaded
+    on first use.
+
+    :param app: fastAPI application.
+    """
+    if not EMBEDDING_MODEL_WARMUP:
+        return
+    try:
+        await run_in_threadpool(model_registry.warmup)
+    except Exception:
+        logger.exception("Warmup of the embedding model failed")
+
+
 def register_startup_event(
     app: FastAPI,
 ) -> Callable[[], Awaitable[None]]:  # pragma: no cover
@@ -49,6 +78,8 @@ def register_startup_event(
     async def _startup() -> None:  # noqa: WPS430
         app.middleware_stack = None
         _setup_db(app)
+        _setup_graph_job_runner(app)
+        await _setup_embedding_models(app)
         app.middleware_stack = app.build_middleware_stack()
         pass  # noqa: WPS420
 
@@ -67,6 +98,7 @@ def register_shutdown_event(
 
     @app.on_event("shutdown")
     async def _shutdown() -> None:  # noqa: WPS430
+        await app.state.graph_job_runner.shutdown()
         await app.state.db_engine.dispose()
 
         pass  # noqa: WPS420
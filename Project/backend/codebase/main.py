@@ -1,8 +1,9 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from common.middleware import RequestSizeLimitMiddleware
 from lifetime import register_startup_event, register_shutdown_event
 from router import api_router
-from settings.defaults import PROJECT_NAME
+from settings.defaults import PROJECT_NAME, UPLOAD_MAX_BYTES
 
 app = FastAPI(
     title=PROJECT_NAME,
@@ -28,5 +29,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Reject oversized uploads before they are read, the multipart envelope may add some bytes
+app.add_middleware(
+    RequestSizeLimitMiddleware,
+    max_size_bytes=UPLOAD_MAX_BYTES + 64 * 1024,
+    path_prefixes=["/api/graph/upload"],
+)
+
 # Main router for the API.
 app.include_router(router=api_router, prefix="/api")
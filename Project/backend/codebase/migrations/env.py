@@ -22,6 +22,8 @@ if config.config_file_name is not None:
 # target_metadata = mymodel.Base.metadata
 from monitoring.models.monitoring import *  # noqa
 from graph_creator.models.graph_job import *  # noqa
+from graph_creator.models.graph_job_queue import *  # noqa
+from graph_creator.models.graph_job_stage_metrics import *  # noqa
 
 target_metadata = Base.metadata
 
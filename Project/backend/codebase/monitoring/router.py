@@ -2,6 +2,8 @@ from typing import List
 
 from fastapi import APIRouter, Depends
 
+from graph_creator.services.model_registry import model_registry
+from graph_creator.services.search_index_cache import search_index_cache
 from monitoring.dao.healthcheck_dao import HealthCheckDAO
 from monitoring.schemas.healthcheck import HealthCheckResponse
 
@@ -48,3 +50,25 @@ async def get_dummy_models(
     """
 
     return await check_dao.get_all_healthchecks(limit=limit, offset=offset)
+
+
+@router.get("/models")
+async def get_loaded_models() -> List[dict]:
+    """
+    List the embedding models loaded by this process.
+
+    Returns:
+        name, load time in seconds and memory in bytes of each model
+    """
+    return model_registry.get_stats()
+
+
+@router.get("/search-index-cache")
+async def get_search_index_cache_stats() -> dict:
+    """
+    Hits, misses and size of the cache of loaded graph search indexes.
+
+    Returns:
+        counters and size in bytes of the cache
+    """
+    return search_index_cache.get_stats()
@@ -10,3 +10,79 @@ POSTGRES_PORT = os.getenv("POSTGRES_PORT", "5432")
 POSTGRES_HOST = os.getenv("POSTGRES_HOST", "amos-db")
 
 DB_URL = f"postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
+
+# Storage
+MEDIA_DIRECTORY = os.getenv(
+    "MEDIA_DIRECTORY",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".media"),
+)
+# uploaded documents, stored once per content hash
+DOCUMENTS_DIRECTORY = os.path.join(MEDIA_DIRECTORY, "documents")
+# intermediate results of the graph creation, one directory per graph job
+GRAPH_JOBS_DIRECTORY = os.path.join(MEDIA_DIRECTORY, "graph_jobs")
+# maximum size of an uploaded document
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_MB", 100)) * 1024 * 1024
+
+# Graph creation
+# number of graph jobs processed in parallel by the api itself, 0 leaves them to worker.py
+GRAPH_JOB_WORKERS = int(os.getenv("GRAPH_JOB_WORKERS", 1))
+# number of processes started by worker.py
+GRAPH_WORKER_PROCESSES = int(os.getenv("GRAPH_WORKER_PROCESSES", os.cpu_count() or 1))
+# seconds between polls of an idle worker for queued graph jobs
+GRAPH_JOB_POLL_INTERVAL = float(os.getenv("GRAPH_JOB_POLL_INTERVAL", 2))
+# seconds a claimed graph job stays locked without a heartbeat of its worker
+GRAPH_JOB_LEASE_SECONDS = int(os.getenv("GRAPH_JOB_LEASE_SECONDS", 300))
+# minimum seconds between two progress updates of a running graph job
+GRAPH_PROGRESS_INTERVAL = float(os.getenv("GRAPH_PROGRESS_INTERVAL", 1))
+# a graph job is failed if its workers crashed this many times
+GRAPH_JOB_MAX_ATTEMPTS = int(os.getenv("GRAPH_JOB_MAX_ATTEMPTS", 3))
+
+# LLM
+# maximum number of llm calls in flight at the same time for one graph job
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 4))
+# rate limits of the llm providers, shared by the api and all workers via this database
+LLM_RATE_LIMIT_DB = os.getenv(
+    "LLM_RATE_LIMIT_DB",
+    os.path.join(MEDIA_DIRECTORY, "llm_rate_limits.sqlite3"),
+)
+# persistent cache of llm responses, shared by the api and all workers
+LLM_CACHE_DB = os.getenv(
+    "LLM_CACHE_DB",
+    os.path.join(MEDIA_DIRECTORY, "llm_cache.sqlite3"),
+)
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_MB", 512)) * 1024 * 1024
+# shared chunks of one graph component that are tried at the same time when connecting
+# components, more than 1 speeds up components without a relation in their first chunks
+# at the cost of llm calls that are wasted once an earlier chunk succeeds
+CONNECTION_ATTEMPTS_PER_COMPONENT = int(
+    os.getenv("CONNECTION_ATTEMPTS_PER_COMPONENT", 1)
+)
+# maximum number of graph components checked with one llm call in the batched connection mode
+CONNECTION_BATCH_SIZE = int(os.getenv("CONNECTION_BATCH_SIZE", 8))
+GROQ_REQUESTS_PER_MINUTE = int(os.getenv("GROQ_REQUESTS_PER_MINUTE", 30))
+GROQ_TOKENS_PER_MINUTE = int(os.getenv("GROQ_TOKENS_PER_MINUTE", 30000))
+GEMINI_REQUESTS_PER_MINUTE = int(os.getenv("GEMINI_REQUESTS_PER_MINUTE", 15))
+GEMINI_TOKENS_PER_MINUTE = int(os.getenv("GEMINI_TOKENS_PER_MINUTE", 1000000))
+
+# Embeddings
+# sentence transformer embedding the nodes for topics, merging of duplicates and search
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+# load and warm up the embedding model on startup instead of on the first request
+EMBEDDING_MODEL_WARMUP = os.getenv("EMBEDDING_MODEL_WARMUP", "true").lower() == "true"
+# persistent cache of the embeddings of node names and queries across documents,
+# shared by the api and all workers, the size is per model and 0 disables the cache
+EMBEDDING_CACHE_DIRECTORY = os.path.join(MEDIA_DIRECTORY, "embedding_cache")
+EMBEDDING_CACHE_MAX_BYTES = int(os.getenv("EMBEDDING_CACHE_MAX_MB", 256)) * 1024 * 1024
+# loaded search indexes of graphs kept in memory by the api for /graph_search
+SEARCH_INDEX_CACHE_MAX_BYTES = (
+    int(os.getenv("SEARCH_INDEX_CACHE_MAX_MB", 512)) * 1024 * 1024
+)
+# graphs with fewer nodes get agglomerative topics, BERTopic rarely finds topics in them
+TOPIC_BERTOPIC_MIN_NODES = int(os.getenv("TOPIC_BERTOPIC_MIN_NODES", 300))
+# graphs with more nodes get mini batch k-means topics, BERTopic needs too much memory
+TOPIC_BERTOPIC_MAX_NODES = int(os.getenv("TOPIC_BERTOPIC_MAX_NODES", 20000))
+# graphs with at least this many nodes are deduplicated with the ann search instead of
+# hierarchical clustering, whose distance matrix needs memory quadratic in the nodes
+DEDUP_ANN_MIN_NODES = int(os.getenv("DEDUP_ANN_MIN_NODES", 5000))
+# number of nearest neighbors of each node searched for duplicates
+DEDUP_ANN_NEIGHBORS = int(os.getenv("DEDUP_ANN_NEIGHBORS", 32))
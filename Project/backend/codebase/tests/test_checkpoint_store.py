@@ -0,0 +1,140 @@
+import functools
+
+import pandas as pd
+import pytest
+from langchain_core.documents import Document
+
+import graph_creator.graph_creator_main as graph_creator_main
+from graph_creator.models.graph_job import GraphJob
+from graph_creator.schemas.graph_job import GraphJobOptions
+from graph_creator.services.checkpoint_store import CheckpointStore
+from graph_creator.utils.const import PipelineStage
+
+
+def test_checkpoint_round_trip(tmp_path):
+    """
+    Tests if stored outputs are loaded with their values and types unchanged
+    """
+    # Arrange
+    checkpoints = CheckpointStore("job", jobs_directory=str(tmp_path))
+    df = pd.DataFrame(
+        [{"node_1": "1", "node_2": "b", "edge": "e", "chunk_id": "0"}],
+    )
+
+    # Act
+    checkpoints.save(PipelineStage.CHUNKS, [{"page_content": "text", "metadata": {}}])
+    checkpoints.save(PipelineStage.CONNECTED, df)
+
+    # Assert
+    assert checkpoints.has(PipelineStage.CHUNKS)
+    assert not checkpoints.has(PipelineStage.MERGED)
+    assert checkpoints.load(PipelineStage.CHUNKS) == [
+        {"page_content": "text", "metadata": {}}
+    ]
+    pd.testing.assert_frame_equal(
+        checkpoints.load_dataframe(PipelineStage.CONNECTED), df
+    )
+
+
+def test_failed_graph_job_resumes_after_last_completed_stage(tmp_path, mocker):
+    """
+    Tests if a rerun of a failed graph job reuses chunks and extractions instead
+    of processing the file and calling the llm again
+    """
+    # Arrange
+    mocker.patch(
+        "graph_creator.graph_creator_main.CheckpointStore",
+        functools.partial(CheckpointStore, jobs_directory=str(tmp_path)),
+    )
+    file_handler = mocker.patch("graph_creator.graph_creator_main.FileHandler")
+    file_handler.return_value.process_file_into_chunks.return_value = [
+        Document(page_content="text", metadata={"page": 0})
+    ]
+    llm_handler = mocker.patch(
+        "graph_creator.graph_creator_main.llama_gemini_combination"
+    ).return_value
+    llm_handler.process_chunks.return_value = [
+        [{"node_1": "a", "node_2": "b", "edge": "e"}]
+    ]
+    llm_handler.get_cache_stats.return_value = None
+    llm_handler.get_usage.return_value = {"llm_calls": 0, "llm_tokens": 0}
+    connected = pd.DataFrame(
+        [{"node_1": "a", "node_2": "b", "edge": "e", "chunk_id": "0"}]
+    )
+    connect_with_llm = mocker.patch(
+        "graph_creator.graph_handler.connect_with_llm",
+        side_effect=[RuntimeError("llm unavailable"), connected],
+    )
+    node_embeddings = mocker.patch(
+        "graph_creator.graph_creator_main.NodeEmbeddings"
+    ).from_data.return_value
+    add_topic = mocker.patch(
+        "graph_creator.graph_handler.add_topic",
+        side_effect=lambda df, node_embeddings, backend: df,
+    )
+    embeddings = mocker.patch("graph_creator.graph_creator_main.embeddings_handler")
+    embeddings.return_value.generate_embeddings_and_merge_duplicates.side_effect = (
+        lambda df, node_embeddings, method: df
+    )
+    graph_db = mocker.patch(
+        "graph_creator.graph_creator_main.netx_graphdb.NetXGraphDB"
+    ).return_value
+    g_job = GraphJob(id="job", location="document.pdf")
+
+    # Act
+    with pytest.raises(RuntimeError):
+        graph_creator_main.process_file_to_graph(g_job)
+    graph_creator_main.process_file_to_graph(g_job)
+
+    # Assert
+    assert file_handler.call_count == 1
+    assert llm_handler.process_chunks.call_count == 1
+    assert connect_with_llm.call_count == 2
+    assert add_topic.call_count == 1
+    # topics and merging of duplicates share the embeddings of the nodes
+    assert add_topic.call_args.kwargs["node_embeddings"] is node_embeddings
+    merge = embeddings.return_value.generate_embeddings_and_merge_duplicates
+    assert merge.call_args.kwargs["node_embeddings"] is node_embeddings
+    chunk = connect_with_llm.call_args.args[1][0]
+    assert chunk["page_content"] == "text"
+    assert chunk["metadata"] == {"page": 0}
+    graph_db.save_graph.assert_called_once()
+
+
+def test_checkpoints_of_other_options_are_discarded(tmp_path, mocker):
+    """
+    Tests if a stage run with other options is run again and the outputs of later stages are discarded
+    """
+    # Arrange
+    checkpoints = CheckpointStore("job", jobs_directory=str(tmp_path))
+    first_options = GraphJobOptions()
+    changed_options = GraphJobOptions(max_connection_llm_calls=10)
+    for stage in [PipelineStage.CHUNKS, PipelineStage.CONNECTED, PipelineStage.TOPICS]:
+        checkpoints.save(stage, [str(stage)], first_options.get_stage_options(stage))
+    run = mocker.Mock(return_value=["connected again"])
+
+    # Act
+    chunks = checkpoints.load_or_run(
+        PipelineStage.CHUNKS,
+        run,
+        options=changed_options.get_stage_options(PipelineStage.CHUNKS),
+    )
+    connected = checkpoints.load_or_run(
+        PipelineStage.CONNECTED,
+        run,
+        options=changed_options.get_stage_options(PipelineStage.CONNECTED),
+    )
+
+    # Assert
+    assert chunks == ["chunks"]
+    assert connected == ["connected again"]
+    run.assert_called_once()
+    assert not checkpoints.has(PipelineStage.TOPICS)
+    assert checkpoints.has(
+        PipelineStage.CONNECTED,
+        changed_options.get_stage_options(PipelineStage.CONNECTED),
+    )
+    assert not checkpoints.has(
+        PipelineStage.CONNECTED,
+        first_options.get_stage_options(PipelineStage.CONNECTED),
+    )
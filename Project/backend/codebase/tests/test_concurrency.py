@@ -0,0 +1,107 @@
+import random
+import threading
+import time
+
+from graph_creator.utils.concurrency import first_success_concurrently, map_concurrently
+
+
+def test_map_concurrently_keeps_order():
+    """
+    Tests if results are returned in the order of the items, even if later items finish first
+    """
+    # Arrange
+    items = list(range(20))
+
+    def slow_square(item):
+        time.sleep(random.uniform(0, 0.01))
+        return item * item
+
+    # Act
+    results = map_concurrently(slow_square, items, max_concurrency=8)
+
+    # Assert
+    assert results == [item * item for item in items]
+
+
+def test_map_concurrently_limits_calls_in_flight():
+    """
+    Tests if no more than max_concurrency calls run at the same time
+    """
+    # Arrange
+    lock = threading.Lock()
+    in_flight = {"current": 0, "max": 0}
+
+    def tracked_call(item):
+        with lock:
+            in_flight["current"] += 1
+            in_flight["max"] = max(in_flight["max"], in_flight["current"])
+        time.sleep(0.01)
+        with lock:
+            in_flight["current"] -= 1
+        return item
+
+    # Act
+    map_concurrently(tracked_call, list(range(30)), max_concurrency=3)
+
+    # Assert
+    assert 1 < in_flight["max"] <= 3
+
+
+def test_first_success_concurrently_stops_at_first_success():
+    """
+    Tests if each item gets the result of its first successful attempt and no later attempts are made
+    """
+    # Arrange
+    lock = threading.Lock()
+    calls = []
+    attempts_by_item = [
+        [(0, None), (0, "a"), (0, "b")],
+        [],
+        [(2, None), (2, None)],
+        [(3, "c"), (3, "d")],
+    ]
+
+    def attempt(item_and_result):
+        with lock:
+            calls.append(item_and_result)
+        time.sleep(random.uniform(0, 0.01))
+        return item_and_result[1]
+
+    progress = []
+
+    # Act
+    results = first_success_concurrently(
+        attempt,
+        attempts_by_item,
+        max_concurrency=3,
+        on_done=lambda *counts: progress.append(counts),
+    )
+
+    # Assert
+    assert results == ["a", None, None, "c"]
+    assert (0, "b") not in calls
+    assert (3, "d") not in calls
+    assert progress[-1] == (4, 2, 4)
+
+
+def test_first_success_concurrently_prefers_earlier_attempts():
+    """
+    Tests if a speculative attempt that succeeds first does not win over an earlier attempt
+    """
+
+    # Arrange
+    def attempt(delay_and_result):
+        delay, result = delay_and_result
+        time.sleep(delay)
+        return result
+
+    # Act
+    results = first_success_concurrently(
+        attempt,
+        [[(0.05, "slow"), (0, "fast")], [(0.05, None), (0, "fast")]],
+        max_concurrency=4,
+        max_attempts_per_item=2,
+    )
+
+    # Assert
+    assert results == ["slow", "fast"]
@@ -0,0 +1,200 @@
+import asyncio
+import io
+import os
+import threading
+import uuid
+
+import pytest
+from fastapi import UploadFile
+
+from graph_creator import graph_creator_main
+from graph_creator.dao.graph_job_dao import GraphJobDAO
+from graph_creator.models.graph_job import GraphJob
+from graph_creator.schemas.graph_job import GraphJobCreate
+from graph_creator.services.document_store import DocumentStore, DocumentTooLarge
+from graph_creator.services.graph_job_runner import GraphJobRunner
+from graph_creator.services.netx_graphdb import NetXGraphDB
+from graph_creator.utils.const import GraphStatus
+from tests.test_graph_job_queue import database, get_status
+
+
+def save(document_store, content, filename, size=None):
+    return asyncio.run(
+        document_store.save(
+            UploadFile(io.BytesIO(content), filename=filename, size=size)
+        )
+    )
+
+
+def test_identical_documents_are_stored_once(tmp_path):
+    """
+    Tests if documents are stored by content, independent of their file name
+    """
+    # Arrange
+    document_store = DocumentStore(str(tmp_path))
+
+    # Act
+    location_1, hash_1 = save(document_store, b"content", "a.pdf")
+    location_2, hash_2 = save(document_store, b"content", "b.pdf")
+    location_3, hash_3 = save(document_store, b"other content", "a.pdf")
+
+    # Assert
+    assert location_1 == location_2
+    assert hash_1 == hash_2
+    assert location_3 != location_1
+    assert sorted(os.listdir(tmp_path)) == sorted([f"{hash_1}.pdf", f"{hash_3}.pdf"])
+    with open(location_3, "rb") as f:
+        assert f.read() == b"other content"
+
+
+def test_too_large_document_is_rejected(tmp_path, mocker):
+    """
+    Tests if documents above the maximum size are rejected without leaving files behind
+    """
+    # Arrange
+    mocker.patch("graph_creator.services.document_store.READ_CHUNK_SIZE", 4)
+    document_store = DocumentStore(str(tmp_path), max_size_bytes=10)
+
+    # Act / Assert
+    with pytest.raises(DocumentTooLarge):
+        save(document_store, b"x" * 11, "a.pdf")
+    with pytest.raises(DocumentTooLarge):
+        save(document_store, b"x", "a.pdf", size=11)
+    assert os.listdir(tmp_path) == []
+    assert save(document_store, b"x" * 10, "a.pdf")[0].endswith(".pdf")
+
+
+def test_upload_with_too_large_content_length_is_rejected(client):
+    """
+    Tests if an upload declaring a body above the limit is rejected before it is read
+    """
+    # Act
+    response = client.post(
+        client.app.url_path_for("upload_pdf"),
+        content=b"",
+        headers={"Content-Length": str(10 * 1024 * 1024 * 1024)},
+    )
+
+    # Assert
+    assert response.status_code == 413
+
+
+def test_shared_document_is_deleted_with_last_graph_job(test_db_url, tmp_path):
+    """
+    Tests if a stored document is kept until no graph job refers to it anymore
+    """
+
+    async def run():
+        async with database(test_db_url) as session_factory:
+            # Arrange
+            location, content_hash = await DocumentStore(str(tmp_path)).save(
+                UploadFile(io.BytesIO(b"content"), filename="document.pdf")
+            )
+            async with session_factory() as session:
+                dao = GraphJobDAO(session)
+                g_jobs = [
+                    await dao.create_graph_job_model(
+                        GraphJobCreate(
+                            name=name,
+                            location=location,
+                            status=GraphStatus.DOC_UPLOADED,
+                            content_hash=content_hash,
+                        )
+                    )
+                    for name in ["a.pdf", "b.pdf"]
+                ]
+
+                # Act / Assert
+                await dao.delete_graph_job(g_jobs[0])
+                assert os.path.exists(location)
+                await dao.delete_graph_job(g_jobs[1])
+                assert not os.path.exists(location)
+
+    asyncio.run(run())
+
+
+def test_runner_reuses_graph_of_identical_document(test_db_url, mocker):
+    """
+    Tests if the graph of an identical document is reused instead of created again
+    """
+    pipeline = mocker.patch("graph_creator.graph_creator_main.process_file_to_graph")
+    reuse_graph = mocker.patch("graph_creator.graph_creator_main.reuse_graph")
+
+    async def run():
+        async with database(test_db_url) as session_factory:
+            # Arrange
+            async with session_factory() as session:
+                dao = GraphJobDAO(session)
+                source, g_job = [
+                    await dao.create_graph_job_model(
+                        GraphJobCreate(
+                            name=name,
+                            location="document.pdf",
+                            status=status,
+                            content_hash="0" * 64,
+                        )
+                    )
+                    for name, status in [
+                        ("a.pdf", GraphStatus.GRAPH_READY),
+                        ("b.pdf", GraphStatus.QUEUED),
+                    ]
+                ]
+            runner = GraphJobRunner(session_factory, max_workers=1)
+
+            # Act
+            await runner.run_graph_job(g_job.id)
+            await runner.shutdown()
+
+            # Assert
+            pipeline.assert_not_called()
+            reuse_graph.assert_called_once()
+            assert reuse_graph.call_args.args[0].id == source.id
+            assert reuse_graph.call_args.args[1].id == g_job.id
+            assert await get_status(session_factory, g_job) == GraphStatus.GRAPH_READY
+
+    asyncio.run(run())
+
+
+def test_documents_of_same_content_are_locked(tmp_path):
+    """
+    Tests if the lock of a content hash is held by one thread at a time and other hashes are not locked
+    """
+    # Arrange
+    document_store = DocumentStore(str(tmp_path))
+    events = []
+
+    def lock_twice():
+        with document_store.lock("a" * 64):
+            events.append("second")
+
+    # Act
+    with document_store.lock("a" * 64):
+        thread = threading.Thread(target=lock_twice)
+        thread.start()
+        with document_store.lock("b" * 64):
+            thread.join(0.1)
+            events.append("first")
+    thread.join()
+
+    # Assert
+    assert events == ["first", "second"]
+
+
+def test_graph_of_deleted_graph_job_is_not_reused(mocker, monkeypatch, tmp_path):
+    """
+    Tests if the graph is created from the document if the reused graph job was deleted meanwhile
+    """
+    # Arrange
+    monkeypatch.chdir(tmp_path)
+    mocker.patch.object(NetXGraphDB, "has_graph", return_value=False)
+    copy_graph = mocker.patch.object(NetXGraphDB, "copy_graph")
+    pipeline = mocker.patch("graph_creator.graph_creator_main.process_file_to_graph")
+    source = GraphJob(id=uuid.uuid4(), content_hash="0" * 64)
+    g_job = GraphJob(id=uuid.uuid4(), content_hash="0" * 64)
+
+    # Act
+    graph_creator_main.reuse_graph(source, g_job)
+
+    # Assert
+    copy_graph.assert_not_called()
+    pipeline.assert_called_once_with(g_job, None, None, None)
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from graph_creator.services.embedding_cache import EmbeddingCache
+
+
+def encode_length(texts, model):
+    return np.array([[len(text), 1] for text in texts], dtype=np.float32)
+
+
+def test_only_unseen_texts_are_encoded(tmp_path, mocker):
+    """
+    Tests if cached texts of a model are not encoded again, also by another instance
+    """
+    # Arrange
+    encode = mocker.Mock(side_effect=encode_length)
+    EmbeddingCache(str(tmp_path)).encode(["car", "road"], "model", encode)
+    cache = EmbeddingCache(str(tmp_path))
+
+    # Act
+    embeddings = cache.encode([" car", "wheel", "road", "wheel"], "model", encode)
+    cache.encode(["car"], "other model", encode)
+
+    # Assert
+    assert embeddings.tolist() == [[3, 1], [5, 1], [4, 1], [5, 1]]
+    assert [call.args[0] for call in encode.call_args_list] == [
+        ["car", "road"],
+        ["wheel"],
+        ["car"],
+    ]
+    assert cache.get_stats() == {"hits": 2, "misses": 2}
+
+
+def test_cache_evicts_least_recently_used(tmp_path, mocker):
+    """
+    Tests if the rows of the least recently used texts are reused once the cache is full
+    """
+    # Arrange
+    encode = mocker.Mock(side_effect=encode_length)
+    # room for two embeddings of two float32
+    cache = EmbeddingCache(str(tmp_path), max_size_bytes=16)
+    cache.encode(["first"], "model", encode)
+    cache.encode(["second"], "model", encode)
+    cache.encode(["first"], "model", encode)
+
+    # Act
+    cache.encode(["third"], "model", encode)
+    embeddings = cache.encode(["first", "third", "second"], "model", encode)
+
+    # Assert
+    assert embeddings.tolist() == [[5, 1], [5, 1], [6, 1]]
+    assert encode.call_args_list[-1].args[0] == ["second"]
+
+
+def test_failed_write_keeps_no_overwritten_rows(tmp_path, mocker):
+    """
+    Tests if neither the new nor the evicted texts are served after writing their rows failed
+    """
+    # Arrange
+    encode = mocker.Mock(side_effect=encode_length)
+    # room for one embedding of two float32
+    cache = EmbeddingCache(str(tmp_path), max_size_bytes=8)
+    cache.encode(["first"], "model", encode)
+    flush = mocker.patch.object(np.memmap, "flush", side_effect=OSError("disk full"))
+
+    # Act
+    with pytest.raises(OSError):
+        cache.encode(["second"], "model", encode)
+    flush.side_effect = None
+    cached = cache.get(
+        "model", [cache.get_key("model", text) for text in ["first", "second"]]
+    )
+
+    # Assert
+    assert cached == {}
@@ -0,0 +1,174 @@
+import numpy as np
+import pandas as pd
+from scipy.spatial.distance import cosine
+
+from graph_creator.embedding_handler import embeddings_handler
+from graph_creator.models.graph_job import GraphJob
+from graph_creator.services.model_registry import model_registry
+from graph_creator.services.node_clustering import cluster_nodes
+from graph_creator.services.node_embeddings import NodeEmbeddings
+
+
+def test_duplicate_nodes_are_merged(mocker, monkeypatch, tmp_path):
+    """
+    Tests if duplicate nodes are replaced by their representative and duplicate edges are dropped
+    """
+    # Arrange
+    monkeypatch.chdir(tmp_path)
+    mocker.patch.object(model_registry, "models", {})
+    mocker.patch.object(model_registry, "load_times", {})
+    mocker.patch.object(model_registry, "loader")
+    save_data = mocker.patch.object(embeddings_handler, "save_data")
+    data = pd.DataFrame(
+        [
+            ["car", "road", "drives on", "0", 1, 2],
+            ["cars", "road", "drives on", "1", 1, 2],
+            ["car", "cars", "is", "1", 1, 1],
+            ["cars", "wheel", "has", "2", 1, 3],
+            ["automobile", "wheel", "has", "3", 1, 3],
+        ],
+        columns=[
+            "node_1",
+            "node_2",
+            "edge",
+            "chunk_id",
+            "topic_node_1",
+            "topic_node_2",
+        ],
+    )
+    node_embeddings = NodeEmbeddings(
+        ["car", "cars", "road", "wheel", "automobile"],
+        np.array([[1, 0, 0], [1, 0.01, 0], [0, 1, 0], [0, 0, 1], [1, -0.01, 0]]),
+    )
+
+    # Act
+    merged = embeddings_handler(
+        GraphJob(id="graph")
+    ).generate_embeddings_and_merge_duplicates(data, node_embeddings=node_embeddings)
+
+    # Assert
+    assert merged.to_dict("records") == [
+        {
+            "node_1": "car",
+            "node_2": "road",
+            "edge": "drives on",
+            "chunk_id": "0",
+            "topic_node_1": 1,
+            "topic_node_2": 2,
+            "original_Node_1": "car",
+            "original_Node_2": "road",
+        },
+        {
+            "node_1": "car",
+            "node_2": "wheel",
+            "edge": "has",
+            "chunk_id": "2",
+            "topic_node_1": 1,
+            "topic_node_2": 3,
+            "original_Node_1": "cars",
+            "original_Node_2": "wheel",
+        },
+    ]
+    (embedding_store,) = save_data.call_args.args
+    assert embedding_store.get_merged_nodes() == {
+        "car": ["car", "cars", "automobile"],
+        "road": ["road"],
+        "wheel": ["wheel"],
+    }
+    assert embedding_store.get_node_to_merged() == {
+        "car": "car",
+        "cars": "car",
+        "automobile": "car",
+        "road": "road",
+        "wheel": "wheel",
+    }
+
+
+def merge_nodes_as_before(data, all_nodes, embeddings, labels):
+    """
+    The merging of duplicate nodes before it ran on arrays, kept as reference
+    """
+    embedding_dict = {node: emb for node, emb in zip(all_nodes, embeddings)}
+    merged_nodes = {}
+    node_to_merged = {}
+    for label in set(labels):
+        cluster = [all_nodes[i] for i in range(len(all_nodes)) if labels[i] == label]
+        average_embedding = np.mean([embedding_dict[node] for node in cluster], axis=0)
+        representative_node = min(
+            cluster, key=lambda node: cosine(embedding_dict[node], average_embedding)
+        )
+        merged_nodes[representative_node] = cluster
+        for node in cluster:
+            node_to_merged[node] = representative_node
+
+    seen_edges = set()
+    merged_data = []
+    for _, row in data.iterrows():
+        node_1 = node_to_merged.get(row["node_1"], row["node_1"])
+        node_2 = node_to_merged.get(row["node_2"], row["node_2"])
+        edge_tuple = (node_1, node_2, row["edge"])
+        if node_1 != node_2 and edge_tuple not in seen_edges:
+            merged_data.append(
+                {
+                    "node_1": node_1,
+                    "node_2": node_2,
+                    "edge": row["edge"],
+                    "chunk_id": row["chunk_id"],
+                    "topic_node_1": row["topic_node_1"],
+                    "topic_node_2": row["topic_node_2"],
+                    "original_Node_1": row["node_1"],
+                    "original_Node_2": row["node_2"],
+                }
+            )
+            seen_edges.add(edge_tuple)
+    return pd.DataFrame(merged_data).drop_duplicates(), merged_nodes, node_to_merged
+
+
+def test_merging_matches_previous_implementation(mocker, monkeypatch, tmp_path):
+    """
+    Tests if the merged data and mappings equal those of the previous implementation,
+    also for pairs of duplicates, whose nodes are equally close to their average
+    """
+    # Arrange
+    monkeypatch.chdir(tmp_path)
+    mocker.patch.object(model_registry, "models", {})
+    mocker.patch.object(model_registry, "load_times", {})
+    mocker.patch.object(model_registry, "loader")
+    save_data = mocker.patch.object(embeddings_handler, "save_data")
+    rng = np.random.default_rng(0)
+    distinct = rng.normal(size=(300, 16))
+    embeddings = np.repeat(distinct, 2, axis=0) + rng.normal(scale=0.01, size=(600, 16))
+    nodes = [f"node {i}" for i in range(600)]
+    relations = rng.integers(0, 600, size=(2000, 2))
+    data = pd.DataFrame(
+        {
+            "node_1": [nodes[i] for i in relations[:, 0]],
+            "node_2": [nodes[i] for i in relations[:, 1]],
+            "edge": rng.choice(["has", "is", "uses"], size=2000),
+            "chunk_id": [str(i % 7) for i in range(2000)],
+            "topic_node_1": rng.integers(0, 5, size=2000),
+            "topic_node_2": rng.integers(0, 5, size=2000),
+        }
+    )
+    node_embeddings = NodeEmbeddings(nodes, embeddings.astype(np.float32))
+    all_nodes = pd.concat([data["node_1"], data["node_2"]]).unique()
+    node_embeddings_before = node_embeddings.get(all_nodes)
+
+    # Act
+    merged = embeddings_handler(
+        GraphJob(id="graph")
+    ).generate_embeddings_and_merge_duplicates(
+        data, node_embeddings=node_embeddings, method="hierarchical"
+    )
+    expected, merged_nodes, node_to_merged = merge_nodes_as_before(
+        data,
+        all_nodes,
+        node_embeddings_before,
+        cluster_nodes(node_embeddings_before, 0.2, "hierarchical"),
+    )
+
+    # Assert
+    pd.testing.assert_frame_equal(merged, expected)
+    (embedding_store,) = save_data.call_args.args
+    assert embedding_store.get_node_to_merged() == node_to_merged
+    assert embedding_store.get_merged_nodes() == merged_nodes
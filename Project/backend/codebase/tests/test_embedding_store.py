@@ -0,0 +1,137 @@
+import pickle
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from graph_creator.embedding_handler import embeddings_handler
+from graph_creator.models.graph_job import GraphJob
+from graph_creator.services.embedding_store import EmbeddingStore, migrate_pickles
+
+
+def test_store_is_saved_and_loaded(tmp_path):
+    """
+    Tests if a saved store is loaded memory-mapped with its index and merged nodes
+    """
+    # Arrange
+    embeddings = np.array([[1, 0], [0.9, 0.1], [0, 1]], dtype=np.float32)
+    store = EmbeddingStore(["car", "cars", "road"], embeddings, np.array([0, 0, 2]))
+
+    # Act
+    store.save(str(tmp_path), "graph")
+    loaded = EmbeddingStore.load(str(tmp_path), "graph")
+    positions = loaded.search(np.array([0.1, 1], dtype=np.float32), 2)
+
+    # Assert
+    assert EmbeddingStore.exists(str(tmp_path), "graph")
+    assert isinstance(loaded.embeddings, np.memmap)
+    assert loaded.embeddings.tolist() == embeddings.tolist()
+    assert loaded.get_merged_nodes() == {"car": ["car", "cars"], "road": ["road"]}
+    assert positions.tolist() == [2, 1]
+    assert loaded.get_cluster(1).tolist() == [0, 1]
+
+
+def write_pickles(directory):
+    pickles = {
+        "faiss_index": None,
+        "embedding_dict": {"car": np.array([1.0, 0]), "cars": np.array([0.9, 0.1])},
+        "merged_nodes": {"car": ["car", "cars"]},
+        "node_to_merged": {"car": "car", "cars": "car"},
+    }
+    for name, data in pickles.items():
+        with open(directory / f"graph_{name}.pkl", "wb") as f:
+            pickle.dump(data, f)
+
+
+def test_pickles_are_migrated(tmp_path):
+    """
+    Tests if the pickled search state of a graph is converted into a store
+    """
+    # Arrange
+    write_pickles(tmp_path)
+
+    # Act
+    migrated = migrate_pickles(str(tmp_path), "graph")
+    store = EmbeddingStore.load(str(tmp_path), "graph")
+
+    # Assert
+    assert migrated
+    assert not list(tmp_path.glob("*.pkl"))
+    assert store.get_node_to_merged() == {"car": "car", "cars": "car"}
+    assert store.embeddings.dtype == np.float32
+    assert not migrate_pickles(str(tmp_path), "graph")
+
+
+def test_store_is_replaced_atomically(mocker, tmp_path):
+    """
+    Tests if saving again switches to the new store at once and a failed save keeps the old one
+    """
+    # Arrange
+    directory = str(tmp_path)
+
+    def save(nodes):
+        EmbeddingStore(
+            nodes, np.eye(len(nodes), dtype=np.float32), np.arange(len(nodes))
+        ).save(directory, "graph")
+
+    save(["car", "road"])
+    first_version = EmbeddingStore.get_version(directory, "graph")
+
+    # Act
+    mocker.patch(
+        "graph_creator.services.embedding_store._write_json",
+        side_effect=OSError("disk full"),
+    )
+    with pytest.raises(OSError):
+        save(["car", "road", "wheel"])
+    after_failure = EmbeddingStore.load(directory, "graph")
+    mocker.stopall()
+    save(["car", "road", "wheel"])
+    save(["car"])
+
+    # Assert
+    assert after_failure.nodes == ["car", "road"]
+    assert EmbeddingStore.load(directory, "graph").nodes == ["car"]
+    # the previous version is kept, older and failed versions are deleted
+    assert not (tmp_path / first_version).exists()
+    assert len([path for path in tmp_path.iterdir() if path.is_dir()]) == 2
+
+
+def test_concurrent_migrations_migrate_once(tmp_path):
+    """
+    Tests if graphs migrated by several threads at once are migrated by one of them without errors
+    """
+    # Arrange
+    write_pickles(tmp_path)
+
+    # Act
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        migrated = list(
+            executor.map(lambda _: migrate_pickles(str(tmp_path), "graph"), range(8))
+        )
+
+    # Assert
+    assert migrated.count(True) == 1
+    assert not list(tmp_path.glob("*.pkl"))
+    assert EmbeddingStore.load(str(tmp_path), "graph").nodes == ["car", "cars"]
+
+
+def test_corrupt_pickles_do_not_break_the_handler(monkeypatch, tmp_path):
+    """
+    Tests if a graph whose pickles cannot be migrated is handled as not embedded
+    """
+    # Arrange
+    monkeypatch.chdir(tmp_path)
+    graph_id = uuid.uuid4()
+    graph_dir = tmp_path / ".media" / "embeddings" / str(graph_id)
+    graph_dir.mkdir(parents=True)
+    for name in ["faiss_index", "embedding_dict", "merged_nodes", "node_to_merged"]:
+        (graph_dir / f"{graph_id}_{name}.pkl").write_bytes(b"not a pickle")
+
+    # Act
+    handler = embeddings_handler(GraphJob(id=graph_id))
+
+    # Assert
+    assert not handler.is_embedded()
+    assert len(list(graph_dir.glob("*.pkl"))) == 4
@@ -1,9 +1,12 @@
 from requests import patch
 from graph_creator import graph_handler
+from graph_creator.services.model_registry import model_registry
 from unittest.mock import patch
 
 import json
+import numpy as np
 import pandas as pd
+import pytest
 
 
 def test_component_extraction():
@@ -30,6 +33,70 @@ def test_component_extraction_with_merge():
     assert len(components) == 1
 
 
+def test_component_extraction_keeps_order():
+    """
+    Tests if components are ordered by their first relation and their entities by first appearance
+    """
+    # Arrange
+    testdata = [[9, 2], [6, 8], [2, 3], [8, 9], [4, 5], [5, 5]]
+    # Act
+    components = graph_handler.extract_components(testdata)
+    # Assert
+    assert components == [[9, 2, 6, 8, 3], [4, 5]]
+    assert graph_handler.extract_components([]) == []
+
+
+def test_entity_relation_indexing():
+    """
+    Tests if relations and chunks are translated to entity indexes
+    """
+    # Arrange
+    data = pd.DataFrame(
+        [
+            {"node_1": "b", "node_2": "a", "edge": "x", "chunk_id": "1"},
+            {"node_1": "c", "node_2": "b", "edge": "y", "chunk_id": "0"},
+            {"node_1": "a", "node_2": "c", "edge": None, "chunk_id": "0"},
+            {"node_1": "d", "node_2": "a", "edge": "z", "chunk_id": "1"},
+        ]
+    )
+    entities = graph_handler.extract_entity_set(data)
+
+    # Act
+    entities_dict, relations_list = graph_handler.index_entity_relation_table(
+        data, entities
+    )
+    entities_by_chunk = graph_handler.get_entities_by_chunk(data, entities_dict)
+
+    # Assert
+    assert entities_dict == {"a": 0, "b": 1, "c": 2, "d": 3}
+    assert relations_list == [[1, 0], [2, 1], [3, 0]]
+    assert list(entities_by_chunk.items()) == [("1", [1, 0, 3, 0]), ("0", [2, 1])]
+
+
+def test_shared_chunks_by_component():
+    """
+    Tests if the shared chunks of two components are found with their entities of each component
+    """
+    # Arrange
+    entity_chunks_list = {"0": [0, 1, 2], "1": [3, 4], "2": [1, 4, 5], "3": [0, 5]}
+    components = [[0, 1, 2], [3, 4], [5]]
+
+    # Act
+    chunk_index = graph_handler.ChunkIndex(entity_chunks_list, components)
+    shared_chunks, intersections = chunk_index.get_shared_chunks(0, 2)
+
+    # Assert
+    assert shared_chunks == ["2", "3"]
+    assert intersections == {
+        "2": {"c1": {1}, "c2": {5}},
+        "3": {"c1": {0}, "c2": {5}},
+    }
+    assert chunk_index.get_shared_chunks(0, 1) == (["2"], {"2": {"c1": {1}, "c2": {4}}})
+    assert graph_handler.get_shared_chunks_by_component(
+        components[1], components[2], entity_chunks_list
+    ) == (["2"], {"2": {"c1": {4}, "c2": {5}}})
+
+
 def test_relation_extraction_from_llm_output():
     """
     Tests if a relation dictionary can be extracted from the llm output
@@ -74,6 +141,182 @@ def test_relation_extraction_from_llm_entity_not_in_lists():
     assert relation is None
 
 
+def test_relations_extraction_from_llm_output_list():
+    """
+    Tests if a list of relations is extracted with at most one valid relation per component
+    """
+    # Arrange
+    llm_response = """
+        Here is the data:[
+            {"node_1": "Autonomous", "node_2": "Conference", "edge": "held"},
+            {"node_1": "Autonomous", "node_2": "Venue", "edge": "at"},
+            {"node_1": "NewEntity", "node_2": "Car", "edge": "drives"},
+            {"node_1": "Autonomous", "node_2": "Car", "edge": "is"}
+        ]
+    """
+    # Act
+    relations = graph_handler.extract_relations_from_llm_output(
+        llm_response,
+        ["Autonomous"],
+        [["Conference", "Venue"], ["Road"], ["Car"]],
+    )
+    # Assert
+    assert relations == [
+        {"node_1": "Autonomous", "node_2": "Conference", "edge": "held"},
+        None,
+        {"node_1": "Autonomous", "node_2": "Car", "edge": "is"},
+    ]
+
+
+def test_component_connection_in_batches():
+    """
+    Tests if components sharing a chunk are checked together and retried in their other chunks
+    """
+    # Arrange
+    attempts_by_component = [
+        [("0", {"c1": {0}, "c2": {1}}), ("1", {"c1": {0}, "c2": {1}})],
+        [("1", {"c1": {0}, "c2": {2}})],
+        [("1", {"c1": {0}, "c2": {3}})],
+        [],
+    ]
+    batches = []
+
+    def check_batch(chunk_id, intersections):
+        batches.append((chunk_id, [next(iter(i["c2"])) for i in intersections]))
+        if chunk_id == "1":
+            return [None, {"node_2": 2}, None]
+        return [{"node_2": 1}]
+
+    # Act
+    relations = graph_handler.connect_components_in_batches(
+        attempts_by_component, check_batch, batch_size=8
+    )
+
+    # Assert
+    assert batches == [("1", [1, 2, 3]), ("0", [1])]
+    assert relations == [{"node_2": 1}, {"node_2": 2}, None, None]
+
+
+def test_pre_connection_of_components(mocker):
+    """
+    Tests if components are connected by name matches, chunk proximity and embedding similarity
+    """
+    # Arrange
+    data = pd.DataFrame(
+        [
+            {
+                "node_1": "Neural Network",
+                "node_2": "Layer",
+                "edge": "has",
+                "chunk_id": "0",
+            },
+            {
+                "node_1": "neural-network",
+                "node_2": "Training",
+                "edge": "needs",
+                "chunk_id": "1",
+            },
+            {"node_1": "GPU", "node_2": "CUDA", "edge": "runs", "chunk_id": "1"},
+            {"node_1": "Car", "node_2": "Road", "edge": "drives on", "chunk_id": "2"},
+            {"node_1": "Cars", "node_2": "Wheel", "edge": "have", "chunk_id": "3"},
+        ]
+    )
+    mocker.patch.object(model_registry, "models", {})
+    mocker.patch.object(model_registry, "load_times", {})
+    model = mocker.patch.object(model_registry, "loader").return_value
+
+    # only the names of Car and Cars are similar
+    def encode(names, **kwargs):
+        embeddings = np.eye(len(names))
+        embeddings[[name.startswith("Car") for name in names]] = 1
+        return embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+    model.encode.side_effect = encode
+
+    # Act
+    connected, counts = graph_handler.pre_connect_components(
+        data.copy(),
+        ["name_match", "chunk_proximity", "embedding_similarity"],
+    )
+
+    # Assert
+    entities = graph_handler.extract_entity_set(connected)
+    _, relations_list = graph_handler.index_entity_relation_table(connected, entities)
+    assert counts == {"name_match": 1, "chunk_proximity": 1, "embedding_similarity": 1}
+    assert len(graph_handler.extract_components(relations_list)) == 2
+    assert list(connected["edge"][len(data) :]) == [
+        "same as",
+        "text proximity",
+        "similar to",
+    ]
+
+
+def test_component_connection_within_llm_call_budget(mocker):
+    """
+    Tests if no more llm calls are made than the budget allows
+    """
+    # Arrange
+    llm_handler = mocker.Mock()
+    llm_handler.check_for_connecting_relation.return_value = "[]"
+
+    with open("tests/data/llmExtractedInformation.json") as file:
+        entities_and_relations = json.load(file)
+    with open("tests/data/chunks.json") as file:
+        chunks = json.load(file)
+    data = graph_handler.build_flattened_dataframe(entities_and_relations)
+
+    # Act
+    graph_handler.connect_with_llm(
+        data, chunks, llm_handler, with_topics=False, max_llm_calls=5
+    )
+
+    # Assert
+    assert llm_handler.check_for_connecting_relation.call_count == 5
+
+
+def test_add_relations_to_data():
+    """
+    Tests if relations are appended at once and incomplete relations are skipped
+    """
+    # Arrange
+    data = pd.DataFrame(
+        [{"node_1": "a", "node_2": "b", "edge": "x", "chunk_id": "0"}], index=[5]
+    )
+    new_relations = [
+        {"chunk_id": "1", "edge": "y", "node_2": "c", "node_1": "b", "extra": 1},
+        {"node_1": "c", "node_2": "d", "edge": None, "chunk_id": "1"},
+    ]
+
+    # Act
+    result = graph_handler.add_relations_to_data(data, new_relations)
+
+    # Assert
+    assert result.to_dict("records") == [
+        {"node_1": "a", "node_2": "b", "edge": "x", "chunk_id": "0"},
+        {"node_1": "b", "node_2": "c", "edge": "y", "chunk_id": "1"},
+    ]
+    assert len(data) == 1
+
+
+def test_append_relations_checks_columns():
+    """
+    Tests if relations that do not match the columns of the relation table are rejected
+    """
+    # Arrange
+    data = pd.DataFrame(columns=graph_handler.RELATION_COLUMNS)
+
+    # Act / Assert
+    with pytest.raises(ValueError, match="missing columns: \\['chunk_id'\\]"):
+        graph_handler.append_relations(
+            data, [{"node_1": "a", "node_2": "b", "edge": "x"}]
+        )
+    with pytest.raises(ValueError, match="unknown columns: \\['weight'\\]"):
+        graph_handler.append_relations(
+            data,
+            [{"node_1": "a", "node_2": "b", "edge": "x", "chunk_id": "0", "weight": 1}],
+        )
+
+
 def test_component_connection_with_llm(mocker):
     """
     Tests if component combination with llm works
@@ -0,0 +1,27 @@
+import time
+
+from graph_creator.services.graph_job_progress import GraphJobProgress
+from graph_creator.utils.const import GraphStatus
+
+
+def test_coalesced_counters_are_published(mocker):
+    """
+    Tests if counters updated within the interval are published once it expired and when their stage finished
+    """
+    # Arrange
+    publish = mocker.Mock()
+    progress = GraphJobProgress(publish, interval=0.05)
+    progress.start_stage(GraphStatus.EXTRACTING)
+
+    # Act
+    progress.update(chunks_extracted=1, chunks_total=4)
+    progress.update(chunks_extracted=2, chunks_total=4)
+    time.sleep(0.2)
+    progress.update(chunks_extracted=3, chunks_total=4)
+    progress.update(chunks_extracted=4, chunks_total=4)
+    progress.start_stage(GraphStatus.CONNECTING)
+    progress.flush()
+
+    # Assert
+    published = [call.args[0]["chunks_extracted"] for call in publish.call_args_list]
+    assert published == [2, 3, 4]
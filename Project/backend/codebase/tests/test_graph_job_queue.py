@@ -0,0 +1,262 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from common.models import Base
+from graph_creator.dao.graph_job_dao import GraphJobDAO
+from graph_creator.dao.graph_job_queue_dao import GraphJobQueueDAO
+from graph_creator.models.graph_job_queue import GraphJobQueueItem
+from graph_creator.schemas.graph_job import GraphJobCreate
+from graph_creator.services.graph_job_runner import GraphJobRunner
+from graph_creator.utils.const import GraphStatus
+
+
+@asynccontextmanager
+async def database(db_url):
+    """
+    Creates all tables in the test database and yields a session factory for it
+    """
+    engine = create_async_engine(db_url)
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.drop_all)
+        await connection.run_sync(Base.metadata.create_all)
+    try:
+        yield async_sessionmaker(engine, expire_on_commit=False)
+    finally:
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.drop_all)
+        await engine.dispose()
+
+
+async def create_queued_graph_job(session_factory, name="document.pdf"):
+    async with session_factory() as session:
+        g_job = await GraphJobDAO(session).create_graph_job_model(
+            GraphJobCreate(name=name, location=name, status=GraphStatus.QUEUED)
+        )
+        await GraphJobQueueDAO(session).enqueue(g_job)
+    return g_job
+
+
+async def get_queue_length(session_factory):
+    async with session_factory() as session:
+        return (
+            await session.execute(select(func.count()).select_from(GraphJobQueueItem))
+        ).scalar()
+
+
+async def get_status(session_factory, g_job):
+    async with session_factory() as session:
+        return (await GraphJobDAO(session).get_graph_job_by_id(g_job.id)).status
+
+
+def test_claimed_item_is_locked_until_lease_expires(test_db_url):
+    """
+    Tests if a claimed graph job is skipped by other workers until its lease ran out
+    """
+
+    async def run():
+        async with database(test_db_url) as session_factory:
+            # Arrange
+            g_job = await create_queued_graph_job(session_factory)
+            async with session_factory() as session:
+                await GraphJobQueueDAO(session).enqueue(g_job)
+
+            # Act
+            async with session_factory() as session:
+                dao = GraphJobQueueDAO(session)
+                first = await dao.claim_next("worker-1", lease_seconds=-1)
+            async with session_factory() as session:
+                dao = GraphJobQueueDAO(session)
+                reclaimed = await dao.claim_next("worker-2", lease_seconds=60)
+                locked = await dao.claim_next("worker-3", lease_seconds=60)
+
+            # Assert
+            assert first.graph_job_id == g_job.id
+            assert reclaimed.id == first.id
+            assert reclaimed.claimed_by == "worker-2"
+            assert reclaimed.attempts == 2
+            assert locked is None
+
+    asyncio.run(run())
+
+
+def test_graph_job_is_queued_once(test_db_url):
+    """
+    Tests if queueing a graph job sets its status with its queue item once and other graph jobs are not queued
+    """
+
+    async def run():
+        async with database(test_db_url) as session_factory:
+            # Arrange
+            async with session_factory() as session:
+                dao = GraphJobDAO(session)
+                uploaded, ready = [
+                    await dao.create_graph_job_model(
+                        GraphJobCreate(name=name, location=name, status=status)
+                    )
+                    for name, status in [
+                        ("a.pdf", GraphStatus.DOC_UPLOADED),
+                        ("b.pdf", GraphStatus.GRAPH_READY),
+                    ]
+                ]
+
+            # Act
+            queued = []
+            for g_job in [uploaded, uploaded, ready]:
+                async with session_factory() as session:
+                    queued.append(
+                        await GraphJobQueueDAO(session).queue_graph_job(
+                            g_job.id, {"use_llm_cache": False}
+                        )
+                    )
+
+            # Assert
+            assert queued == [True, True, False]
+            assert await get_queue_length(session_factory) == 1
+            assert await get_status(session_factory, uploaded) == GraphStatus.QUEUED
+            assert await get_status(session_factory, ready) == GraphStatus.GRAPH_READY
+
+    asyncio.run(run())
+
+
+def test_runner_processes_queue(test_db_url, mocker):
+    """
+    Tests if the runner creates the graphs of all queued graph jobs and empties the queue
+    """
+    processed = []
+    mocker.patch(
+        "graph_creator.graph_creator_main.process_file_to_graph",
+        side_effect=lambda g_job, *callbacks, **kwargs: processed.append(g_job.name),
+    )
+
+    async def run():
+        async with database(test_db_url) as session_factory:
+            # Arrange
+            g_jobs = [
+                await create_queued_graph_job(session_factory, f"document_{i}.pdf")
+                for i in range(3)
+            ]
+            runner = GraphJobRunner(session_factory, max_workers=2, poll_interval=0.05)
+
+            # Act
+            runner.start()
+            for _ in range(100):
+                if await get_queue_length(session_factory) == 0:
+                    break
+                await asyncio.sleep(0.05)
+            await runner.shutdown()
+
+            # Assert
+            assert sorted(processed) == sorted(g_job.name for g_job in g_jobs)
+            for g_job in g_jobs:
+                assert (
+                    await get_status(session_factory, g_job) == GraphStatus.GRAPH_READY
+                )
+
+    asyncio.run(run())
+
+
+def test_runner_retries_graph_job_after_database_error(test_db_url, mocker):
+    """
+    Tests if a graph job whose run raised is retried and the runner keeps processing the queue
+    """
+    processed = []
+    mocker.patch(
+        "graph_creator.graph_creator_main.process_file_to_graph",
+        side_effect=lambda g_job, *callbacks, **kwargs: processed.append(g_job.name),
+    )
+    errors = [ConnectionError("database is gone")]
+
+    async def get_reusable_graph_job(g_job):
+        if errors:
+            raise errors.pop()
+        return None
+
+    mocker.patch.object(
+        GraphJobRunner, "_get_reusable_graph_job", side_effect=get_reusable_graph_job
+    )
+
+    async def run():
+        async with database(test_db_url) as session_factory:
+            # Arrange
+            g_jobs = [
+                await create_queued_graph_job(session_factory, f"document_{i}.pdf")
+                for i in range(2)
+            ]
+            runner = GraphJobRunner(session_factory, max_workers=1, poll_interval=0.05)
+
+            # Act
+            runner.start()
+            for _ in range(100):
+                if await get_queue_length(session_factory) == 0:
+                    break
+                await asyncio.sleep(0.05)
+            await runner.shutdown()
+
+            # Assert
+            assert sorted(processed) == sorted(g_job.name for g_job in g_jobs)
+            for g_job in g_jobs:
+                assert (
+                    await get_status(session_factory, g_job) == GraphStatus.GRAPH_READY
+                )
+
+    asyncio.run(run())
+
+
+def test_runner_fails_abandoned_graph_job(test_db_url, mocker):
+    """
+    Tests if a graph job whose workers crashed too often is failed instead of retried
+    """
+    pipeline = mocker.patch("graph_creator.graph_creator_main.process_file_to_graph")
+    mocker.patch("graph_creator.services.graph_job_runner.GRAPH_JOB_MAX_ATTEMPTS", 1)
+
+    async def run():
+        async with database(test_db_url) as session_factory:
+            # Arrange
+            g_job = await create_queued_graph_job(session_factory)
+            async with session_factory() as session:
+                await GraphJobQueueDAO(session).claim_next("crashed", lease_seconds=-1)
+            async with session_factory() as session:
+                item = await GraphJobQueueDAO(session).claim_next("worker", 60)
+            runner = GraphJobRunner(session_factory, max_workers=1)
+
+            # Act
+            await runner.process_item(item)
+            await runner.shutdown()
+
+            # Assert
+            assert await get_status(session_factory, g_job) == GraphStatus.FAILED
+            pipeline.assert_not_called()
+
+    asyncio.run(run())
+
+
+def test_progress_stream_ends_with_graph_job(test_db_url):
+    """
+    Tests if the progress stream sends the state of a finished graph job and ends
+    """
+
+    async def run():
+        async with database(test_db_url) as session_factory:
+            # Arrange
+            g_job = await create_queued_graph_job(session_factory)
+            async with session_factory() as session:
+                dao = GraphJobDAO(session)
+                g_job = await dao.get_graph_job_by_id(g_job.id)
+                await dao.update_graph_job_progress(
+                    g_job, {"stage": GraphStatus.GRAPH_READY}, GraphStatus.GRAPH_READY
+                )
+            runner = GraphJobRunner(session_factory, max_workers=1)
+
+            # Act
+            events = [event async for event in runner.stream_progress(g_job.id)]
+            await runner.shutdown()
+
+            # Assert
+            assert len(events) == 1
+            assert events[0].startswith("event: progress\ndata: ")
+            assert '"status": "graph_ready"' in events[0]
+
+    asyncio.run(run())
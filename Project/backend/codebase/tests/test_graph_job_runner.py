@@ -0,0 +1,108 @@
+import asyncio
+import uuid
+
+from graph_creator.services.graph_job_runner import GraphJobRunner
+from graph_creator.utils.const import GraphStatus
+
+
+def run_job(mocker, pipeline, progresses=None):
+    """
+    Runs a single job through the runner with a mocked pipeline and returns the recorded statuses
+    """
+    statuses = []
+
+    async def set_status(self, graph_job_id, status=None, progress=None):
+        if status is not None:
+            statuses.append(status)
+        if progresses is not None:
+            progresses.append(progress)
+
+    mocker.patch.object(GraphJobRunner, "_set_status", set_status)
+    mocker.patch(
+        "graph_creator.services.graph_job_runner.GraphJobDAO.get_graph_job_by_id",
+        return_value=mocker.Mock(
+            id=uuid.uuid4(), location="document.pdf", options=None, content_hash=None
+        ),
+    )
+    mocker.patch(
+        "graph_creator.graph_creator_main.process_file_to_graph", side_effect=pipeline
+    )
+
+    async def run():
+        runner = GraphJobRunner(mocker.MagicMock(), max_workers=1)
+        await runner.run_graph_job(uuid.uuid4())
+        await runner.shutdown()
+
+    asyncio.run(run())
+    return statuses
+
+
+def test_graph_job_runner_reports_stages(mocker):
+    """
+    Tests if the stages reported by the pipeline are persisted and the job ends as ready
+    """
+
+    # Arrange
+    def pipeline(g_job, on_status, on_progress, on_metrics):
+        on_status(GraphStatus.EXTRACTING)
+        on_status(GraphStatus.CONNECTING)
+        on_status(GraphStatus.EMBEDDING)
+
+    # Act
+    statuses = run_job(mocker, pipeline)
+
+    # Assert
+    assert statuses == [
+        GraphStatus.EXTRACTING,
+        GraphStatus.CONNECTING,
+        GraphStatus.EMBEDDING,
+        GraphStatus.GRAPH_READY,
+    ]
+
+
+def test_graph_job_runner_marks_failed_jobs(mocker):
+    """
+    Tests if an exception in the pipeline sets the job to failed
+    """
+
+    # Arrange
+    def pipeline(g_job, on_status, on_progress, on_metrics):
+        on_status(GraphStatus.EXTRACTING)
+        raise ValueError("extraction failed")
+
+    # Act
+    statuses = run_job(mocker, pipeline)
+
+    # Assert
+    assert statuses == [GraphStatus.EXTRACTING, GraphStatus.FAILED]
+
+
+def test_graph_job_runner_publishes_progress(mocker):
+    """
+    Tests if counters reported by the pipeline are persisted with the current stage
+    """
+    mocker.patch("graph_creator.services.graph_job_runner.GRAPH_PROGRESS_INTERVAL", 0)
+
+    # Arrange
+    def pipeline(g_job, on_status, on_progress, on_metrics):
+        on_status(GraphStatus.EXTRACTING)
+        on_progress(chunks_extracted=1, chunks_total=2)
+        on_progress(chunks_extracted=2, chunks_total=2)
+
+    progresses = []
+
+    # Act
+    run_job(mocker, pipeline, progresses)
+
+    # Assert
+    assert [progress["stage"] for progress in progresses] == [
+        GraphStatus.EXTRACTING,
+        GraphStatus.EXTRACTING,
+        GraphStatus.EXTRACTING,
+        GraphStatus.GRAPH_READY,
+    ]
+    assert progresses[1]["chunks_extracted"] == 1
+    assert progresses[2]["chunks_extracted"] == 2
+    assert progresses[2]["chunks_total"] == 2
+    assert "chunks_total" not in progresses[3]
+    assert progresses[3]["stage_elapsed"] >= 0
@@ -0,0 +1,99 @@
+from unittest.mock import MagicMock
+
+from graph_creator.services.llm.llama3 import llama3
+from graph_creator.services.llm.response_cache import LlmResponseCache
+
+
+def test_cache_hits_and_misses(tmp_path):
+    """
+    Tests if responses are cached per provider, model and prompt and hits and misses are counted
+    """
+    # Arrange
+    cache = LlmResponseCache(db_path=str(tmp_path / "cache.db"))
+    prompt = [{"role": "user", "content": "context: ```text``` \n\n output: "}]
+
+    # Act
+    miss = cache.get("groq", "llama3-8b-8192", prompt)
+    cache.put("groq", "llama3-8b-8192", prompt, "[]")
+    hit = cache.get("groq", "llama3-8b-8192", prompt)
+    other_model = cache.get("groq", "llama3-70b-8192", prompt)
+
+    # Assert
+    assert miss is None
+    assert hit == "[]"
+    assert other_model is None
+    assert cache.get_stats() == {"hits": 1, "misses": 2}
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    """
+    Tests if the least recently used responses are evicted once the cache is full
+    """
+    # Arrange
+    cache = LlmResponseCache(db_path=str(tmp_path / "cache.db"), max_size_bytes=25)
+    cache.put("groq", "model", "first", "a" * 10)
+    cache.put("groq", "model", "second", "b" * 10)
+    cache.get("groq", "model", "first")
+
+    # Act
+    cache.put("groq", "model", "third", "c" * 10)
+
+    # Assert
+    assert cache.get("groq", "model", "first") == "a" * 10
+    assert cache.get("groq", "model", "second") is None
+    assert cache.get("groq", "model", "third") == "c" * 10
+
+
+def test_cache_keeps_total_size_of_responses(tmp_path):
+    """
+    Tests if the running total of the response sizes follows replaced and evicted responses
+    """
+    # Arrange
+    db_path = str(tmp_path / "cache.db")
+    cache = LlmResponseCache(db_path=db_path, max_size_bytes=25)
+
+    # Act
+    cache.put("groq", "model", "first", "a" * 10)
+    cache.put("groq", "model", "first", "a" * 5)
+    cache.put("groq", "model", "second", "b" * 10)
+    cache.put("groq", "model", "third", "c" * 20)
+    reopened = LlmResponseCache(db_path=db_path, max_size_bytes=25)
+
+    # Assert
+    with reopened.transaction() as connection:
+        total_size = connection.execute(
+            "SELECT total_size FROM llm_response_meta"
+        ).fetchone()[0]
+        sum_of_sizes = connection.execute(
+            "SELECT SUM(size) FROM llm_response"
+        ).fetchone()[0]
+    assert total_size == sum_of_sizes == 20
+    assert reopened.get("groq", "model", "third") == "c" * 20
+
+
+def test_llm_handler_serves_repeated_prompts_from_cache(tmp_path, monkeypatch, mocker):
+    """
+    Tests if a repeated prompt is answered from the cache without calling the provider
+    """
+    # Arrange
+    monkeypatch.setenv("GROQ_API_KEY", "test")
+    mocker.patch(
+        "graph_creator.services.llm.llama3.LlmResponseCache",
+        lambda: LlmResponseCache(db_path=str(tmp_path / "cache.db")),
+    )
+    mocker.patch("graph_creator.services.llm.llama3.RateLimiter")
+    handler = llama3()
+    handler.genai_client = MagicMock()
+    completion = handler.genai_client.chat.completions.create.return_value
+    completion.choices[0].message.content = (
+        '[{"node_1": "A", "node_2": "B", "edge": "C"}]'
+    )
+
+    # Act
+    first = handler.extract_entities_and_relations("A is related to B")
+    second = handler.extract_entities_and_relations("A is related to B")
+
+    # Assert
+    assert first == second
+    handler.genai_client.chat.completions.create.assert_called_once()
+    assert handler.get_cache_stats() == {"hits": 1, "misses": 1}
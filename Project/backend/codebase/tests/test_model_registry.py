@@ -0,0 +1,53 @@
+import threading
+import time
+
+import torch
+
+from graph_creator.services.model_registry import ModelRegistry
+
+
+def test_model_is_loaded_once_by_concurrent_threads(mocker):
+    """
+    Tests if threads asking for the same model at once share one load of it
+    """
+
+    # Arrange
+    def load(model_name):
+        time.sleep(0.05)
+        return mocker.Mock(name=model_name)
+
+    loader = mocker.Mock(side_effect=load)
+    registry = ModelRegistry(loader)
+    models = []
+
+    def get_model():
+        models.append(registry.get("model"))
+
+    threads = [threading.Thread(target=get_model) for _ in range(8)]
+
+    # Act
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Assert
+    assert loader.call_count == 1
+    assert all(model is models[0] for model in models)
+
+
+def test_model_stats_report_memory():
+    """
+    Tests if the memory of the parameters of a loaded model is reported
+    """
+    # Arrange
+    registry = ModelRegistry(lambda model_name: torch.nn.Linear(4, 2))
+
+    # Act
+    registry.get("model")
+    stats = registry.get_stats()
+
+    # Assert
+    assert [stat["model_name"] for stat in stats] == ["model"]
+    # 4 * 2 weights and 2 biases of 4 bytes
+    assert stats[0]["memory_bytes"] == 40
@@ -0,0 +1,60 @@
+import numpy as np
+
+from graph_creator.services import node_clustering
+from graph_creator.utils.const import DedupMethod
+
+
+def duplicate_embeddings():
+    # three groups of near duplicates around orthogonal directions
+    rng = np.random.default_rng(0)
+    directions = np.eye(8)[[0, 1, 0, 2, 1, 0]]
+    return directions + rng.normal(scale=0.01, size=directions.shape)
+
+
+def test_dedup_method_is_selected_by_number_of_nodes(mocker):
+    """
+    Tests if the auto method chooses hierarchical clustering for small graphs only
+    """
+    # Arrange
+    mocker.patch.object(node_clustering, "DEDUP_ANN_MIN_NODES", 10)
+
+    # Act / Assert
+    assert node_clustering.select_dedup_method("auto", 9) == DedupMethod.HIERARCHICAL
+    assert node_clustering.select_dedup_method("auto", 10) == DedupMethod.ANN
+    assert node_clustering.select_dedup_method("ann", 2) == DedupMethod.ANN
+
+
+def test_ann_and_hierarchical_clustering_agree():
+    """
+    Tests if both methods find the same groups of duplicates
+    """
+    # Arrange
+    embeddings = duplicate_embeddings()
+
+    # Act
+    hierarchical = node_clustering.cluster_nodes(embeddings, 0.2, "hierarchical")
+    ann = node_clustering.cluster_nodes(embeddings, 0.2, "ann")
+
+    # Assert
+    for labels in [hierarchical, ann]:
+        groups = {tuple(np.flatnonzero(labels == label)) for label in labels}
+        assert groups == {(0, 2, 5), (1, 4), (3,)}
+
+
+def test_cluster_representatives():
+    """
+    Tests if the node closest to the average of its cluster represents the cluster
+    """
+    # Arrange
+    embeddings = np.array([[1, 0], [1, 0], [0, 1], [1, 0.2], [1, 0.4]])
+    labels = np.array([2, 1, 1, 2, 2])
+
+    # Act
+    clusters, representatives = node_clustering.get_cluster_representatives(
+        embeddings, labels
+    )
+
+    # Assert
+    assert [cluster.tolist() for cluster in clusters] == [[1, 2], [0, 3, 4]]
+    # the first node on ties, both nodes of cluster 1 are equally close
+    assert representatives.tolist() == [1, 3]
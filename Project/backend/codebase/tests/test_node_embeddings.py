@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+
+from graph_creator.services.model_registry import model_registry
+from graph_creator.services.node_embeddings import NodeEmbeddings
+
+
+def test_nodes_are_embedded_once(mocker):
+    """
+    Tests if all nodes are embedded with one call and only unknown nodes are embedded later
+    """
+    # Arrange
+    mocker.patch(
+        "graph_creator.services.embedding_cache.get_embedding_cache", return_value=None
+    )
+    mocker.patch.object(model_registry, "models", {})
+    mocker.patch.object(model_registry, "load_times", {})
+    model = mocker.patch.object(model_registry, "loader").return_value
+    model.encode.side_effect = lambda nodes: np.array([[len(node)] for node in nodes])
+    data = pd.DataFrame(
+        [
+            {"node_1": "a", "node_2": "bb", "edge": "x"},
+            {"node_1": "bb", "node_2": "ccc", "edge": "y"},
+        ]
+    )
+
+    # Act
+    node_embeddings = NodeEmbeddings.from_data(data)
+    embeddings = node_embeddings.get(["ccc", "a", "dddd", "dddd"])
+
+    # Assert
+    assert node_embeddings.nodes == ["a", "bb", "ccc", "dddd"]
+    assert embeddings.tolist() == [[3], [1], [4], [4]]
+    assert model.encode.call_count == 2
+    assert list(model.encode.call_args_list[1].args[0]) == ["dddd"]
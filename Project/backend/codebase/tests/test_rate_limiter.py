@@ -0,0 +1,91 @@
+import threading
+import time
+
+import pytest
+
+from graph_creator.services.llm.rate_limiter import RateLimiter, RateLimitExceeded
+
+
+def test_request_limit_within_window(tmp_path):
+    """
+    Tests if no more requests than allowed are acquired within the window
+    """
+    # Arrange
+    limiter = RateLimiter("test", 3, db_path=str(tmp_path / "limits.db"), window=0.3)
+
+    # Act
+    for _ in range(3):
+        limiter.acquire(blocking=False)
+
+    # Assert
+    with pytest.raises(RateLimitExceeded) as exceeded:
+        limiter.acquire(blocking=False)
+    assert 0 < exceeded.value.wait_time <= 0.3
+
+
+def test_blocking_acquire_waits_for_window(tmp_path):
+    """
+    Tests if a blocking acquire waits until the oldest request left the window
+    """
+    # Arrange
+    limiter = RateLimiter("test", 2, db_path=str(tmp_path / "limits.db"), window=0.3)
+    limiter.acquire()
+    limiter.acquire()
+
+    # Act
+    start = time.time()
+    limiter.acquire()
+
+    # Assert
+    assert time.time() - start >= 0.25
+
+
+def test_token_limit_with_settled_usage(tmp_path):
+    """
+    Tests if the token limit uses the actual token usage of settled calls
+    """
+    # Arrange
+    limiter = RateLimiter(
+        "test", 100, tokens_per_minute=1000, db_path=str(tmp_path / "limits.db")
+    )
+
+    # Act
+    ticket = limiter.acquire(tokens=900)
+    wait_before_settle = limiter.wait_time(tokens=500)
+    limiter.settle(ticket, 400)
+    wait_after_settle = limiter.wait_time(tokens=500)
+
+    # Assert
+    assert wait_before_settle > 0
+    assert wait_after_settle == 0
+
+
+def test_limit_is_shared_between_limiters_and_threads(tmp_path):
+    """
+    Tests if limiters on the same database (e.g. in different processes) share one limit
+    """
+    # Arrange
+    db_path = str(tmp_path / "limits.db")
+    limiters = [RateLimiter("groq", 10, db_path=db_path) for _ in range(2)]
+    acquired = []
+
+    def acquire_all(limiter):
+        for _ in range(10):
+            try:
+                acquired.append(limiter.acquire(blocking=False))
+            except RateLimitExceeded:
+                pass
+
+    threads = [
+        threading.Thread(target=acquire_all, args=(limiter,)) for limiter in limiters
+    ]
+
+    # Act
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Assert
+    assert len(acquired) == 10
+    assert RateLimiter("other", 1, db_path=db_path).wait_time() == 0
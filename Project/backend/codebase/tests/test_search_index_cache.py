@@ -0,0 +1,132 @@
+import os
+import threading
+import time
+import uuid
+
+import numpy as np
+
+from graph_creator.embedding_handler import embeddings_handler
+from graph_creator.models.graph_job import GraphJob
+from graph_creator.services.embedding_store import EmbeddingStore
+from graph_creator.services.search_index_cache import SearchIndexCache
+
+
+def save_store(graph_id, nodes):
+    embeddings = np.eye(len(nodes), dtype=np.float32)
+    EmbeddingStore(nodes, embeddings, np.arange(len(nodes), dtype=np.int32)).save(
+        os.path.join(".media/embeddings", str(graph_id)), str(graph_id)
+    )
+
+
+def test_index_is_cached_until_graph_is_embedded_again(monkeypatch, tmp_path):
+    """
+    Tests if a loaded index is reused and reloaded after its graph was embedded again
+    """
+    # Arrange
+    monkeypatch.chdir(tmp_path)
+    g_job = GraphJob(id=uuid.uuid4())
+    save_store(g_job.id, ["car", "road"])
+    cache = SearchIndexCache()
+
+    # Act
+    first = cache.get(g_job)
+    second = cache.get(g_job)
+    time.sleep(0.01)
+    save_store(g_job.id, ["car", "road", "wheel"])
+    regenerated = cache.get(g_job)
+    cache.invalidate(g_job.id)
+    reloaded = cache.get(g_job)
+
+    # Assert
+    assert second is first
+    assert regenerated.embeddings.nodes == ["car", "road", "wheel"]
+    assert reloaded is not regenerated
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 3, 1)
+
+
+def test_concurrent_requests_share_one_load(mocker, monkeypatch, tmp_path):
+    """
+    Tests if concurrent requests for an index that is not cached load it once
+    """
+    # Arrange
+    monkeypatch.chdir(tmp_path)
+    g_job = GraphJob(id=uuid.uuid4())
+    save_store(g_job.id, ["car", "road"])
+    load_data = embeddings_handler.load_data
+
+    def slow_load_data(handler):
+        time.sleep(0.05)
+        return load_data(handler)
+
+    loads = mocker.patch.object(
+        embeddings_handler, "load_data", autospec=True, side_effect=slow_load_data
+    )
+    cache = SearchIndexCache()
+    handlers = []
+    threads = [
+        threading.Thread(target=lambda: handlers.append(cache.get(g_job)))
+        for _ in range(8)
+    ]
+
+    # Act
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Assert
+    assert loads.call_count == 1
+    assert all(handler is handlers[0] for handler in handlers)
+    assert cache.get_stats()["coalesced"] + cache.get_stats()["hits"] == 7
+
+
+def test_least_recently_used_index_is_evicted(monkeypatch, tmp_path):
+    """
+    Tests if the least recently used index is evicted once the cache exceeds its size
+    """
+    # Arrange
+    monkeypatch.chdir(tmp_path)
+    g_jobs = [GraphJob(id=uuid.uuid4()) for _ in range(3)]
+    for g_job in g_jobs:
+        save_store(g_job.id, ["car", "road"])
+    cache = SearchIndexCache(max_size_bytes=1)
+
+    # Act
+    for g_job in g_jobs:
+        cache.get(g_job)
+
+    # Assert
+    assert list(cache.entries) == [str(g_jobs[2].id)]
+    assert cache.get_stats()["evictions"] == 2
+
+
+def test_invalidation_during_load_is_kept(mocker, monkeypatch, tmp_path):
+    """
+    Tests if an index invalidated while it is loaded is not cached by that load
+    """
+    # Arrange
+    monkeypatch.chdir(tmp_path)
+    g_job = GraphJob(id=uuid.uuid4())
+    save_store(g_job.id, ["car", "road"])
+    cache = SearchIndexCache()
+    load_data = embeddings_handler.load_data
+
+    def invalidating_load_data(handler):
+        embeddings = load_data(handler)
+        cache.invalidate(g_job.id)
+        return embeddings
+
+    mocker.patch.object(
+        embeddings_handler,
+        "load_data",
+        autospec=True,
+        side_effect=invalidating_load_data,
+    )
+
+    # Act
+    handler = cache.get(g_job)
+
+    # Assert
+    assert handler.embeddings.nodes == ["car", "road"]
+    assert cache.get_stats()["entries"] == 0
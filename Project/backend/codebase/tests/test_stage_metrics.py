@@ -0,0 +1,92 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from graph_creator.dao.graph_job_stage_metrics_dao import GraphJobStageMetricsDAO
+from graph_creator.services.stage_metrics import StageMetricsRecorder
+from graph_creator.utils.const import PipelineStage
+from tests.test_graph_job_queue import create_queued_graph_job, database
+
+
+def test_recorder_measures_stage(mocker):
+    """
+    Tests if a stage is measured with its time, memory and the llm usage during the stage
+    """
+    # Arrange
+    llm_handler = mocker.Mock()
+    llm_handler.get_usage.side_effect = [
+        {"llm_calls": 2, "llm_tokens": 100},
+        {"llm_calls": 5, "llm_tokens": 400},
+    ]
+    on_metrics = mocker.Mock()
+    recorder = StageMetricsRecorder(llm_handler, on_metrics)
+
+    # Act
+    with recorder.measure(PipelineStage.EXTRACTIONS):
+        time.sleep(0.05)
+
+    # Assert
+    metrics = recorder.metrics[0]
+    on_metrics.assert_called_once_with(metrics)
+    assert metrics["stage"] == "extractions"
+    assert metrics["wall_time"] >= 0.05
+    assert metrics["cpu_time"] >= 0
+    assert metrics["peak_rss"] > 0
+    assert metrics["llm_calls"] == 3
+    assert metrics["llm_tokens"] == 300
+
+
+def test_recorder_measures_failed_stage():
+    """
+    Tests if a stage that raises is measured as well
+    """
+    # Arrange
+    recorder = StageMetricsRecorder()
+
+    # Act
+    with pytest.raises(ValueError):
+        with recorder.measure(PipelineStage.CHUNKS):
+            raise ValueError("no loader")
+
+    # Assert
+    assert [metrics["stage"] for metrics in recorder.metrics] == ["chunks"]
+
+
+def test_stage_metrics_are_stored_per_graph_job(test_db_url):
+    """
+    Tests if stored stage metrics are read back in the order the stages started
+    """
+
+    async def run():
+        async with database(test_db_url) as session_factory:
+            # Arrange
+            g_job = await create_queued_graph_job(session_factory)
+            started_at = datetime.now(timezone.utc)
+            async with session_factory() as session:
+                dao = GraphJobStageMetricsDAO(session)
+                for i, stage in reversed(list(enumerate(PipelineStage))):
+                    await dao.add_stage_metrics(
+                        g_job.id,
+                        {
+                            "stage": stage,
+                            "started_at": started_at + timedelta(seconds=i),
+                            "wall_time": 1.0,
+                            "cpu_time": 0.5,
+                            "peak_rss": 1024,
+                            "llm_calls": 0,
+                            "llm_tokens": 0,
+                        },
+                    )
+
+            # Act
+            async with session_factory() as session:
+                stage_metrics = await GraphJobStageMetricsDAO(
+                    session
+                ).get_stage_metrics(g_job.id)
+
+            # Assert
+            assert [metrics.stage for metrics in stage_metrics] == list(PipelineStage)
+
+    asyncio.run(run())
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+
+from graph_creator import graph_handler
+from graph_creator.services import topic_backends
+from graph_creator.services.node_embeddings import NodeEmbeddings
+from graph_creator.utils.const import TopicBackend
+
+
+def test_topic_backend_is_selected_by_number_of_nodes(mocker):
+    """
+    Tests if the auto backend chooses by the number of nodes and other backends are kept
+    """
+    # Arrange
+    mocker.patch.object(topic_backends, "TOPIC_BERTOPIC_MIN_NODES", 10)
+    mocker.patch.object(topic_backends, "TOPIC_BERTOPIC_MAX_NODES", 100)
+
+    # Act / Assert
+    assert topic_backends.select_topic_backend("auto", 9) == TopicBackend.AGGLOMERATIVE
+    assert topic_backends.select_topic_backend("auto", 50) == TopicBackend.BERTOPIC
+    assert topic_backends.select_topic_backend("auto", 101) == TopicBackend.KMEANS
+    assert topic_backends.select_topic_backend("none", 50) == TopicBackend.NONE
+
+
+def test_clustering_backends_name_topics_with_c_tf_idf():
+    """
+    Tests if clustering the embeddings finds the topics and names them by their words
+    """
+    # Arrange
+    documents = ["electric car", "car engine", "car wheel", "apple pie", "apple tree"]
+    embeddings = np.array([[1, 0.1], [1, 0.2], [1, 0], [0, 1], [0.1, 1]])
+    node_embeddings = NodeEmbeddings(documents, embeddings)
+
+    for backend in [TopicBackend.KMEANS, TopicBackend.AGGLOMERATIVE]:
+        # Act
+        topics, names = topic_backends.assign_topics(
+            documents, backend, max_topics=2, node_embeddings=node_embeddings
+        )
+
+        # Assert
+        assert len(set(topics[:3])) == 1 and len(set(topics[3:])) == 1
+        assert topics[0] != topics[3]
+        assert list(names) == [topics[0], topics[3]]
+        assert names[topics[0]].split("_")[1] == "car"
+        assert names[topics[3]].split("_")[1] == "apple"
+
+
+def test_topics_can_be_skipped():
+    """
+    Tests if all nodes get the topic other without a topic backend
+    """
+    # Arrange
+    data = pd.DataFrame([{"node_1": "a", "node_2": "b", "edge": "x", "chunk_id": "0"}])
+
+    # Act
+    result = graph_handler.add_topic(data, backend=TopicBackend.NONE)
+
+    # Assert
+    assert result["topic_node_1"].tolist() == ["other"]
+    assert result["topic_node_2"].tolist() == ["other"]
+
+
+def test_single_node_is_its_own_topic(mocker):
+    """
+    Tests if a single node gets one topic without clustering for all clustering backends
+    """
+    # Arrange
+    node_embeddings = NodeEmbeddings(["car"], np.array([[1, 0.1]]))
+    bertopic = mocker.patch.object(topic_backends, "BERTopic")
+
+    for backend in [
+        TopicBackend.AUTO,
+        TopicBackend.AGGLOMERATIVE,
+        TopicBackend.KMEANS,
+        TopicBackend.BERTOPIC,
+    ]:
+        # Act
+        topics, names = topic_backends.assign_topics(
+            ["car"], backend, max_topics=5, node_embeddings=node_embeddings
+        )
+
+        # Assert
+        assert topics == [0]
+        assert names == {0: "0_car"}
+    bertopic.assert_not_called()
@@ -25,8 +25,9 @@ def test_upload_pdf(client):
     # Check the response
     assert response.status_code == 200
 
-    # Check if the file was saved in the correct directory
-    saved_file_path = os.path.join(".media/documents", pdf_file)
+    # Check if the file was saved under its content hash
+    saved_file_path = response.json()["file_location"]
+    assert os.path.basename(saved_file_path) == response.json()["content_hash"] + ".pdf"
     assert os.path.exists(saved_file_path)
 
     # Remove the test files
@@ -0,0 +1,83 @@
+"""
+Standalone workers that create the graphs of queued graph jobs.
+
+Run next to the API to process several documents at once, e.g.:
+
+    python worker.py --processes 4
+"""
+
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import signal
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from graph_creator.services.graph_job_runner import GraphJobRunner
+from settings.defaults import DB_URL, GRAPH_WORKER_PROCESSES
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def _serve(db_url: str) -> None:
+    """
+    Consume the graph job queue until SIGTERM or SIGINT is received.
+
+    :param db_url: url of the database holding the graph job queue.
+    """
+    engine = create_async_engine(db_url)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    runner = GraphJobRunner(session_factory, max_workers=1)
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, lambda: asyncio.ensure_future(runner.shutdown()))
+
+    logger.info(f"Graph worker {runner.worker_name} started")
+    try:
+        await runner.serve()
+    finally:
+        await engine.dispose()
+    logger.info(f"Graph worker {runner.worker_name} stopped")
+
+
+def run_worker(db_url: str) -> None:
+    """
+    Entry point of a single worker process.
+
+    :param db_url: url of the database holding the graph job queue.
+    """
+    asyncio.run(_serve(db_url))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=GRAPH_WORKER_PROCESSES,
+        help="number of worker processes, each creates one graph at a time",
+    )
+    parser.add_argument("--db-url", default=DB_URL, help="database url")
+    args = parser.parse_args()
+
+    processes = [
+        multiprocessing.Process(target=run_worker, args=(args.db_url,))
+        for _ in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+
+    # the workers shut down gracefully, finishing their current graph job first
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(
+        signal.SIGTERM, lambda *_: [process.terminate() for process in processes]
+    )
+    for process in processes:
+        process.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -40,10 +40,22 @@ export interface Notification {
 }
 
 const getStatus = (status: GraphStatus) => {
-  if (status === GraphStatus.DOC_UPLOADED) {
-    return 'Document uploaded';
+  switch (status) {
+    case GraphStatus.DOC_UPLOADED:
+      return 'Document uploaded';
+    case GraphStatus.QUEUED:
+      return 'Queued';
+    case GraphStatus.EXTRACTING:
+      return 'Extracting entities';
+    case GraphStatus.CONNECTING:
+      return 'Connecting graph';
+    case GraphStatus.EMBEDDING:
+      return 'Creating embeddings';
+    case GraphStatus.FAILED:
+      return 'Graph generation failed';
+    default:
+      return 'Graph generated';
   }
-  return 'Graph generated';
 };
 
 const getDate = (isoDate: string) => {
@@ -158,7 +170,7 @@ const GraphList = () => {
       notify({
         show: true,
         severity: messageSeverity.SUCCESS,
-        message: 'Graph generated successfully!',
+        message: 'Graph generation started!',
       });
     } catch (error) {
       console.error('Error generating graph:', error);
@@ -239,7 +251,11 @@ const GraphList = () => {
                             variant="contained"
                             size="small"
                             className="main_action_button"
-                            disabled={generating !== null}
+                            disabled={
+                              generating !== null ||
+                              (row.status !== GraphStatus.DOC_UPLOADED &&
+                                row.status !== GraphStatus.FAILED)
+                            }
                             onClick={() => handleGenerate(row.id)}
                           >
                             {generating === row.id ? (
@@ -11,13 +11,25 @@ import {
 } from '@mui/material';
 import InfoIcon from '@mui/icons-material/Info'; // Import InfoIcon for hint button
 
-import { GENERATE_API_PATH, GraphStatus } from '../../constant';
+import {
+  GENERATE_API_PATH,
+  GRAPH_JOB_EVENTS_API_PATH,
+  GraphStatus,
+} from '../../constant';
 import CustomizedSnackbars from '../Snackbar';
 import Upload from '../Upload';
 
+interface GraphProgress {
+  chunks_extracted?: number;
+  chunks_total?: number;
+  components_tried?: number;
+  components_total?: number;
+}
+
 function UploadPage() {
   const [fileId, setFileId] = useState('');
   const [isGenerating, setIsGenerating] = useState(false);
+  const [progressText, setProgressText] = useState('');
   const navigate = useNavigate();
   const [showSnackbar, setShowSnackbar] = useState(false);
 
@@ -57,6 +69,40 @@ function UploadPage() {
     notifySuccess();
   };
 
+  const describeProgress = (status: GraphStatus, progress?: GraphProgress) => {
+    if (status === GraphStatus.EXTRACTING && progress?.chunks_total) {
+      return `Extracting ${progress.chunks_extracted ?? 0}/${progress.chunks_total} chunks`;
+    }
+    if (status === GraphStatus.CONNECTING && progress?.components_total) {
+      return `Connecting ${progress.components_tried ?? 0}/${progress.components_total} components`;
+    }
+    return status.charAt(0).toUpperCase() + status.slice(1);
+  };
+
+  const waitForGraph = (id: string): Promise<GraphStatus> => {
+    const API = `${import.meta.env.VITE_BACKEND_HOST}${GRAPH_JOB_EVENTS_API_PATH.replace(':fileId', id)}`;
+    return new Promise((resolve, reject) => {
+      const events = new EventSource(API);
+      events.addEventListener('progress', (event) => {
+        const res = JSON.parse((event as MessageEvent).data);
+        setProgressText(describeProgress(res.status, res.progress));
+        if (
+          res.status === GraphStatus.GRAPH_READY ||
+          res.status === GraphStatus.FAILED
+        ) {
+          events.close();
+          resolve(res.status);
+        }
+      });
+      events.onerror = () => {
+        // the stream ended without a final status, e.g. the job was deleted
+        if (events.readyState === EventSource.CLOSED) {
+          reject(new Error('Progress stream closed'));
+        }
+      };
+    });
+  };
+
   const handleGenerateGraph = () => {
     setIsGenerating(true);
 
@@ -68,8 +114,9 @@ function UploadPage() {
       },
     })
       .then((response) => response.json())
-      .then((res) => {
-        if (res.status === GraphStatus.GRAPH_READY) {
+      .then((res) => waitForGraph(res.id))
+      .then((status) => {
+        if (status === GraphStatus.GRAPH_READY) {
           navigate(`/graph/${fileId}`);
         }
       })
@@ -78,6 +125,7 @@ function UploadPage() {
       })
       .finally(() => {
         setIsGenerating(false);
+        setProgressText('');
       });
   };
   const hintText = `
@@ -121,7 +169,7 @@ function UploadPage() {
         {isGenerating ? (
           <>
             <CircularProgress size={15} />
-            <Box sx={{ ml: 2 }}>Generating...</Box>
+            <Box sx={{ ml: 2 }}>{progressText || 'Generating'}...</Box>
           </>
         ) : (
           'Generate Graph'
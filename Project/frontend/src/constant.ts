@@ -2,13 +2,20 @@ export const UPLOAD_API_PATH = '/api/graph/upload';
 export const GENERATE_API_PATH = '/api/graph/create_graph/:fileId';
 export const VISUALIZE_API_PATH = '/api/graph/visualize/:fileId';
 export const GRAPH_LIST_API_PATH = '/api/graph/graph_jobs';
+export const GRAPH_JOB_API_PATH = '/api/graph/graph_jobs/id/:fileId';
+export const GRAPH_JOB_EVENTS_API_PATH = '/api/graph/graph_jobs/:fileId/events';
 export const GRAPH_DELETE_API_PATH = '/api/graph/graph_jobs/:fileId';
 export const KEYWORDS_API_PATH = '/api/graph/graph_keywords/:fileId';
 export const GRAPH_SEARCH_API_PATH = '/api/graph/graph_search/:fileId';
 
 export enum GraphStatus {
   DOC_UPLOADED = 'document_uploaded',
+  QUEUED = 'queued',
+  EXTRACTING = 'extracting',
+  CONNECTING = 'connecting',
+  EMBEDDING = 'embedding',
   GRAPH_READY = 'graph_ready',
+  FAILED = 'failed',
 }
 
 export enum messageSeverity {